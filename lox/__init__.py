@@ -7,14 +7,18 @@ Carrega os nomes principais do módulo lox.
 from .ast import Expr, Stmt, Value
 from .ctx import Ctx
 from .errors import SemanticError
+from .memo import Memoizer
 from .node import Node
 from .parser import lex, parse, parse_cst, parse_expr
+from .resolver import resolve
 
 __all__ = [
+    "BACKENDS",
     "Ctx",
     "eval",
     "Expr",
     "lex",
+    "Memoizer",
     "Node",
     "parse_cst",
     "parse",
@@ -23,12 +27,17 @@ __all__ = [
     "SemanticError",
 ]
 
+# Motores de execução disponíveis em `eval` e na CLI
+BACKENDS = ["tree", "closure", "vm", "python"]
+
 
 def eval(
     src: str | Node,
     env: Ctx | dict[str, Value] | None = None,
     optimize: bool = True,
     skip_validation: bool = False,
+    backend: str = "tree",
+    memoize: bool | Memoizer = False,
 ) -> Value:
     """
     Avalia o código fonte e retorna o valur resultante.
@@ -45,28 +54,76 @@ def eval(
             propagação de constantes e eliminação de variáveis não utilizadas.
         skip_validation:
             Se `True`, ignora a validação do código fonte antes da avaliação.
+        backend:
+            Motor de execução. "tree" interpreta a árvore sintática diretamente,
+            "closure" compila a árvore para closures Python antes de executar,
+            "vm" compila para bytecode e executa na máquina virtual de pilha e
+            "python" traduz o programa para código Python (com cache dos
+            objetos de código compilados).
+        memoize:
+            Se verdadeiro, os resultados de funções puras ficam em cache (ver
+            `lox.memo`). Aceita um `Memoizer`, que define o tamanho do cache e
+            a política de descarte e acumula os acertos e faltas.
     """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend desconhecido: {backend!r}")
+
+    if memoize is True:
+        memoize = Memoizer()
+    if memoize and backend == "python":
+        raise ValueError("o backend python não suporta memoização")
+
     if env is None:
         env = Ctx.from_dict({})
     elif not isinstance(env, Ctx):
         env = Ctx.from_dict(env)
 
-    if isinstance(src, Node):
-        ast = src
+    if backend == "python" and not isinstance(src, Node):
+        # O código compilado fica em cache, indexado pelo hash do código
+        # fonte: programas repetidos não passam pelo parser.
+        from .transpiler import compile_source, run as run_python
+
+        code = compile_source(src, optimize)
+        run = lambda env: run_python(code, env)  # noqa: E731
     else:
-        ast = parse(src)
+        if isinstance(src, Node):
+            ast = src
+            if not skip_validation:
+                ast.validate_tree()
+        else:
+            # `parse` já valida a árvore
+            ast = parse(src)
+
+        if optimize:
+            from .optimizations import optimize_ast
+
+            ast = optimize_ast(ast)
+
+        # A resolução de variáveis acontece por último, pois as otimizações podem
+        # remover ou recriar declarações.
+        resolve(ast)
+        if memoize:
+            memoize.install(ast)
+
+        if backend == "closure":
+            from .closure import compile_closure
+
+            run = compile_closure(ast)
+        elif backend == "vm":
+            from .vm import compile_program, run as run_code
 
-    if not skip_validation:
-        ast.validate_tree()
-    
-    if optimize:
-        from .optimizations import ConstantPropagation, UnsedVarsElimination
+            code = compile_program(ast)
+            run = lambda env: run_code(code, env)  # noqa: E731
+        elif backend == "python":
+            from .transpiler import compile_tree, run as run_python
 
-        ConstantPropagation().propagate(ast)
-        UnsedVarsElimination().eval(ast)
+            code = compile_tree(ast)
+            run = lambda env: run_python(code, env)  # noqa: E731
+        else:
+            run = ast.eval
 
     try:
-        return ast.eval(env);
+        return run(env)
     except Exception as e:
         print(f"Programa terminou com um erro: {e}")
         print("Variáveis:", env)
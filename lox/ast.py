@@ -1,8 +1,9 @@
 from abc import ABC
 from dataclasses import dataclass
 from typing import Callable
-from .ctx import Ctx
-from .runtime import truthy, LoxReturn, LoxFunction, print
+from .ctx import Ctx, SlotCtx
+from . import runtime as op
+from .runtime import truthy, Completion, FunctionCache, LoxReturn, LoxFunction, MemoFunction, print
 
 # Declaramos nossa classe base num módulo separado para esconder um pouco de
 # Python relativamente avançado de quem não se interessar pelo assunto.
@@ -10,7 +11,7 @@ from .runtime import truthy, LoxReturn, LoxFunction, print
 # A classe Node implementa um método `pretty` que imprime as árvores de forma
 # legível. Também possui funcionalidades para navegar na árvore usando cursores
 # e métodos de visitação.
-from .node import Node
+from .node import Node, annotation
 
 
 #
@@ -30,6 +31,8 @@ class Expr(Node, ABC):
     funções, etc.
     """
 
+    __slots__ = ()
+
 
 class Stmt(Node, ABC):
     """
@@ -39,8 +42,10 @@ class Stmt(Node, ABC):
     execução do código ou declaram elementos como classes, funções, etc.
     """
 
+    __slots__ = ()
+
 
-@dataclass
+@dataclass(slots=True)
 class Program(Node):
     """
     Representa um programa.
@@ -50,15 +55,26 @@ class Program(Node):
 
     stmts: list[Stmt]
 
+    # Código fonte e divisão em declarações, preenchidos por `lox.incremental`
+    source: str | None = annotation()
+    segments: list | None = annotation()
+
     def eval(self, ctx: Ctx):
         for stmt in self.stmts:
             stmt.eval(ctx)
 
+    def copy(self) -> "Program":
+        # `reparse` modifica a lista de segmentos no lugar
+        new = Node.copy(self)
+        if self.segments is not None:
+            new.segments = list(self.segments)
+        return new
+
 
 #
 # EXPRESSÕES
 #
-@dataclass
+@dataclass(slots=True)
 class BinOp(Expr):
     """
     Uma operação infixa com dois operandos.
@@ -70,13 +86,61 @@ class BinOp(Expr):
     right: Expr
     op: Callable[[Value, Value], Value]
 
+    # Depois de observar dois operandos float, o nó troca a própria classe
+    # por `FloatBinOp`, que dispensa esta verificação. Se os tipos mudarem, o
+    # nó volta para a forma genérica e desliga a especialização.
+    #
+    # As duas classes têm o mesmo layout de slots: no CPython, trocar
+    # `__class__` de um objeto com `__dict__` materializa o dicionário e deixa
+    # os acessos a atributos bem mais lentos, o que anularia o ganho.
+    quicken: bool = annotation(True)
+
     def eval(self, ctx: Ctx):
         left_value = self.left.eval(ctx)
         right_value = self.right.eval(ctx)
+        if self.quicken and type(left_value) is float and type(right_value) is float:
+            if self.op in FLOAT_OPS:
+                self.__class__ = FloatBinOp
         return self.op(left_value, right_value)
 
 
-@dataclass
+class FloatBinOp(BinOp):
+    """
+    Variante de `BinOp` especializada para operandos float.
+
+    Não é criada pelo parser: um `BinOp` se transforma nela durante a
+    execução. Para quem usa a árvore a troca é invisível: o nó continua sendo
+    uma instância de `BinOp`, se compara como tal e é exibido com o mesmo
+    nome (ex.: em `pretty`).
+    """
+
+    # Mesmo layout de BinOp, para permitir a troca de `__class__`
+    __slots__ = ()
+
+    def eval(self, ctx: Ctx):
+        left_value = self.left.eval(ctx)
+        right_value = self.right.eval(ctx)
+        if type(left_value) is float and type(right_value) is float:
+            return self.op(left_value, right_value)
+        self.__class__ = BinOp
+        self.quicken = False
+        return self.op(left_value, right_value)
+
+    def __eq__(self, other):
+        if not isinstance(other, BinOp):
+            return NotImplemented
+        return (self.left, self.right, self.op) == (other.left, other.right, other.op)
+
+    __hash__ = None
+
+
+FloatBinOp.__name__ = FloatBinOp.__qualname__ = "BinOp"
+
+# Operações especializadas para operandos float (ver `BinOp.quicken`)
+FLOAT_OPS = frozenset([op.add, op.sub, op.mul, op.truediv, op.lt, op.le, op.gt, op.ge])
+
+
+@dataclass(slots=True)
 class Var(Expr):
     """
     Uma variável no código
@@ -86,20 +150,48 @@ class Var(Expr):
 
     name: str
 
+    # Posição da variável no ambiente, preenchida pelo resolvedor (ver
+    # `lox.resolver`). Variáveis globais ou não resolvidas usam busca por nome.
+    depth: int | None = annotation()
+    slot: int | None = annotation()
+
+    # Marcado pelo resolvedor quando nenhum escopo local envolvente declara o
+    # nome. A busca no escopo global fica em cache: o contexto global, a
+    # versão de `Ctx` e o dicionário onde o nome foi encontrado.
+    is_global: bool = annotation(False)
+    cache_ctx: Ctx | None = annotation()
+    cache_version: int = annotation(-1)
+    cache_scope: dict | None = annotation()
+
     def eval(self, ctx: Ctx):
+        if self.slot is not None:
+            return ctx.frames[-1 - self.depth][self.slot]
+        if self.is_global:
+            globals_ = ctx.globals
+            if self.cache_ctx is globals_ and self.cache_version == Ctx.version:
+                return self.cache_scope[self.name]
+            scope = globals_.find_scope(self.name)
+            if scope is not None:
+                self.cache_ctx = globals_
+                self.cache_version = Ctx.version
+                self.cache_scope = scope
+                return scope[self.name]
         try:
             return ctx.__getitem__(self.name)
         except KeyError:
             raise NameError(f"variável {self.name} não existe!")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Literal(Expr):
     """
     Representa valores literais no código, ex.: strings, booleanos,
     números, etc.
 
     Ex.: "Hello, world!", 42, 3.14, true, nil
+
+    Literais são imutáveis: otimizações substituem o nó em vez de modificá-lo,
+    e cópias da árvore (ver `Node.clone`) podem compartilhá-los com o original.
     """
 
     value: Value
@@ -108,7 +200,7 @@ class Literal(Expr):
         return self.value
 
 
-@dataclass
+@dataclass(slots=True)
 class And(Expr):
     """
     Uma operação infixa com dois operandos.
@@ -133,7 +225,7 @@ class And(Expr):
         return True
 
 
-@dataclass
+@dataclass(slots=True)
 class Or(Expr):
     """
     Uma operação infixa com dois operandos.
@@ -155,7 +247,7 @@ class Or(Expr):
         return False
 
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOp(Expr):
     """
     Uma operação prefixa com um operando.
@@ -170,7 +262,7 @@ class UnaryOp(Expr):
         value = self.expr.eval(ctx)
         return self.op(value)
 
-@dataclass
+@dataclass(slots=True)
 class Call(Expr):
     """
     Uma chamada de função.
@@ -191,7 +283,7 @@ class Call(Expr):
             raise TypeError(f"{self.node.name} não é uma função!")
 
 
-@dataclass
+@dataclass(slots=True)
 class This(Expr):
     """
     Acesso ao `this`.
@@ -200,7 +292,7 @@ class This(Expr):
     """
 
 
-@dataclass
+@dataclass(slots=True)
 class Super(Expr):
     """
     Acesso a method ou atributo da superclasse.
@@ -209,7 +301,7 @@ class Super(Expr):
     """
 
 
-@dataclass
+@dataclass(slots=True)
 class Assign(Expr):
     """
     Atribuição de variável.
@@ -219,7 +311,15 @@ class Assign(Expr):
     name: Var
     expr: Expr
 
+    # Preenchidos pelo resolvedor, como em `Var`.
+    depth: int | None = annotation()
+    slot: int | None = annotation()
+
     def eval(self, ctx: Ctx):
+        if self.slot is not None:
+            value = self.expr.eval(ctx)
+            ctx.frames[-1 - self.depth][self.slot] = value
+            return value
         if (self.name.name in ctx):
             value = self.expr.eval(ctx)
             ctx[self.name.name] = value
@@ -228,7 +328,7 @@ class Assign(Expr):
             raise NameError(f"variável {self.name.name} não existe!")
 
 
-@dataclass
+@dataclass(slots=True)
 class Getattr(Expr):
     """
     Acesso a atributo de um objeto.
@@ -251,7 +351,7 @@ class Getattr(Expr):
         raise TypeError(f"Não é um objeto")
 
 
-@dataclass
+@dataclass(slots=True)
 class Setattr(Expr):
     """
     Atribuição de atributo de um objeto.
@@ -277,7 +377,7 @@ class Setattr(Expr):
 #
 # COMANDOS
 #
-@dataclass
+@dataclass(slots=True)
 class Print(Stmt):
     """
     Representa uma instrução de impressão.
@@ -291,7 +391,7 @@ class Print(Stmt):
         print(value)
 
 
-@dataclass
+@dataclass(slots=True)
 class Return(Stmt):
     """
     Representa uma instrução de retorno.
@@ -301,11 +401,32 @@ class Return(Stmt):
 
     expr: Expr
 
+    # Marcado pelo resolvedor nos `return` dentro de funções: em vez de lançar
+    # `LoxReturn`, o comando devolve um `Completion` que os comandos
+    # envolventes repassam até `LoxFunction.__call__`.
+    signal: bool = annotation(False)
+
+    # Marcado pelo resolvedor quando, além disso, a expressão é uma chamada.
+    # Chamadas a funções Lox não são executadas aqui: o `Completion` leva a
+    # função e os argumentos para o trampolim de `LoxFunction.__call__`.
+    tail: bool = annotation(False)
+
     def eval(self, ctx): 
+        if self.tail:
+            call = self.expr
+            func = call.node.eval(ctx)
+            args = [arg.eval(ctx) for arg in call.args]
+            if type(func) is LoxFunction:
+                return Completion(func, args)
+            if callable(func):
+                return Completion(func(*args))
+            raise TypeError(f"{call.node.name} não é uma função!")
+        if self.signal:
+            return Completion(self.expr.eval(ctx))
         raise LoxReturn(self.expr.eval(ctx))
 
 
-@dataclass
+@dataclass(slots=True)
 class VarDef(Stmt):
     """
     Representa uma declaração de variável.
@@ -316,12 +437,18 @@ class VarDef(Stmt):
     name: str
     expr: Expr
 
+    # Posição da variável no escopo local, preenchida pelo resolvedor.
+    slot: int | None = annotation()
+
     def eval(self, ctx: Ctx):
         value = self.expr.eval(ctx)
-        ctx.var_def(self.name, value)
+        if self.slot is None:
+            ctx.var_def(self.name, value)
+        else:
+            ctx.slot_def(self.slot, value)
 
 
-@dataclass
+@dataclass(slots=True)
 class If(Stmt):
     """
     Representa uma instrução condicional.
@@ -334,13 +461,14 @@ class If(Stmt):
     not_then: Expr
     
     def eval(self, ctx: Ctx):
+        # Repassa o resultado do ramo executado (ver `Return.signal`)
         if(truthy(self.cond.eval(ctx))):
-            self.then.eval(ctx)
+            return self.then.eval(ctx)
         else:
-            self.not_then.eval(ctx)
+            return self.not_then.eval(ctx)
 
 
-@dataclass
+@dataclass(slots=True)
 class While(Stmt):
     """
     Representa um laço de repetição.
@@ -351,16 +479,25 @@ class While(Stmt):
     cond: Expr
     then: Expr
 
+    # Verdadeiro se o corpo contém um `return` marcado pelo resolvedor
+    returns: bool = annotation(False)
+
     def eval(self, ctx: Ctx):
-        cond = self.cond.eval(ctx)
-        
-        if (truthy(cond)):
-            self.then.eval(ctx)
-            self.eval(ctx)
-        
+        # Laço iterativo: cada volta reaproveita o mesmo frame do Python, então
+        # a profundidade da pilha não cresce com o número de iterações.
+        cond = self.cond
+        then = self.then
+        if self.returns:
+            while truthy(cond.eval(ctx)):
+                result = then.eval(ctx)
+                if type(result) is Completion:
+                    return result
+        else:
+            while truthy(cond.eval(ctx)):
+                then.eval(ctx)
 
 
-@dataclass
+@dataclass(slots=True)
 class Block(Node):
     """
     Representa bloco de comandos.
@@ -370,12 +507,29 @@ class Block(Node):
 
     statements: list[Stmt]
 
+    # Tabela nome -> slot das variáveis declaradas no bloco, preenchida pelo
+    # resolvedor. Blocos sem declarações não precisam de um novo escopo.
+    slots: dict[str, int] | None = annotation()
+
+    # Verdadeiro se o bloco contém um `return` marcado pelo resolvedor
+    returns: bool = annotation(False)
+
     def eval(self, ctx: Ctx):
-        ctx = ctx.push({}) 
-        for stmt in self.statements:
-            stmt.eval(ctx)
+        slots = self.slots
+        if slots is None:
+            ctx = ctx.push({})
+        elif slots:
+            ctx = SlotCtx(slots, ctx)
+        if self.returns:
+            for stmt in self.statements:
+                result = stmt.eval(ctx)
+                if type(result) is Completion:
+                    return result
+        else:
+            for stmt in self.statements:
+                stmt.eval(ctx)
 
-@dataclass
+@dataclass(slots=True)
 class Function(Stmt):
     """
     Representa uma função.
@@ -387,19 +541,33 @@ class Function(Stmt):
     args: list[str]
     body: Expr
 
+    # Preenchidos pelo resolvedor: slot do nome da função no escopo onde ela é
+    # declarada e tabela nome -> slot dos parâmetros.
+    slot: int | None = annotation()
+    params: dict[str, int] | None = annotation()
+
+    # Cache de resultados de funções puras, instalado por `lox.memo.Memoizer`
+    memo: FunctionCache | None = annotation()
+
     def eval(self, ctx: Ctx):
         loxFn = LoxFunction(
             name=self.identifier,
             args=self.args,
             body=[self.body],
-            ctx=ctx
+            ctx=ctx,
+            slots=self.params,
         )
+        if self.memo is not None:
+            loxFn = MemoFunction(loxFn, self.memo)
 
-        ctx.var_def(self.identifier, loxFn)
+        if self.slot is None:
+            ctx.var_def(self.identifier, loxFn)
+        else:
+            ctx.slot_def(self.slot, loxFn)
         return loxFn
 
 
-@dataclass
+@dataclass(slots=True)
 class Class(Stmt):
     """
     Representa uma classe.
@@ -407,7 +575,7 @@ class Class(Stmt):
     Ex.: class B < A { ... }
     """
 
-@dataclass
+@dataclass(slots=True)
 class NoOp(Stmt):
     """
     Representa uma instrução vazia.
@@ -0,0 +1,185 @@
+"""
+Cache em disco das árvores sintáticas produzidas por `lox.parse`.
+
+A árvore final (depois de `validate_tree` e `desugar_tree`) é serializada nos
+vetores de `lox.flat`, comprimida com zlib e salva no diretório `ast/` do cache (ver
+`lox.cache`), num arquivo indexado pelo hash do código fonte. Executar de novo
+um programa que não mudou dispensa o lexer, o parser e o transformer.
+
+A chave inclui também o hash dos módulos que definem a árvore (gramática,
+transformer e nós), de modo que mudanças no front-end invalidam o cache. A
+serialização não usa recursão: árvores profundas demais para o pickle (longas
+cadeias de operadores, por exemplo) também são salvas. Se mesmo assim a árvore
+não puder ser serializada, ela é retornada sem passar pelo cache.
+
+Quando o diretório passa de `max_bytes`, os arquivos usados há mais tempo são
+removidos. Uso:
+
+    >>> cache = ASTCache()
+    >>> tree = cache.parse(src)  # doctest: +SKIP
+    >>> print(cache.report())  # doctest: +SKIP
+    cache de árvores: 1 acertos, 0 faltas, 0 descartes
+"""
+
+import hashlib
+import os
+import zlib
+from pathlib import Path
+
+from .ast import Program
+from .cache import cache_dir, write_atomic
+from .flat import FlatProgram, from_program, to_program
+
+DIR = Path(__file__).parent
+
+# Arquivos que determinam a árvore produzida para um dado código fonte
+FRONTEND_FILES = (
+    "grammar.lark",
+    "lexer.py",
+    "transformer.py",
+    "ast.py",
+    "node.py",
+    "parser.py",
+    "passes.py",
+    "flat.py",
+    "astcache.py",
+)
+
+# Tamanho máximo padrão do diretório de cache (64 MiB)
+MAX_BYTES = 64 * 1024 * 1024
+
+_FRONTEND_VERSION: str | None = None
+
+
+def frontend_version() -> str:
+    """
+    Hash dos arquivos do front-end, calculado uma vez por processo.
+    """
+    global _FRONTEND_VERSION
+    if _FRONTEND_VERSION is None:
+        digest = hashlib.sha256()
+        for name in FRONTEND_FILES:
+            digest.update((DIR / name).read_bytes())
+        _FRONTEND_VERSION = digest.hexdigest()[:16]
+    return _FRONTEND_VERSION
+
+
+def dump_tree(tree: Program) -> bytes:
+    """
+    Serializa a árvore no formato dos arquivos do cache.
+
+    Os vetores de `lox.flat` são montados sem recursão, ao contrário do pickle
+    aplicado diretamente aos nós, que falha em árvores muito profundas.
+    """
+    return zlib.compress(from_program(tree).to_bytes())
+
+
+def load_tree(data: bytes) -> Program:
+    """
+    Reconstrói uma árvore serializada com `dump_tree`.
+    """
+    tree = to_program(FlatProgram.from_buffer(zlib.decompress(data)))
+    if not isinstance(tree, Program):
+        raise ValueError("os dados não contêm uma árvore sintática do Lox")
+    return tree
+
+
+class ASTCache:
+    """
+    Cache de árvores sintáticas em disco, com estatísticas de uso.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        if max_bytes < 1:
+            raise ValueError("o tamanho do cache deve ser positivo")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, src: str) -> str:
+        data = f"{frontend_version()}:{src}"
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def parse(self, src: str) -> Program:
+        """
+        Retorna a árvore do código fonte, usando o cache se possível.
+        """
+        from .parser import parse
+
+        directory = cache_dir("ast")
+        if directory is None:
+            return parse(src, cache=False)
+
+        path = directory / f"{self.key(src)}.ast"
+        tree = self.load(path)
+        if tree is not None:
+            self.hits += 1
+            return tree
+
+        self.misses += 1
+        tree = parse(src, cache=False)
+        try:
+            data = dump_tree(tree)
+        except (RecursionError, TypeError, ValueError):
+            # Árvore que não pode ser serializada: usa sem guardar no cache
+            return tree
+        write_atomic(path, data)
+        self.evict(directory)
+        return tree
+
+    def load(self, path: Path) -> Program | None:
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            tree = load_tree(data)
+        except Exception:
+            # Arquivo corrompido ou de uma versão incompatível
+            path.unlink(missing_ok=True)
+            return None
+        # Atualiza a data de modificação, que define a ordem de descarte
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return tree
+
+    def evict(self, directory: Path) -> None:
+        """
+        Remove os arquivos usados há mais tempo até o diretório caber em
+        `max_bytes`.
+        """
+        entries = []
+        total = 0
+        for path in directory.glob("*.ast"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def report(self) -> str:
+        return (
+            f"cache de árvores: {self.hits} acertos, {self.misses} faltas, "
+            f"{self.evictions} descartes"
+        )
+
+
+# Cache usado por `lox.parse`
+AST_CACHE = ASTCache()
@@ -0,0 +1,59 @@
+"""
+Gera o parser autônomo do Lox.
+
+    python -m lox.build
+
+Cria o módulo `lox/_standalone.py` com as tabelas LALR já serializadas e o
+código de execução do Lark necessário para usá-las. Com `LOX_PARSER=standalone`
+o Lox usa esse módulo no lugar da biblioteca Lark (ver `lox.standalone`), o
+que dispensa tanto a análise da gramática quanto a importação do Lark.
+
+O módulo gerado guarda o hash da gramática: se `grammar.lark` mudar, o Lox
+volta a usar o Lark até que o módulo seja gerado de novo.
+"""
+
+import argparse
+import io
+from pathlib import Path
+
+from lark import Lark
+from lark.tools.standalone import gen_standalone
+
+from .standalone import GRAMMAR_PATH, STANDALONE_PATH, grammar_hash
+
+
+def generate(path: Path = STANDALONE_PATH) -> Path:
+    """
+    Gera o módulo do parser autônomo no caminho indicado.
+    """
+    grammar = GRAMMAR_PATH.read_text()
+    parser = Lark(grammar, parser="lalr", start=["start", "expr"])
+
+    out = io.StringIO()
+    gen_standalone(parser, out=out, compress=True)
+    code = out.getvalue()
+
+    # O template do Lark 0.12 usa `suppress` em `ContextualLexer.lex` sem
+    # importá-lo, o que quebra `lox.lex`.
+    code = "from contextlib import suppress\n" + code
+    code += f"\nGRAMMAR_HASH = {grammar_hash(grammar)!r}\n"
+
+    path.write_text(code)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o parser autônomo do Lox")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=STANDALONE_PATH,
+        help=f"Arquivo de saída (padrão: {STANDALONE_PATH.name}).",
+    )
+    args = parser.parse_args()
+    print(f"Parser gerado em {generate(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
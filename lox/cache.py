@@ -0,0 +1,51 @@
+"""
+Diretório de cache em disco usado pelo compilador.
+
+O diretório base é definido pela variável de ambiente `LOX_CACHE_DIR`. Se ela
+não estiver definida, usamos `$XDG_CACHE_HOME/lox` (ou `~/.cache/lox`). Defina
+`LOX_CACHE_DIR=""` para desabilitar o cache em disco.
+"""
+
+import os
+from pathlib import Path
+
+
+def cache_dir(*parts: str) -> Path | None:
+    """
+    Retorna o subdiretório de cache indicado, criando-o se necessário.
+
+    Retorna None se o cache em disco estiver desabilitado ou se não for
+    possível criar o diretório.
+
+    Examples:
+        >>> cache_dir("python")  # doctest: +SKIP
+        PosixPath('/home/user/.cache/lox/python')
+    """
+    base = os.environ.get("LOX_CACHE_DIR")
+    if base == "":
+        return None
+    if base is None:
+        xdg = os.environ.get("XDG_CACHE_HOME")
+        base = Path(xdg) if xdg else Path.home() / ".cache"
+        base = base / "lox"
+
+    path = Path(base).joinpath(*parts)
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return path
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    Grava o arquivo de forma atômica, para que leitores concorrentes nunca
+    vejam um arquivo pela metade. Falhas de escrita são ignoradas: o cache é
+    apenas uma otimização.
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
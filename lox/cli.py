@@ -13,10 +13,11 @@ padrão do Python e não requer instalação de dependências externas.
 """
 
 import argparse
+import sys
 
-from lark import Token
+from .standalone import Token
 
-from . import eval as lox_eval
+from . import BACKENDS, Memoizer, eval as lox_eval
 from .ctx import Ctx
 from .parser import lex, parse, parse_cst, parse_expr
 from .runtime import show_repr as lox_repr
@@ -46,6 +47,18 @@ def make_argparser():
         action="store_true",
         help="Imprime a árvore sintática concreta produzida pelo Lark.",
     )
+    parser.add_argument(
+        "-d",
+        "--bytecode",
+        action="store_true",
+        help="Imprime o bytecode da máquina virtual (disassembler).",
+    )
+    parser.add_argument(
+        "-y",
+        "--python",
+        action="store_true",
+        help="Imprime o código Python gerado pelo backend python.",
+    )
     parser.add_argument(
         "-p",
         "--pm",
@@ -65,6 +78,60 @@ def make_argparser():
         default=False,
         help="Habilita otimizações no código fonte antes da execução.",
     )
+    parser.add_argument(
+        "-m",
+        "--memoize",
+        nargs="?",
+        type=int,
+        const=128,
+        default=None,
+        metavar="N",
+        help="Guarda em cache (LRU) até N resultados de cada função pura (padrão: 128).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Lê, analisa e executa o arquivo uma declaração por vez (para arquivos muito grandes).",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="Mostra os acertos e faltas do cache de árvores sintáticas.",
+    )
+    parser.add_argument(
+        "-b",
+        "--backend",
+        choices=BACKENDS,
+        default="tree",
+        help="Motor de execução (padrão: tree).",
+    )
+    return parser
+
+
+def make_compile_argparser():
+    parser = argparse.ArgumentParser(
+        prog="lox compile",
+        description="Compila os arquivos .lox de um diretório para árvores sintáticas serializadas (.ast)",
+    )
+    parser.add_argument(
+        "directory",
+        help="Diretório com os arquivos .lox (inclui subdiretórios)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Número de processos (padrão: um por CPU).",
+    )
+    parser.add_argument(
+        "-o",
+        "--optimize",
+        action="store_true",
+        default=False,
+        help="Aplica as otimizações às árvores antes de salvá-las.",
+    )
     return parser
 
 
@@ -72,6 +139,10 @@ def main():
     """
     Função principal que cria a interface de linha de comando (CLI) para o compilador Lox.
     """
+    # Subcomando `lox compile DIR`
+    if sys.argv[1:2] == ["compile"]:
+        return compile_dir(make_compile_argparser().parse_args(sys.argv[2:]))
+
     parser = make_argparser()
     args = parser.parse_args()
 
@@ -79,6 +150,15 @@ def main():
     if args.file == "repl":
         return repl()
 
+    if args.stream:
+        from .stream import STREAM_BACKENDS
+
+        if args.memoize is not None:
+            parser.error("--stream não suporta --memoize")
+        if args.backend not in STREAM_BACKENDS:
+            parser.error(f"--stream não suporta o backend {args.backend}")
+        return stream(args)
+
     # Lê arquivo de entrada
     try:
         with open(args.file, "r") as f:
@@ -97,15 +177,68 @@ def main():
         print_color("=" * line_len, "blue")
         print()
 
-    if not args.ast and not args.cst and not args.lex:
+    if not args.ast and not args.cst and not args.lex and not args.bytecode and not args.python:
+        memoize = Memoizer(args.memoize) if args.memoize is not None else False
         try:
-            lox_eval(source, optimize=bool(args.optimize))
+            lox_eval(source, optimize=bool(args.optimize), backend=args.backend, memoize=memoize)
         except Exception as e:
             on_error(e, args.pm)
+        if memoize:
+            print_color(memoize.report(), "blue")
 
     else:
         debug_source(source, args)
 
+    if args.cache_stats:
+        from .astcache import AST_CACHE
+
+        print_color(AST_CACHE.report(), "blue")
+
+
+def stream(args):
+    """
+    Executa o arquivo em fluxo, sem carregá-lo inteiro na memória.
+    """
+    from .stream import eval_stream, read_chunks
+
+    try:
+        file = open(args.file, "r")
+    except FileNotFoundError:
+        print(f"Arquivo {args.file} não encontrado.")
+        exit(1)
+
+    with file:
+        try:
+            eval_stream(read_chunks(file), optimize=bool(args.optimize), backend=args.backend)
+        except Exception as e:
+            on_error(e, args.pm)
+
+
+def compile_dir(args):
+    """
+    Compila um diretório inteiro em paralelo (`lox compile DIR -j N`).
+    """
+    import time
+
+    from .batch import compile_dir as compile_batch
+
+    if args.jobs is not None and args.jobs < 1:
+        make_compile_argparser().error("o número de processos deve ser positivo")
+
+    start = time.perf_counter()
+    results = compile_batch(args.directory, jobs=args.jobs, optimize=args.optimize)
+    elapsed = time.perf_counter() - start
+
+    errors = [result for result in results if not result.ok]
+    for result in errors:
+        print_color(f"{result.source}: {result.error}", "red")
+    print_color(
+        f"{len(results) - len(errors)} arquivos compilados, {len(errors)} erros em {elapsed:.2f}s",
+        "blue",
+    )
+    if errors:
+        exit(1)
+
 
 def debug_source(source: str, args):
     """
@@ -114,10 +247,9 @@ def debug_source(source: str, args):
     if args.ast:
         ast = parse(source)
         if args.optimize:
-            from .optimizations import ConstantPropagation, UnsedVarsElimination
+            from .optimizations import optimize_ast
 
-            ConstantPropagation().propagate(ast)
-            UnsedVarsElimination().eval(ast)
+            ast = optimize_ast(ast)
         for node in ast.lark_descendents():
             if isinstance(node, Token):
                 descr = repr(node)
@@ -129,7 +261,31 @@ def debug_source(source: str, args):
             msg += tail
             print(msg)
 
-        print(ast.pretty())
+        # Escrita incremental: árvores grandes não viram uma string enorme
+        ast.pretty_to(sys.stdout)
+        print()
+
+    if args.bytecode:
+        from .resolver import resolve
+        from .vm import compile_program, disassemble
+
+        ast = parse(source)
+        if args.optimize:
+            from .optimizations import optimize_ast
+
+            ast = optimize_ast(ast)
+        resolve(ast)
+        print(disassemble(compile_program(ast)))
+
+    if args.python:
+        from .transpiler import transpile
+
+        ast = parse(source)
+        if args.optimize:
+            from .optimizations import optimize_ast
+
+            ast = optimize_ast(ast)
+        print(transpile(ast))
 
     if args.cst:
         cst = parse_cst(source)
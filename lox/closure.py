@@ -0,0 +1,456 @@
+"""
+Backend de execução baseado em closures.
+
+Em vez de interpretar a árvore sintática chamando `Node.eval` a cada visita,
+este módulo percorre a árvore uma única vez e constrói uma árvore de funções
+Python especializadas (closures). Cada closure recebe apenas o contexto de
+execução: operadores, filhos, nomes e slots de variáveis já ficam ligados no
+momento da compilação, então nenhum atributo de nó é relido em tempo de
+execução.
+
+Uso:
+
+    >>> run = compile_closure(parse("print 1 + 2;"))
+    >>> run(Ctx())
+    3
+
+Variáveis locais usam as anotações do resolvedor (ver `lox.resolver`), se
+presentes. A semântica segue exatamente a de `Node.eval`, inclusive nas
+chamadas em posição de cauda (`Return.tail`), que são executadas pelo
+trampolim de `ClosureFunction.__call__` sem aumentar a pilha.
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+
+from . import ast
+from . import runtime as op
+from .ctx import Ctx, SlotCtx
+from .node import Node
+from .runtime import Completion, LoxFunction, LoxReturn, MemoFunction
+
+Thunk = Callable[[Ctx], "ast.Value"]
+
+
+@dataclass
+class ClosureFunction(LoxFunction):
+    """
+    Função Lox cujo corpo foi compilado para uma closure.
+    """
+
+    run: Thunk | None = None
+
+    def __call__(self, *args):
+        func = self
+        # Trampolim: um `return` em posição de cauda lança `LoxReturn` com um
+        # `Completion` que leva a próxima função e os seus argumentos
+        while True:
+            env = func.bind(args)
+            try:
+                func.run(env)
+                return None
+            except LoxReturn as e:
+                result = e.value
+            if type(result) is not Completion:
+                return result
+            func = result.value
+            args = result.args
+
+
+class ClosureCompiler:
+    def compile(self, node: Node) -> Thunk:
+        """
+        Compila o nó para uma função que recebe o contexto de execução.
+        """
+        if isinstance(node, ast.Literal):
+            return self.compile_literal(node)
+        if isinstance(node, ast.Var):
+            return self.compile_var(node)
+        if isinstance(node, ast.BinOp):
+            return self.compile_binop(node)
+        if isinstance(node, ast.Assign):
+            return self.compile_assign(node)
+        if isinstance(node, ast.Call):
+            return self.compile_call(node)
+        if isinstance(node, ast.UnaryOp):
+            return self.compile_unary(node)
+        if isinstance(node, ast.And):
+            return self.compile_and(node)
+        if isinstance(node, ast.Or):
+            return self.compile_or(node)
+        if isinstance(node, ast.Getattr):
+            return self.compile_getattr(node)
+        if isinstance(node, ast.Setattr):
+            return self.compile_setattr(node)
+        if isinstance(node, (ast.Program, ast.Block)):
+            return self.compile_block(node)
+        if isinstance(node, ast.VarDef):
+            return self.compile_vardef(node)
+        if isinstance(node, ast.If):
+            return self.compile_if(node)
+        if isinstance(node, ast.While):
+            return self.compile_while(node)
+        if isinstance(node, ast.Print):
+            return self.compile_print(node)
+        if isinstance(node, ast.Return):
+            return self.compile_return(node)
+        if isinstance(node, ast.Function):
+            return self.compile_function(node)
+        if isinstance(node, ast.NoOp):
+            return lambda ctx: None
+
+        # Nós sem versão compilada (ex.: This, Super) caem no interpretador.
+        return node.eval
+
+    #
+    # EXPRESSÕES
+    #
+    def compile_literal(self, node: ast.Literal) -> Thunk:
+        value = node.value
+        return lambda ctx: value
+
+    def compile_var(self, node: ast.Var) -> Thunk:
+        slot = node.slot
+        if slot is not None:
+            if node.depth == 0:
+                return lambda ctx: ctx.values[slot]
+            frame = -1 - node.depth
+            return lambda ctx: ctx.frames[frame][slot]
+
+        name = node.name
+
+        if node.is_global:
+            # Cache da busca no escopo global, como em `Var.eval`
+            cache_ctx = cache_scope = None
+            cache_version = -1
+
+            def global_var(ctx):
+                nonlocal cache_ctx, cache_version, cache_scope
+                globals_ = ctx.globals
+                if cache_ctx is globals_ and cache_version == Ctx.version:
+                    return cache_scope[name]
+                scope = globals_.find_scope(name)
+                if scope is None:
+                    try:
+                        return ctx[name]
+                    except KeyError:
+                        raise NameError(f"variável {name} não existe!")
+                cache_ctx, cache_version, cache_scope = globals_, Ctx.version, scope
+                return scope[name]
+
+            return global_var
+
+        def var(ctx):
+            # Atalho para código no escopo global, que não passa por SlotCtx
+            if type(ctx) is Ctx:
+                scope = ctx.scope
+                if name in scope:
+                    return scope[name]
+            try:
+                return ctx[name]
+            except KeyError:
+                raise NameError(f"variável {name} não existe!")
+
+        return var
+
+    def compile_binop(self, node: ast.BinOp) -> Thunk:
+        left = self.compile(node.left)
+        fn = node.op
+
+        # Operandos constantes à direita são muito comuns (i + 1, n < 10, ...)
+        if isinstance(node.right, ast.Literal):
+            const = node.right.value
+            if fn is op.add:
+                return lambda ctx: left(ctx) + const
+            if fn is op.sub:
+                return lambda ctx: left(ctx) - const
+            if fn is op.mul:
+                return lambda ctx: left(ctx) * const
+            if fn is op.lt:
+                return lambda ctx: left(ctx) < const
+            if fn is op.le:
+                return lambda ctx: left(ctx) <= const
+            if fn is op.gt:
+                return lambda ctx: left(ctx) > const
+            if fn is op.ge:
+                return lambda ctx: left(ctx) >= const
+            if fn is op.eq:
+                return lambda ctx: left(ctx) == const
+            return lambda ctx: fn(left(ctx), const)
+
+        right = self.compile(node.right)
+        if fn is op.add:
+            return lambda ctx: left(ctx) + right(ctx)
+        if fn is op.sub:
+            return lambda ctx: left(ctx) - right(ctx)
+        if fn is op.mul:
+            return lambda ctx: left(ctx) * right(ctx)
+        if fn is op.truediv:
+            return lambda ctx: left(ctx) / right(ctx)
+        if fn is op.lt:
+            return lambda ctx: left(ctx) < right(ctx)
+        if fn is op.le:
+            return lambda ctx: left(ctx) <= right(ctx)
+        if fn is op.gt:
+            return lambda ctx: left(ctx) > right(ctx)
+        if fn is op.ge:
+            return lambda ctx: left(ctx) >= right(ctx)
+        if fn is op.eq:
+            return lambda ctx: left(ctx) == right(ctx)
+        if fn is op.ne:
+            return lambda ctx: left(ctx) != right(ctx)
+        return lambda ctx: fn(left(ctx), right(ctx))
+
+    def compile_unary(self, node: ast.UnaryOp) -> Thunk:
+        expr = self.compile(node.expr)
+        fn = node.op
+        if fn is op.neg:
+            return lambda ctx: -expr(ctx)
+        return lambda ctx: fn(expr(ctx))
+
+    def compile_and(self, node: ast.And) -> Thunk:
+        first, second = map(self.compile, node.expr)
+
+        def and_(ctx):
+            if first(ctx) == False:  # noqa: E712
+                return False
+            if second(ctx) == False:  # noqa: E712
+                return False
+            return True
+
+        return and_
+
+    def compile_or(self, node: ast.Or) -> Thunk:
+        first, second = map(self.compile, node.expr)
+
+        def or_(ctx):
+            if first(ctx) == True:  # noqa: E712
+                return True
+            if second(ctx) == True:  # noqa: E712
+                return True
+            return False
+
+        return or_
+
+    def compile_assign(self, node: ast.Assign) -> Thunk:
+        expr = self.compile(node.expr)
+        slot = node.slot
+        if slot is not None:
+            frame = -1 - node.depth
+
+            def assign_slot(ctx):
+                value = expr(ctx)
+                ctx.frames[frame][slot] = value
+                return value
+
+            return assign_slot
+
+        name = node.name.name
+
+        def assign(ctx):
+            if type(ctx) is Ctx:
+                scope = ctx.scope
+                if name in scope:
+                    scope[name] = value = expr(ctx)
+                    return value
+            if name in ctx:
+                value = expr(ctx)
+                ctx[name] = value
+                return value
+            raise NameError(f"variável {name} não existe!")
+
+        return assign
+
+    def compile_call(self, node: ast.Call) -> Thunk:
+        callee = self.compile(node.node)
+        args = [self.compile(arg) for arg in node.args]
+
+        def error():
+            return TypeError(f"{node.node.name} não é uma função!")
+
+        if not args:
+            def call0(ctx):
+                func = callee(ctx)
+                if callable(func):
+                    return func()
+                raise error()
+
+            return call0
+
+        if len(args) == 1:
+            (arg,) = args
+
+            def call1(ctx):
+                func = callee(ctx)
+                value = arg(ctx)
+                if callable(func):
+                    return func(value)
+                raise error()
+
+            return call1
+
+        def call(ctx):
+            func = callee(ctx)
+            values = [arg(ctx) for arg in args]
+            if callable(func):
+                return func(*values)
+            raise error()
+
+        return call
+
+    def compile_getattr(self, node: ast.Getattr) -> Thunk:
+        obj_fn = self.compile(node.obj)
+        name = node.name
+
+        def getattr_(ctx):
+            obj = obj_fn(ctx)
+            if isinstance(obj, dict):
+                if name in obj:
+                    return obj[name]
+                raise AttributeError(f"Atributo {name} não encontrado no objeto {type(obj).__name__}")
+            if hasattr(obj, name):
+                return getattr(obj, name)
+            raise TypeError("Não é um objeto")
+
+        return getattr_
+
+    def compile_setattr(self, node: ast.Setattr) -> Thunk:
+        obj_fn = self.compile(node.obj)
+        value_fn = self.compile(node.value)
+        name = node.name
+
+        def setattr_(ctx):
+            obj = obj_fn(ctx)
+            if hasattr(obj, name):
+                value = value_fn(ctx)
+                setattr(obj, name, value)
+                return value
+            raise AttributeError(f"Atributo {name} não encontrado no objeto {type(obj).__name__}")
+
+        return setattr_
+
+    #
+    # COMANDOS
+    #
+    def compile_block(self, node: ast.Program | ast.Block) -> Thunk:
+        if isinstance(node, ast.Program):
+            stmts = tuple(map(self.compile, node.stmts))
+            slots = {}
+        else:
+            stmts = tuple(map(self.compile, node.statements))
+            slots = node.slots
+
+        if slots is None:
+            def block(ctx):
+                ctx = ctx.push({})
+                for stmt in stmts:
+                    stmt(ctx)
+
+        elif slots:
+            def block(ctx):
+                ctx = SlotCtx(slots, ctx)
+                for stmt in stmts:
+                    stmt(ctx)
+
+        else:
+            def block(ctx):
+                for stmt in stmts:
+                    stmt(ctx)
+
+        return block
+
+    def compile_vardef(self, node: ast.VarDef) -> Thunk:
+        expr = self.compile(node.expr)
+        name = node.name
+        slot = node.slot
+        if slot is None:
+            return lambda ctx: ctx.var_def(name, expr(ctx))
+        return lambda ctx: ctx.slot_def(slot, expr(ctx))
+
+    def compile_if(self, node: ast.If) -> Thunk:
+        cond = self.compile(node.cond)
+        then = self.compile(node.then)
+        not_then = self.compile(node.not_then)
+
+        def if_(ctx):
+            value = cond(ctx)
+            if value is None or value is False:
+                not_then(ctx)
+            else:
+                then(ctx)
+
+        return if_
+
+    def compile_while(self, node: ast.While) -> Thunk:
+        cond = self.compile(node.cond)
+        body = self.compile(node.then)
+
+        def while_(ctx):
+            while True:
+                value = cond(ctx)
+                if value is None or value is False:
+                    return
+                body(ctx)
+
+        return while_
+
+    def compile_print(self, node: ast.Print) -> Thunk:
+        expr = self.compile(node.expr)
+        return lambda ctx: op.print(expr(ctx))
+
+    def compile_return(self, node: ast.Return) -> Thunk:
+        if node.tail:
+            return self.compile_tail_call(node.expr)
+
+        expr = self.compile(node.expr)
+
+        def return_(ctx):
+            raise LoxReturn(expr(ctx))
+
+        return return_
+
+    def compile_tail_call(self, node: ast.Call) -> Thunk:
+        callee = self.compile(node.node)
+        args = [self.compile(arg) for arg in node.args]
+
+        def tail_call(ctx):
+            func = callee(ctx)
+            values = [arg(ctx) for arg in args]
+            if type(func) is ClosureFunction:
+                raise LoxReturn(Completion(func, values))
+            if callable(func):
+                raise LoxReturn(func(*values))
+            raise TypeError(f"{node.node.name} não é uma função!")
+
+        return tail_call
+
+    def compile_function(self, node: ast.Function) -> Thunk:
+        body = self.compile(node.body)
+        name = node.identifier
+        args = node.args
+        params = node.params
+        slot = node.slot
+        memo = node.memo
+
+        def function(ctx):
+            fn = ClosureFunction(name, args, [node.body], ctx, params, body)
+            if memo is not None:
+                fn = MemoFunction(fn, memo)
+            if slot is None:
+                ctx.var_def(name, fn)
+            else:
+                ctx.slot_def(slot, fn)
+            return fn
+
+        return function
+
+
+def compile_closure(node: Node) -> Thunk:
+    """
+    Compila a árvore sintática para uma closure que executa o programa.
+
+    A closure recebe o contexto de execução e retorna o mesmo valor que
+    `node.eval(ctx)` retornaria.
+    """
+    return ClosureCompiler().compile(node)
+
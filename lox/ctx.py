@@ -32,6 +32,18 @@ class _Builtins(dict):
 BUILTINS = _Builtins()
 
 
+class _Undefined:
+    """
+    Marca slots de variáveis locais que ainda não foram declaradas.
+    """
+
+    def __repr__(self) -> str:
+        return "<undefined>"
+
+
+UNDEFINED = _Undefined()
+
+
 @dataclass
 class Ctx:
     """
@@ -42,6 +54,11 @@ class Ctx:
     scope: ScopeDict = field(default_factory=dict)
     parent: Optional["Ctx"] = field(default_factory=lambda: Ctx(BUILTINS, None))
 
+    # Incrementado sempre que um nome novo é criado num escopo baseado em
+    # dicionário. Os caches de busca de variáveis globais (ver `Var.eval`)
+    # continuam válidos enquanto a versão não muda.
+    version = 0
+
     @classmethod
     def from_dict(cls, env: ScopeDict) -> "Ctx":
         """
@@ -80,10 +97,30 @@ class Ctx:
         """
         Define uma variável no contexto atual.
         """
-        if name in self.scope and not self.is_global():
-            raise KeyError(f"Variable '{name}' already defined in the current scope.")
+        if name in self.scope:
+            if not self.is_global():
+                raise KeyError(f"Variable '{name}' already defined in the current scope.")
+        else:
+            # Um nome novo pode esconder outro de um escopo externo
+            Ctx.version += 1
         self.scope[name] = value
 
+    def find_scope(self, name: str) -> ScopeDict | None:
+        """
+        Retorna o dicionário do escopo onde a variável está definida.
+
+        Retorna None se a variável não existe ou se a busca passa por um escopo
+        que não é baseado em dicionário.
+        """
+        ctx: Ctx | None = self
+        while ctx is not None:
+            if isinstance(ctx, SlotCtx):
+                return None
+            if name in ctx.scope:
+                return ctx.scope
+            ctx = ctx.parent
+        return None
+
     def to_dict(self) -> ScopeDict:
         """
         Converte o contexto para um dicionário.
@@ -137,6 +174,113 @@ class Ctx:
             return False
         return self.parent.parent is None
 
+    @property
+    def globals(self) -> "Ctx":
+        """
+        Contexto onde começa a busca por variáveis globais: o escopo baseado
+        em dicionário mais interno.
+        """
+        return self
+
+    @property
+    def frames(self) -> tuple[list["Value"], ...]:
+        """
+        Listas de valores dos escopos locais (`SlotCtx`) visíveis a partir
+        deste contexto, do mais externo para o mais interno.
+
+        Escopos baseados em dicionário não possuem slots, então apenas repassam
+        os frames do pai.
+        """
+        if self.parent is None:
+            return ()
+        return self.parent.frames
+
+
+class SlotCtx(Ctx):
+    """
+    Escopo local cujas variáveis ficam em posições fixas (slots) de uma lista,
+    em vez de um dicionário.
+
+    As posições são calculadas estaticamente pelo resolvedor (ver
+    `lox.resolver`). O atributo `frames` guarda as listas de valores de todos os
+    escopos locais acima deste, de modo que uma variável declarada `depth`
+    escopos acima é lida diretamente com `frames[-1 - depth][slot]`, sem
+    percorrer a cadeia de pais.
+
+    O acesso por nome (`ctx["x"]`, `"x" in ctx`, etc.) continua funcionando para
+    nós que não foram resolvidos.
+    """
+
+    # Sobrescrevem as propriedades de Ctx: aqui os frames e o contexto global
+    # são calculados uma única vez, no construtor, e guardados na instância.
+    frames = ()
+    globals = None
+
+    def __init__(
+        self,
+        names: dict[str, int],
+        parent: Ctx,
+        values: list["Value"] | None = None,
+    ):
+        self.names = names
+        self.values = [UNDEFINED] * len(names) if values is None else values
+        self.parent = parent
+        self.frames = (*parent.frames, self.values)  # type: ignore[misc]
+        self.globals = parent.globals  # type: ignore[misc]
+
+    @property
+    def scope(self) -> ScopeDict:  # type: ignore[override]
+        """
+        Dicionário com as variáveis já declaradas neste escopo.
+        """
+        values = self.values
+        return {
+            name: values[i]
+            for name, i in self.names.items()
+            if values[i] is not UNDEFINED
+        }
+
+    def __repr__(self) -> str:
+        return f"SlotCtx(scope={self.scope!r}, parent={self.parent!r})"
+
+    def __getitem__(self, name: str) -> "Value":
+        i = self.names.get(name)
+        if i is not None and (value := self.values[i]) is not UNDEFINED:
+            return value
+        return self.parent[name]  # type: ignore[index]
+
+    def __setitem__(self, name: str, value: "Value") -> None:
+        i = self.names.get(name)
+        if i is not None and self.values[i] is not UNDEFINED:
+            self.values[i] = value
+        else:
+            self.parent[name] = value  # type: ignore[index]
+
+    def __contains__(self, name: str) -> bool:
+        i = self.names.get(name)
+        if i is not None and self.values[i] is not UNDEFINED:
+            return True
+        return name in self.parent  # type: ignore[operator]
+
+    def var_def(self, name: str, value: "Value") -> None:
+        """
+        Define uma variável no contexto atual a partir do nome.
+        """
+        try:
+            i = self.names[name]
+        except KeyError:
+            raise KeyError(f"Variable '{name}' has no slot in the current scope.")
+        self.slot_def(i, value)
+
+    def slot_def(self, slot: int, value: "Value") -> None:
+        """
+        Define a variável armazenada na posição `slot` do escopo atual.
+        """
+        if self.values[slot] is not UNDEFINED:
+            name = next(k for k, v in self.names.items() if v == slot)
+            raise KeyError(f"Variable '{name}' already defined in the current scope.")
+        self.values[slot] = value
+
 
 def pretty_scope(env: ScopeDict, index: int) -> str:
     """
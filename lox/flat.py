@@ -0,0 +1,393 @@
+"""
+Representação compacta da árvore sintática em vetores paralelos.
+
+Programas gerados automaticamente podem ter milhões de nós, e um objeto Python
+por nó custa caro. `FlatProgram` guarda a mesma árvore em quatro vetores do
+módulo `array`, com uma posição por nó:
+
+- `kinds`: índice da classe do nó em `classes`;
+- `data`: índice em `constants` da tupla com os campos que não são nós
+  (nomes, valores literais, operadores, listas de parâmetros), seguidos do
+  tamanho e do tipo de cada lista de filhos;
+- `offsets`: posição dos filhos do nó em `children` (os filhos do nó `i`
+  são `children[offsets[i]:offsets[i + 1]]`);
+- `children`: índices dos filhos, na ordem dos campos.
+
+Os nós são numerados em pós-ordem (os filhos antes dos pais), de modo que a
+raiz é o último nó. Valores e nomes repetidos ocupam uma única entrada de
+`constants`, e nomes iguais são representados pelo mesmo objeto.
+
+    >>> flat = from_program(parse("var x = 1 + 2; print x;"))  # doctest: +SKIP
+    >>> to_program(fold_constants(flat))  # doctest: +SKIP
+    Program(stmts=[VarDef(name='x', expr=Literal(value=3.0)), Print(expr=Var(name='x'))])
+
+A serialização (`FlatProgram.to_bytes` e `FlatProgram.write`) grava os vetores
+diretamente, e `FlatProgram.from_buffer` os lê sem cópia a partir de qualquer
+buffer (`bytes`, `mmap`...): só a tabela de constantes passa pelo pickle. Os
+vetores usam a ordem de bytes da máquina.
+
+Somente os campos declarados são representados: as anotações do resolvedor e
+da memoização (ver `lox.node.annotation`) não são preservadas.
+"""
+
+import pickle
+import struct
+from array import array
+from dataclasses import dataclass, fields, is_dataclass
+from functools import cache
+from typing import IO, Any, Sequence, get_origin
+
+from .ast import BinOp, Literal, UnaryOp
+from .node import Node, child_fields, node_fields
+
+# Cabeçalho do formato serializado: assinatura e tamanhos das seções
+MAGIC = b"LOXFLAT1"
+HEADER = struct.Struct("<8sQQQ")
+
+# Operações do plano de construção de cada classe (ver `layout`)
+SCALAR, CHILD, LIST = range(3)
+
+# Tipos de valores literais que o otimizador pode produzir
+LITERAL_TYPES = (float, str, bool, type(None))
+
+
+@dataclass
+class FlatProgram:
+    """
+    Árvore sintática armazenada em vetores paralelos.
+    """
+
+    kinds: Sequence[int]
+    data: Sequence[int]
+    offsets: Sequence[int]
+    children: Sequence[int]
+    classes: tuple[type[Node], ...]
+    constants: list[tuple]
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def root(self) -> int:
+        return len(self.kinds) - 1
+
+    def node_class(self, index: int) -> type[Node]:
+        return self.classes[self.kinds[index]]
+
+    def values(self, index: int) -> tuple:
+        """
+        Campos do nó que não são nós, seguidos do tamanho e do tipo de cada
+        lista de filhos.
+        """
+        return self.constants[self.data[index]]
+
+    def child_indices(self, index: int) -> Sequence[int]:
+        return self.children[self.offsets[index] : self.offsets[index + 1]]
+
+    def nbytes(self) -> int:
+        """
+        Memória ocupada pelos vetores, em bytes.
+        """
+        return sum(
+            len(vector) * memoryview(vector).itemsize
+            for vector in (self.kinds, self.data, self.offsets, self.children)
+        )
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializa o programa (ver `write`).
+        """
+        parts: list[Any] = []
+        self.write_parts(parts.append)
+        return b"".join(parts)
+
+    def write(self, file: IO[bytes]) -> None:
+        """
+        Grava o programa no arquivo binário, sem copiar os vetores.
+        """
+        self.write_parts(file.write)
+
+    def write_parts(self, write) -> None:
+        meta = pickle.dumps((self.classes, self.constants), pickle.HIGHEST_PROTOCOL)
+        padding = -(HEADER.size + len(meta)) % 4
+        write(HEADER.pack(MAGIC, len(meta), len(self.kinds), len(self.children)))
+        write(meta)
+        write(bytes(padding))
+        # Os vetores de 4 bytes vêm antes de `kinds` para ficarem alinhados
+        for vector in (self.data, self.offsets, self.children, self.kinds):
+            write(memoryview(vector).cast("B"))
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "FlatProgram":
+        """
+        Lê um programa serializado. Os vetores do resultado são `memoryview`s
+        do próprio buffer, que deve continuar válido enquanto o programa for
+        usado.
+        """
+        view = memoryview(buffer).cast("B")
+        magic, meta_size, size, edges = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("os dados não contêm um programa Lox em vetores")
+        pos = HEADER.size
+        classes, constants = pickle.loads(view[pos : pos + meta_size])
+        pos += meta_size + (-(HEADER.size + meta_size) % 4)
+
+        def take(length: int, code: str):
+            nonlocal pos
+            itemsize = struct.calcsize(code)
+            vector = view[pos : pos + length * itemsize].cast(code)
+            pos += length * itemsize
+            return vector
+
+        data = take(size, "I")
+        offsets = take(size + 1, "I")
+        children = take(edges, "I")
+        kinds = take(size, "B")
+        return cls(kinds, data, offsets, children, tuple(classes), constants)
+
+
+class FlatBuilder:
+    """
+    Constrói um `FlatProgram` nó a nó, em pós-ordem.
+    """
+
+    def __init__(self, classes: Sequence[type[Node]] = (), constants: Sequence[tuple] = ()):
+        self.kinds = array("B")
+        self.data = array("I")
+        self.offsets = array("I", [0])
+        self.children = array("I")
+        self.classes: list[type[Node]] = []
+        self.class_index: dict[type[Node], int] = {}
+        self.constants: list[tuple] = []
+        self.constant_index: dict[tuple, int] = {}
+        # Strings e tuplas já vistas (ver `intern`)
+        self.shared: dict[Any, Any] = {}
+        for node_cls in classes:
+            self.kind(node_cls)
+        for values in constants:
+            self.constant(values)
+
+    def kind(self, cls: type[Node]) -> int:
+        try:
+            return self.class_index[cls]
+        except KeyError:
+            if len(self.classes) == 256:
+                raise ValueError("número máximo de classes de nós excedido")
+            self.classes.append(cls)
+            index = self.class_index[cls] = len(self.classes) - 1
+            return index
+
+    def constant(self, values: tuple) -> int:
+        # O tipo faz parte da chave: 1.0, 1 e True são iguais para o Python
+        key = tuple((type(value), value) for value in values)
+        try:
+            return self.constant_index[key]
+        except KeyError:
+            self.constants.append(values)
+            index = self.constant_index[key] = len(self.constants) - 1
+            return index
+
+    def intern(self, value: Any) -> Any:
+        """
+        Retorna uma versão compartilhada do valor: strings iguais viram o mesmo
+        objeto, e listas de strings (ex.: parâmetros de funções) viram tuplas
+        únicas.
+        """
+        if isinstance(value, (list, tuple)):
+            value = tuple(self.intern(item) for item in value)
+            # Tuplas com outros valores não são compartilhadas: (1.0,) == (True,)
+            if not all(isinstance(item, str) for item in value):
+                return value
+        elif not isinstance(value, str):
+            return value
+        return self.shared.setdefault(value, value)
+
+    def add(self, cls: type[Node], values: tuple, children: Sequence[int]) -> int:
+        """
+        Acrescenta um nó cujos filhos já foram acrescentados e retorna o seu índice.
+        """
+        self.kinds.append(self.kind(cls))
+        self.data.append(self.constant(values))
+        self.children.extend(children)
+        self.offsets.append(len(self.children))
+        return len(self.kinds) - 1
+
+    def build(self) -> FlatProgram:
+        return FlatProgram(
+            self.kinds,
+            self.data,
+            self.offsets,
+            self.children,
+            tuple(self.classes),
+            self.constants,
+        )
+
+
+@cache
+def layout(cls: type[Node]) -> tuple[tuple[int, bool], ...]:
+    """
+    Plano de construção dos nós da classe: uma dupla `(operação, lista)` por
+    campo, na ordem do construtor.
+
+    A operação é `SCALAR` (valor em `constants`), `CHILD` (um filho) ou `LIST`
+    (lista de filhos, com o tamanho e o tipo em `constants`). `lista` indica
+    se o campo é declarado como lista.
+    """
+    if not is_dataclass(cls):
+        raise TypeError(f"{cls.__name__} não é uma dataclass e não pode ser representado em vetores")
+    types = {f.name: f.type for f in fields(cls)}
+    children = child_fields(cls)
+    plan = []
+    for name in node_fields(cls):
+        is_list = get_origin(types[name]) in (list, tuple)
+        if name not in children:
+            plan.append((SCALAR, is_list))
+        else:
+            plan.append((LIST if is_list else CHILD, is_list))
+    return tuple(plan)
+
+
+def from_program(tree: Node) -> FlatProgram:
+    """
+    Converte a árvore sintática para a representação em vetores.
+    """
+    builder = FlatBuilder()
+    # Índices dos nós já convertidos, na ordem em que os pais os consomem
+    done: list[int] = []
+    pending: list[tuple[Node, int]] = [(tree, -1)]
+    while pending:
+        node, count = pending.pop()
+        cls = type(node)
+        if count < 0:
+            kids = flat_children(node)
+            pending.append((node, len(kids)))
+            pending.extend((kid, -1) for kid in reversed(kids))
+            continue
+
+        values = []
+        lengths = []
+        for name, (op, _) in zip(node_fields(cls), layout(cls)):
+            value = getattr(node, name)
+            if op == SCALAR:
+                values.append(builder.intern(value))
+            elif op == LIST:
+                lengths.extend((len(value), type(value)))
+        kids = done[len(done) - count :]
+        del done[len(done) - count :]
+        done.append(builder.add(cls, (*values, *lengths), kids))
+    return builder.build()
+
+
+def flat_children(node: Node) -> list[Node]:
+    """
+    Filhos do nó na ordem dos campos, verificando se o nó pode ser convertido.
+    """
+    cls = type(node)
+    kids = []
+    for name, (op, _) in zip(node_fields(cls), layout(cls)):
+        if op == SCALAR:
+            continue
+        value = getattr(node, name)
+        items = value if op == LIST else [value]
+        for item in items:
+            if not isinstance(item, Node):
+                raise TypeError(f"{cls.__name__}.{name} contém {item!r}, que não é um nó")
+            kids.append(item)
+    return kids
+
+
+def to_program(flat: FlatProgram) -> Node:
+    """
+    Reconstrói a árvore sintática a partir da representação em vetores.
+    """
+    kinds, data, offsets, children = flat.kinds, flat.data, flat.offsets, flat.children
+    classes, constants = flat.classes, flat.constants
+    nodes: list[Node] = []
+    for index in range(len(kinds)):
+        cls = classes[kinds[index]]
+        values = constants[data[index]]
+        kids = [nodes[kid] for kid in children[offsets[index] : offsets[index + 1]]]
+        plan = layout(cls)
+        # O tamanho e o tipo (lista ou tupla) de cada lista de filhos vêm
+        # depois dos valores escalares
+        scalar = 0
+        length = sum(op == SCALAR for op, _ in plan)
+        kid = 0
+        args = []
+        for op, is_list in plan:
+            if op == SCALAR:
+                value = values[scalar]
+                args.append(list(value) if is_list else value)
+                scalar += 1
+            elif op == CHILD:
+                args.append(kids[kid])
+                kid += 1
+            else:
+                size, container = values[length : length + 2]
+                items = kids[kid : kid + size]
+                args.append(items if container is list else container(items))
+                kid += size
+                length += 2
+        nodes.append(cls(*args))
+    return nodes[-1]
+
+
+def fold_constants(flat: FlatProgram) -> FlatProgram:
+    """
+    Avalia as operações com operandos literais diretamente nos vetores.
+
+    Cada `BinOp` ou `UnaryOp` cujos operandos são literais (ou se tornam
+    literais) é substituído por um `Literal` com o resultado. Operações que
+    falham (ex.: `1 / 0` ou `-"a"`) são mantidas, para que o erro aconteça
+    durante a execução. Retorna um novo programa sem os nós descartados.
+    """
+    kinds, data, offsets, children = flat.kinds, flat.data, flat.offsets, flat.children
+    classes, constants = flat.classes, flat.constants
+
+    # Valor literal de cada nó que é ou se torna um literal. Como os filhos
+    # vêm antes dos pais, uma única passada basta.
+    literal: dict[int, Any] = {}
+    folded: set[int] = set()
+    for index in range(len(kinds)):
+        cls = classes[kinds[index]]
+        if cls is Literal:
+            literal[index] = constants[data[index]][0]
+            continue
+        if issubclass(cls, BinOp):
+            left, right = children[offsets[index] : offsets[index + 1]]
+            if left not in literal or right not in literal:
+                continue
+            operands = (literal[left], literal[right])
+        elif issubclass(cls, UnaryOp):
+            (expr,) = children[offsets[index] : offsets[index + 1]]
+            if expr not in literal:
+                continue
+            operands = (literal[expr],)
+        else:
+            continue
+        try:
+            value = constants[data[index]][0](*operands)
+        except Exception:
+            continue
+        if isinstance(value, LITERAL_TYPES):
+            literal[index] = value
+            folded.add(index)
+
+    # Copia os nós alcançáveis a partir da raiz, sem descer nos nós avaliados
+    builder = FlatBuilder(classes, constants)
+    done: list[int] = []
+    pending: list[tuple[int, int]] = [(flat.root, -1)]
+    while pending:
+        index, count = pending.pop()
+        if index in folded:
+            done.append(builder.add(Literal, (literal[index],), ()))
+            continue
+        kids = children[offsets[index] : offsets[index + 1]]
+        if count < 0:
+            pending.append((index, len(kids)))
+            pending.extend((kid, -1) for kid in reversed(kids))
+            continue
+        new_kids = done[len(done) - count :]
+        del done[len(done) - count :]
+        done.append(builder.add(classes[kinds[index]], constants[data[index]], new_kids))
+    return builder.build()
@@ -0,0 +1,128 @@
+"""
+Análise sintática incremental de programas Lox.
+
+Um editor (ou o REPL) que analisa o arquivo inteiro a cada alteração refaz
+quase todo o trabalho à toa: as declarações de nível superior de um programa
+Lox são independentes entre si, e uma edição normalmente afeta só uma delas.
+
+`parse_incremental` divide o código fonte em segmentos, um por declaração de
+nível superior, e guarda essa divisão no próprio `Program` (atributos
+`source` e `segments`). `reparse` aplica uma edição de texto ao programa:
+apenas os segmentos atingidos são analisados de novo, e os comandos
+resultantes substituem os antigos em `Program.stmts`. Os nós das demais
+declarações são preservados.
+
+    >>> program = parse_incremental("var x = 1;\\nprint x;")
+    >>> reparse(program, 8, 9, "42")  # troca "1" por "42"
+    Program(stmts=[VarDef(name='x', expr=Literal(value=42.0)), Print(expr=Var(name='x'))])
+
+Os segmentos cobrem todo o código fonte: espaços e comentários antes de uma
+declaração pertencem ao segmento dela. Uma declaração termina num `;` ou `}`
+fora de parênteses e chaves, exceto quando seguida de `else`.
+"""
+
+from dataclasses import dataclass
+from typing import Iterator
+
+from .ast import Program, Stmt
+from .parser import lex, parse
+
+
+@dataclass
+class Segment:
+    """
+    Trecho do código fonte com uma declaração de nível superior.
+    """
+
+    # Tamanho do trecho, em caracteres
+    length: int
+
+    # Número de comandos produzidos pelo trecho em `Program.stmts`
+    count: int
+
+
+def parse_incremental(src: str) -> Program:
+    """
+    Analisa o código fonte e prepara o programa para `reparse`.
+    """
+    program = Program([])
+    program.source = ""
+    program.segments = []
+    return reparse(program, 0, 0, src)
+
+
+def reparse(program: Program, start: int, end: int, text: str) -> Program:
+    """
+    Substitui `program.source[start:end]` por `text` e atualiza a árvore.
+
+    O programa deve ter sido criado por `parse_incremental`. A árvore é
+    modificada no lugar e também retornada. Em caso de erro de sintaxe a
+    exceção é propagada e o programa não é alterado.
+    """
+    old = program.source
+    if not 0 <= start <= end <= len(old):
+        raise ValueError(f"edição fora do código fonte: [{start}, {end})")
+    src = old[:start] + text + old[end:]
+    delta = len(text) - (end - start)
+    segments: list[Segment] = program.segments
+
+    # Primeiro segmento atingido: o que contém `start` ou termina nele (uma
+    # inserção logo depois de um `;` pode estender a declaração anterior).
+    first = 0
+    seg_start = 0
+    stmt_start = 0
+    while first < len(segments) and seg_start + segments[first].length < start:
+        seg_start += segments[first].length
+        stmt_start += segments[first].count
+        first += 1
+
+    # Divide o texto a partir do primeiro segmento atingido até reencontrar
+    # uma fronteira antiga depois da edição; dali em diante nada muda. As
+    # fronteiras antigas são percorridas junto com as novas, já deslocadas
+    # para o novo texto.
+    new_segments: list[Segment] = []
+    new_stmts: list[Stmt] = []
+    last = first
+    old_end = seg_start
+    pos = seg_start
+    for boundary in boundaries(src, seg_start):
+        stmts = parse(src[pos:boundary], cache=False).stmts
+        new_segments.append(Segment(boundary - pos, len(stmts)))
+        new_stmts.extend(stmts)
+        pos = boundary
+        while last < len(segments) and (old_end <= end or old_end + delta < boundary):
+            old_end += segments[last].length
+            last += 1
+        if boundary >= start + len(text) and old_end > end and old_end + delta == boundary:
+            break
+    else:
+        last = len(segments)
+
+    stmt_end = stmt_start + sum(segment.count for segment in segments[first:last])
+    program.stmts[stmt_start:stmt_end] = new_stmts
+    segments[first:last] = new_segments
+    program.source = src
+    return program
+
+
+def boundaries(src: str, start: int) -> Iterator[int]:
+    """
+    Gera as posições em que terminam as declarações de nível superior a partir
+    de `start`. A última declaração termina sempre em `len(src)`.
+    """
+    depth = 0
+    pending = None
+    for token in lex(src[start:]):
+        if pending is not None:
+            if token.value != "else":
+                yield pending
+            pending = None
+        if token.value in ("(", "{"):
+            depth += 1
+        elif token.value in (")", "}"):
+            depth -= 1
+        if depth == 0 and token.value in (";", "}"):
+            pending = start + token.end_pos
+
+    # Espaços e comentários finais ficam no último segmento
+    yield len(src)
@@ -0,0 +1,219 @@
+"""
+Analisador léxico do Lox.
+
+Os tokens da linguagem são poucos e simples, então em vez do lexer genérico
+do Lark usamos uma única expressão regular com um grupo por categoria de
+token. Palavras reservadas e pontuação são reconhecidas por busca numa tabela
+montada a partir dos terminais da gramática, de modo que os tipos dos tokens
+(`VAR`, `PRINT`, `__ANON_0`, ...) são exatamente os que o parser espera.
+
+O resultado é idêntico ao do lexer do Lark, inclusive posições, linhas e
+colunas e as peculiaridades da gramática: `truex` é lido como `true` seguido
+de `x`, pois `BOOL` tem prioridade maior que `VAR`. Durante a análise
+sintática, palavras reservadas fora do lugar são lidas como nomes e, onde
+nomes não são aceitos, uma palavra reservada aceita é separada do início do
+nome (`1 andfalse` é `1 and false`), como faz o lexer contextual do Lark (ver
+`LoxLexer`). Os erros também são os mesmos: um
+token fora do lugar é reportado pelo lexer, com os terminais esperados e o
+último token lido.
+
+Com `LOX_LEXER=lark` o Lox volta a usar o lexer do Lark.
+"""
+
+import re
+from typing import Iterator
+
+from .standalone import Lexer, Token, UnexpectedCharacters, UnexpectedToken
+
+# Uma alternativa por categoria, na ordem de prioridade do Lark. `BOOL`, `NIL`,
+# palavras reservadas e `VAR` compartilham o grupo `name` e são separados em
+# `LoxLexer.name_token`.
+TOKEN_RE = re.compile(
+    r"""
+    (?P<ignore> \s+ | //[^\n]* )
+    | (?P<NUMBER> (?:[1-9][0-9]*|0) (?:\.[0-9]+)? )
+    | (?P<STRING> "[^"]*" )
+    | (?P<name> [a-z_]\w* )
+    | (?P<symbol> == | != | >= | <= | [-+*/!=<>(){};,.] )
+    """,
+    re.VERBOSE,
+)
+
+# `BOOL` e `NIL` têm prioridade maior que `VAR` e casam com prefixos de nomes
+PREFIX_RE = re.compile(r"(?P<BOOL>false|true)|(?P<NIL>nil)")
+PREFIXES = ("false", "true", "nil")
+
+# Terminais reconhecidos diretamente pelos grupos das expressões regulares
+REGEX_TERMINALS = {"NUMBER", "STRING", "BOOL", "NIL", "VAR"}
+
+
+class LoxLexer(Lexer):
+    """
+    Lexer do Lox, no formato de lexer customizado do Lark.
+
+    Durante a análise sintática o lexer recebe o estado do parser e, como o
+    lexer contextual do Lark, só produz palavras reservadas, `true`, `false`
+    e `nil` onde o parser as aceita: em `var if = 1;` o `if` é um `VAR`, e em
+    `print 1 ortrue;` o `ortrue` é lido como `or` seguido de `true`.
+    """
+
+    __future_interface__ = True
+
+    def __init__(self, lexer_conf):
+        # Tabela texto -> tipo do token para palavras reservadas e pontuação
+        self.literals: dict[str, str] = {}
+        self.terminals_by_name = lexer_conf.terminals_by_name
+        self.ignore = set(lexer_conf.ignore)
+        for terminal in lexer_conf.terminals:
+            if terminal.name in REGEX_TERMINALS or terminal.name in lexer_conf.ignore:
+                continue
+            if terminal.pattern.type != "str":
+                raise ValueError(f"terminal não suportado pelo lexer do Lox: {terminal.name}")
+            self.literals[terminal.pattern.value] = terminal.name
+
+        # Palavras reservadas que o Lark reconhece como casos particulares de
+        # `VAR` e omite das mensagens de erro quando `VAR` é aceito
+        var = lexer_conf.terminals_by_name["VAR"]
+        var_re = re.compile(var.pattern.to_regexp())
+        self.keywords = {
+            name
+            for value, name in self.literals.items()
+            if self.terminals_by_name[name].priority == var.priority and var_re.fullmatch(value)
+        }
+
+        # Palavras reservadas que podem iniciar um nome, da maior para a menor
+        self.name_literals = sorted(
+            ((value, name) for value, name in self.literals.items() if var_re.fullmatch(value)),
+            key=lambda item: -len(item[0]),
+        )
+
+    def make_lexer_state(self, text: str) -> str:
+        return text
+
+    def lex(self, state: str, parser_state=None) -> Iterator[Token]:
+        return self.tokenize(state, parser_state)
+
+    def name_token(self, value: str, accepted) -> tuple[str, str]:
+        """
+        Retorna o tipo e o texto do token que começa com o nome dado.
+
+        `accepted` contém os terminais aceitos pelo parser na posição atual,
+        ou é None fora da análise sintática.
+        """
+        prefix = PREFIX_RE.match(value)
+        if prefix is not None and (accepted is None or prefix.lastgroup in accepted):
+            return prefix.lastgroup, prefix.group()
+        keyword = self.literals.get(value)
+        if keyword is not None and (accepted is None or keyword in accepted):
+            return keyword, value
+        if accepted is None or "VAR" in accepted:
+            return "VAR", value
+        # Sem `VAR`, o lexer contextual do Lark separa do nome uma palavra
+        # reservada aceita que seja seu prefixo: `andfalse` é `and false`
+        for literal, name in self.name_literals:
+            if name in accepted and value.startswith(literal):
+                return name, literal
+        # Nenhuma interpretação é aceita: o parser reporta o erro
+        return self.name_token(value, None)
+
+    def allowed(self, parser_state) -> set[str]:
+        """
+        Terminais esperados na posição atual, como o lexer do Lark os reporta.
+
+        O conjunto é montado na mesma ordem que no Lark, para que as mensagens
+        de erro sejam idênticas: `LOX_LEXER=lark` só muda a implementação.
+        """
+        if parser_state is None:
+            names = self.terminals_by_name
+        else:
+            names = set(parser_state.parse_conf.parse_table.states[parser_state.position]) | self.ignore
+        terminals = [self.terminals_by_name[name] for name in names if name in self.terminals_by_name]
+        terminals.sort(key=lambda t: (-t.priority, -t.pattern.max_width, -len(t.pattern.value), t.name))
+        if any(t.name == "VAR" for t in terminals):
+            terminals = [t for t in terminals if t.name not in self.keywords]
+        return {t.name for t in terminals} - self.ignore or {"<END-OF-FILE>"}
+
+    def unexpected_characters(self, text: str, pos: int, line: int, column: int, last, parser_state):
+        """
+        Erro para um caractere que não inicia nenhum token.
+        """
+        return UnexpectedCharacters(
+            text,
+            pos,
+            line,
+            column,
+            allowed=self.allowed(parser_state),
+            state=parser_state,
+            token_history=last and [last],
+            terminals_by_name=self.terminals_by_name,
+        )
+
+    def unexpected_token(self, token: Token, last, parser_state):
+        """
+        Erro para um token que o parser não aceita na posição atual.
+
+        Como o lexer contextual do Lark, o erro é produzido pelo lexer, com o
+        último token lido, e não pelo parser.
+        """
+        return UnexpectedToken(
+            token,
+            self.allowed(parser_state),
+            state=parser_state,
+            token_history=[last],
+            terminals_by_name=self.terminals_by_name,
+        )
+
+    def tokenize(self, text: str, parser_state=None) -> Iterator[Token]:
+        literals = self.literals
+        match = TOKEN_RE.match
+        new_token = Token.__new__
+        states = parser_state.parse_conf.parse_table.states if parser_state is not None else None
+        pos = 0
+        line = 1
+        line_start = 0
+        end = len(text)
+        last = None
+        while pos < end:
+            m = match(text, pos)
+            if m is None:
+                raise self.unexpected_characters(text, pos, line, pos - line_start + 1, last, parser_state)
+            kind = m.lastgroup
+            value = m.group()
+            start = pos
+            pos = m.end()
+
+            if kind == "name":
+                kind = literals.get(value, "VAR")
+                # Caso comum: o nome não começa com `true`, `false` ou `nil` e
+                # o tipo é aceito pelo parser
+                if value.startswith(PREFIXES) or (states is not None and kind not in states[parser_state.position]):
+                    accepted = states[parser_state.position] if states is not None else None
+                    kind, value = self.name_token(value, accepted)
+                    pos = start + len(value)
+            elif kind == "symbol":
+                kind = literals[value]
+                # `==` onde o parser só aceita `=`: o Lark lê o símbolo menor
+                if len(value) == 2 and states is not None and kind not in states[parser_state.position]:
+                    shorter = literals[value[0]]
+                    if shorter in states[parser_state.position]:
+                        kind, value = shorter, value[0]
+                        pos = start + 1
+            elif kind == "ignore":
+                newlines = value.count("\n")
+                if newlines:
+                    line += newlines
+                    line_start = start + value.rindex("\n") + 1
+                continue
+
+            column = start - line_start + 1
+            if kind == "STRING" and "\n" in value:
+                end_line = line + value.count("\n")
+                line_start = start + value.rindex("\n") + 1
+                token = new_token(Token, kind, value, start, line, column, end_line, pos - line_start + 1, pos)
+                line = end_line
+            else:
+                token = new_token(Token, kind, value, start, line, column, line, column + len(value), pos)
+            if states is not None and kind not in states[parser_state.position]:
+                raise self.unexpected_token(token, last, parser_state)
+            last = token
+            yield token
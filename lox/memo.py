@@ -0,0 +1,182 @@
+"""
+Memoização automática de funções Lox puras.
+
+Uma função é pura quando o seu resultado depende apenas dos argumentos e a
+chamada não tem efeitos colaterais. A análise é conservadora: uma função só é
+considerada pura se o seu corpo
+
+- não contém `print`, atribuição de atributos (`Setattr`), acesso a
+  atributos, classes ou funções aninhadas;
+- só atribui a variáveis locais (parâmetros e variáveis declaradas no corpo);
+- só lê variáveis locais, outras funções puras e builtins puros;
+- só chama outras funções puras (inclusive ela mesma) e builtins puros.
+
+Funções e builtins usados por uma função pura não podem ser redeclarados nem
+reatribuídos em nenhum ponto do programa, para que o nome sempre se refira à
+mesma função.
+
+Uso:
+
+    >>> memo = Memoizer(maxsize=256)
+    >>> lox.eval(src, memoize=memo)  # doctest: +SKIP
+    >>> print(memo.report())  # doctest: +SKIP
+    fib: 19 acertos, 21 faltas, 21 resultados em cache
+"""
+
+from collections import Counter
+
+from . import ast
+from .node import Node
+from .runtime import FunctionCache
+
+# Builtins sem efeitos colaterais cujo resultado depende só dos argumentos
+PURE_BUILTINS = {"sqrt", "max"}
+
+EVICTION_POLICIES = ("lru", "fifo")
+
+
+class Memoizer:
+    """
+    Configuração e estatísticas da memoização numa execução.
+
+    Cada função pura recebe o seu próprio `FunctionCache`, com no máximo
+    `maxsize` resultados e a política de descarte `eviction`.
+    """
+
+    def __init__(self, maxsize: int | None = 128, eviction: str = "lru"):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"política de descarte desconhecida: {eviction!r}")
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("o tamanho do cache deve ser positivo")
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self.caches: list[FunctionCache] = []
+
+    @property
+    def hits(self) -> int:
+        return sum(cache.hits for cache in self.caches)
+
+    @property
+    def misses(self) -> int:
+        return sum(cache.misses for cache in self.caches)
+
+    def install(self, node: Node) -> list[ast.Function]:
+        """
+        Anota as funções puras da árvore com um cache novo e retorna a lista
+        dessas funções.
+        """
+        functions = pure_functions(node)
+        for function in functions:
+            function.memo = FunctionCache(function.identifier, self.maxsize, self.eviction)
+            self.caches.append(function.memo)
+        return functions
+
+    def stats(self) -> dict[str, tuple[int, int]]:
+        """
+        Retorna um dicionário nome -> (acertos, faltas).
+        """
+        return {cache.name: (cache.hits, cache.misses) for cache in self.caches}
+
+    def report(self) -> str:
+        """
+        Descrição legível das estatísticas de cada cache.
+        """
+        if not self.caches:
+            return "Nenhuma função pura encontrada."
+        return "\n".join(
+            f"{cache.name}: {cache.hits} acertos, {cache.misses} faltas, "
+            f"{len(cache.entries)} resultados em cache"
+            for cache in self.caches
+        )
+
+
+def pure_functions(node: Node) -> list[ast.Function]:
+    """
+    Retorna as funções puras declaradas na árvore.
+    """
+    functions: list[ast.Function] = []
+    declared: Counter[str] = Counter()
+    assigned: set[str] = set()
+    for child in node.descendants():
+        if isinstance(child, ast.Function):
+            functions.append(child)
+            declared[child.identifier] += 1
+            declared.update(child.args)
+        elif isinstance(child, ast.VarDef):
+            declared[child.name] += 1
+        elif isinstance(child, ast.Assign):
+            assigned.add(child.name.name)
+
+    def is_stable(name: str, count: int) -> bool:
+        return declared[name] == count and name not in assigned
+
+    builtins = {name for name in PURE_BUILTINS if is_stable(name, 0)}
+    candidates = {fn.identifier: fn for fn in functions if is_stable(fn.identifier, 1)}
+
+    # Ponto fixo: começamos supondo que todas são puras e removemos as que
+    # dependem de algo impuro, até nada mudar. Assim funções recursivas (e
+    # mutuamente recursivas) podem ser puras.
+    pure = set(candidates)
+    changed = True
+    while changed:
+        changed = False
+        for name in sorted(pure):
+            if not PurityChecker(pure | builtins).check(candidates[name]):
+                pure.discard(name)
+                changed = True
+
+    return [fn for fn in functions if fn.identifier in pure]
+
+
+class PurityChecker:
+    """
+    Verifica se o corpo de uma função satisfaz as condições de pureza.
+    """
+
+    def __init__(self, pure: set[str]):
+        # Funções e builtins puros visíveis como variáveis livres
+        self.pure = pure
+        self.scopes: list[set[str]] = []
+
+    def is_local(self, name: str) -> bool:
+        return any(name in scope for scope in self.scopes)
+
+    def check(self, function: ast.Function) -> bool:
+        self.scopes = [set(function.args)]
+        return self.visit(function.body)
+
+    def visit(self, node: Node) -> bool:
+        if isinstance(
+            node,
+            (ast.Print, ast.Setattr, ast.Getattr, ast.Function, ast.Class, ast.This, ast.Super),
+        ):
+            return False
+
+        if isinstance(node, ast.Var):
+            return self.is_local(node.name) or node.name in self.pure
+
+        if isinstance(node, ast.Assign):
+            return self.is_local(node.name.name) and self.visit(node.expr)
+
+        if isinstance(node, ast.Call):
+            # A função chamada precisa ser conhecida estaticamente
+            callee = node.node
+            if not isinstance(callee, ast.Var) or self.is_local(callee.name):
+                return False
+            return callee.name in self.pure and all(map(self.visit, node.args))
+
+        if isinstance(node, ast.VarDef):
+            # O inicializador é avaliado antes da declaração
+            if not self.visit(node.expr):
+                return False
+            self.scopes[-1].add(node.name)
+            return True
+
+        if isinstance(node, ast.Block):
+            self.scopes.append(set())
+            try:
+                return all(map(self.visit, node.statements))
+            finally:
+                self.scopes.pop()
+
+        return all(map(self.visit, node.children()))
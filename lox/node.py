@@ -5,8 +5,11 @@ Define estrutura de dados básicas para as árvores sintáticas.
 """
 
 from abc import ABC
-from dataclasses import dataclass, field
-from functools import singledispatch
+import copy
+import io
+from collections.abc import Callable as CallableABC
+from dataclasses import dataclass, field, fields, is_dataclass
+from functools import cache, singledispatch
 from types import BuiltinFunctionType, FunctionType, MethodDescriptorType, MethodType
 from typing import (
     TYPE_CHECKING,
@@ -16,11 +19,15 @@ from typing import (
     Iterable,
     Iterator,
     Optional,
+    TextIO,
     TypeVar,
     cast,
+    get_args,
+    get_origin,
 )
+from weakref import WeakSet
 
-from lark import Token, Tree
+from .standalone import Token, Tree
 
 if TYPE_CHECKING:
     from .ast import Class, Function
@@ -36,8 +43,14 @@ class Node(ABC):
     O módulo `abc` é usado para criar uma classe abstrata. Isso significa que
     não podemos instanciar essa classe diretamente. Em vez disso, devemos
     criar subclasses que implementem os métodos abstratos definidos aqui.
+
+    As subclasses são dataclasses com `slots=True`: os nós não têm
+    `__dict__`, e os métodos genéricos percorrem os campos a partir das
+    tabelas calculadas uma vez por classe em `node_fields` e `child_fields`.
     """
 
+    __slots__ = ()
+
     def eval(self, ctx):
         name = type(self).__name__
         raise NotImplementedError(f"Método eval não implementado para {name}!")
@@ -48,12 +61,9 @@ class Node(ABC):
 
         O parâmetro `indent` é usado para controlar a indentação da impressão.
         """
-        parts = []
-        for indent_level, line in self._pretty_lines():
-            parts.append(indent * indent_level * " ")
-            parts.append(line)
-            parts.append("\n")
-        return "".join(parts)
+        stream = io.StringIO()
+        self.pretty_to(stream, indent)
+        return stream.getvalue()
 
     def is_leaf(self) -> bool:
         """
@@ -61,7 +71,7 @@ class Node(ABC):
 
         Um nó é considerado uma folha se não tem filhos do tipo `Node`.
         """
-        for name in self.__annotations__:
+        for name in node_fields(type(self)):
             value = getattr(self, name)
             if isinstance(value, (Node, list, tuple, dict)):
                 return False
@@ -77,79 +87,45 @@ class Node(ABC):
         # O método `_pretty_lines` é um gerador. Cada yield retorna uma dupla com
         # o nível de indentação da linha e o conteúdo a ser impresso
         #
-        # No caso simples, imprimimos a classe usando str(self). Fazemos isso se
-        # a classe não tiver nenhum filho do tipo Node.
-        if can_print_as_leaf(self):
-            yield indent_level, str(self)
-            return
-
-        # No caso mais complexo, começamos com a linha de abertura, imprimindo
-        # o nome da classe e um parêntese de abertura
-        yield indent_level, str(self.__class__.__name__) + "("
-
-        # O attributo "__annotations__" é um dicionário que contém os nomes dos
-        # atributos declarados e seus tipos correspondentes. Vamos pegar os tipos
-        # na ordem de declaração e imprimir o nome e valores correspondentes
-        for attr in self.__annotations__:
-            # attr é o nome do atributo. Obtemos o valor do atributo usando a
-            # função `getattr` do Python
-            value = getattr(self, attr)
-
-            # Se o valor for um objeto do tipo `Node`, chamamos o método `pretty_lines`
-            # recursivamente. Caso contrário, usamos a implementação genérica
-            # do método `pretty`
-            if isinstance(value, Node):
-                yield from self._pretty_lines_node(attr + "=", value, indent_level)
-            elif isinstance(value, (list, tuple)):
-                yield from self._pretty_lines_list(attr, value, indent_level)
+        # Em vez de chamar `_pretty_lines` recursivamente para os filhos, usamos
+        # uma pilha explícita: árvores muito profundas (ex.: longas cadeias de
+        # `+`) não estouram o limite de recursão do Python. A pilha guarda um
+        # iterador por nó aberto (ver `pretty_fields`), que produz linhas
+        # prontas, como duplas (nível, texto), e filhos ainda não impressos,
+        # como quádruplas (nó, nível, final, prefixo da 1a linha). A memória
+        # usada é proporcional à profundidade, e não ao tamanho da árvore.
+        stack: list[Iterator[tuple]] = [iter([(self, indent_level, end, "")])]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+            elif len(item) == 2:
+                yield item
             else:
-                yield indent_level + 1, f"{attr}={pretty(value)}"
-                continue
-
-        # Terminamos fechando o parênteses que foi aberto na primeira linha
-        yield indent_level, ")" + end
+                node, level, end, prefix = item
 
-    def _pretty_lines_node(
-        self,
-        prefix: str,
-        value: "Node",
-        indent_level: int = 0,
-    ) -> Iterator[tuple[int, str]]:
-        """
-        Método auxiliar para imprimir nós de forma legível.
-        """
-        lines = iter(value._pretty_lines(indent_level + 1))
-        (_, first_line) = next(lines)
-
-        # Tratamos a primeira linha de forma diferente, pois ela é prefixada
-        # com o nome do atributo.
-        yield indent_level + 1, prefix + first_line
+                # No caso simples, imprimimos a classe usando str(node). Fazemos
+                # isso se a classe não tiver nenhum filho do tipo Node.
+                if can_print_as_leaf(node):
+                    yield level, prefix + str(node)
+                    continue
 
-        # O comando "yield from" gera todos os valores remanescentes do
-        # iterador `lines`.
-        yield from lines
+                # No caso mais complexo, começamos com a linha de abertura,
+                # imprimindo o nome da classe e um parêntese de abertura, e
+                # depois os campos
+                yield level, prefix + type(node).__name__ + "("
+                stack.append(pretty_fields(node, level, end))
 
-    def _pretty_lines_list(
-        self,
-        attr: str,
-        value: list[Any] | tuple[Any],
-        indent_level: int = 0,
-    ) -> Iterator[tuple[int, str]]:
+    def pretty_to(self, stream: TextIO, indent: int = 2) -> None:
         """
-        Método auxiliar para imprimir listas de forma legível.
-        """
-        if all(not isinstance(item, Node) for item in value):
-            yield indent_level + 1, f"{attr}={list(value)}"
-            return
+        Escreve a representação de `pretty` no stream de texto dado.
 
-        yield indent_level + 1, f"{attr}=["
-
-        for item in value:
-            if isinstance(item, Node):
-                yield from item._pretty_lines(indent_level + 2, end=",")
-            else:
-                yield indent_level + 2, pretty(item) + ","
-        yield indent_level + 1, "]"
+        As linhas são escritas à medida que são geradas, sem montar a string
+        inteira na memória.
+        """
+        write = stream.write
+        for indent_level, line in self._pretty_lines():
+            write(f"{indent * indent_level * ' '}{line}\n")
 
     def visit(self, visitors: dict[type["Node"], Callable[[N], Any]]) -> None:
         """
@@ -157,23 +133,29 @@ class Node(ABC):
 
         Executa a função correspondente ao tipo para cada nó na árvore sintática.
         """
-
-        # Primeiro visitamos os filhos do nó atual.
-        for name in self.__annotations__:
-            value = getattr(self, name)
-            if isinstance(value, Node):
-                value.visit(visitors)
-            elif isinstance(value, (list, tuple)):
-                for item in value:
-                    if isinstance(item, Node):
-                        item.visit(visitors)
-                    else:
-                        visit_once(item, visitors)
+        # Primeiro visitamos os filhos do nó atual e depois o próprio nó. Em
+        # vez de recursão usamos uma pilha explícita: ao expandir um nó, ele é
+        # empilhado de novo sob a marca `VISIT_NODE`, e os valores dos campos
+        # por cima, em ordem reversa. O nó só é visitado quando a marca volta
+        # ao topo, depois de todos os campos.
+        stack: list[Any] = [self]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            obj = pop()
+            if obj is VISIT_NODE:
+                visit_once(pop(), visitors)
+            elif not isinstance(obj, Node):
+                visit_once(obj, visitors)
             else:
-                visit_once(value, visitors)
-
-        # Agora visitamos self
-        visit_once(self, visitors)
+                push(obj)
+                push(VISIT_NODE)
+                for name in reversed(node_fields(type(obj))):
+                    value = getattr(obj, name)
+                    if isinstance(value, (list, tuple)):
+                        stack.extend(reversed(value))
+                    else:
+                        push(value)
 
     def children(self) -> Iterable["Node"]:
         """
@@ -183,7 +165,7 @@ class Node(ABC):
         do nó atual. Isso é útil para percorrer a árvore sintática de forma
         recursiva.
         """
-        for name in self.__annotations__:
+        for name in child_fields(type(self)):
             value = getattr(self, name)
             if isinstance(value, Node):
                 yield value
@@ -192,6 +174,50 @@ class Node(ABC):
                     if isinstance(item, Node):
                         yield item
 
+    def copy(self: N) -> N:
+        """
+        Cópia rasa do nó.
+
+        A cópia tem os mesmos valores em todos os campos, inclusive os filhos e
+        as anotações. Nós imutáveis (ex.: `Literal`) são retornados sem cópia.
+        """
+        cls = type(self)
+        if is_immutable(cls):
+            return self
+        if not is_dataclass(cls):
+            return copy.copy(self)
+        new = object.__new__(cls)
+        for name in slot_fields(cls):
+            setattr(new, name, getattr(self, name))
+        return new
+
+    def clone(self: N) -> N:
+        """
+        Cópia profunda do nó e de todos os descendentes.
+
+        Equivale a `copy.deepcopy`, mas só copia os nós e as listas de filhos:
+        nós imutáveis e os demais valores (nomes, operadores, anotações como
+        os caches de funções memoizadas) são compartilhados com o original.
+        """
+        root = self.copy()
+
+        # Cópias cujos filhos ainda apontam para os nós originais
+        pending = [root]
+        while pending:
+            new = pending.pop()
+            for name in child_fields(type(new)):
+                value = getattr(new, name)
+                if isinstance(value, Node):
+                    child = value.copy()
+                    setattr(new, name, child)
+                    if child is not value:
+                        pending.append(child)
+                elif isinstance(value, (list, tuple)):
+                    items = [item.copy() if isinstance(item, Node) else item for item in value]
+                    setattr(new, name, items if isinstance(value, list) else tuple(items))
+                    pending.extend(item for item, old in zip(items, value) if item is not old)
+        return root
+
     def lark_descendents(self) -> Iterable[Tree | Token]:
         """
         Retorna todos os descendentes do nó atual.
@@ -203,7 +229,7 @@ class Node(ABC):
         método ajuda a encontrar nós não-tranformados que podem ter escapado seu
         Transformer.
         """
-        for name in self.__annotations__:
+        for name in node_fields(type(self)):
             value = getattr(self, name)
             if isinstance(value, (Tree, Token)):
                 yield value
@@ -225,9 +251,22 @@ class Node(ABC):
         descendentes do nó atual. Isso é útil para percorrer a árvore sintática
         de forma recursiva.
         """
-        yield self
-        for child in self.children():
-            yield from child.descendants()
+        # Percurso em pré-ordem com pilha explícita: os filhos são empilhados
+        # em ordem reversa para sair na ordem de declaração
+        stack = [self]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node = pop()
+            yield node
+            for name in reversed_child_fields(type(node)):
+                value = getattr(node, name)
+                if isinstance(value, Node):
+                    push(value)
+                elif isinstance(value, (list, tuple)):
+                    for item in reversed(value):
+                        if isinstance(item, Node):
+                            push(item)
 
     def cursor(self, cursor: Optional["Cursor[N]"] = None) -> "Cursor[N]":
         """
@@ -242,6 +281,16 @@ class Node(ABC):
         if cursor.node is self:
             return cursor
 
+        # Com um índice de pais (ver `ParentIndex`), basta subir da posição
+        # do nó até o cursor
+        index = find_index(self)
+        if index is not None:
+            try:
+                return index.cursor(self, cursor)
+            except (KeyError, ValueError):
+                # Índice desatualizado ou nó compartilhado com outra árvore
+                pass
+
         # Busca em largura
         pending = [cursor]
         while pending:
@@ -258,11 +307,12 @@ class Node(ABC):
         O método `replace_child` substitui um filho do nó atual por um novo
         nó. Isso é útil para modificar a árvore sintática de forma recursiva.
         """
-        for name in self.__annotations__:
+        for name in child_fields(type(self)):
             value = getattr(self, name)
             if isinstance(value, Node):
                 if value is old:
                     setattr(self, name, new)
+                    update_indexes(self, name, None, old, new)
                     return
             elif isinstance(value, (list, tuple)):
                 for i, item in enumerate(value):
@@ -271,6 +321,7 @@ class Node(ABC):
                             msg = f"Em {type(self).__name__}.{name}: esperava uma lista de filhos, mas encontrei uma tupla"
                             raise TypeError(msg)
                         value[i] = new
+                        update_indexes(self, name, i, old, new)
                         return
 
     def desugar_self(self):
@@ -285,12 +336,9 @@ class Node(ABC):
         """
         Remove açúcar sintático do nó atual e todos os filhos.
         """
-        pending = [self.cursor()]
+        from .passes import DesugarPass, run_passes
 
-        while pending:
-            cursor = pending.pop()
-            cursor.node.desugar_self()
-            pending.extend(cursor.children())
+        run_passes(self, [DesugarPass()])
 
     def validate_self(self, cursor: "Cursor[Node]"):
         """
@@ -306,8 +354,98 @@ class Node(ABC):
         """
         Valida o nó atual e todos os filhos.
         """
-        for cursor in self.cursor().descendants():
-            cursor.node.validate_self(cursor)
+        from .passes import ValidatePass, run_passes
+
+        run_passes(self, [ValidatePass()])
+
+
+def annotation(default: Any = None) -> Any:
+    """
+    Declara um campo preenchido depois da construção do nó (pelo resolvedor,
+    pela memoização, etc.).
+
+    O campo ocupa um slot, mas não faz parte do construtor, da comparação nem
+    da representação do nó, e não é percorrido como filho.
+    """
+    return field(default=default, init=False, repr=False, compare=False)
+
+
+@cache
+def node_fields(cls: type[Node]) -> tuple[str, ...]:
+    """
+    Nomes dos campos da classe de nó, na ordem de declaração.
+
+    Campos declarados com `annotation` são omitidos.
+    """
+    if is_dataclass(cls):
+        return tuple(f.name for f in fields(cls) if f.init)
+    return tuple(getattr(cls, "__annotations__", {}))
+
+
+@cache
+def child_fields(cls: type[Node]) -> tuple[str, ...]:
+    """
+    Nomes dos campos da classe de nó que podem conter nós filhos.
+
+    Campos cujo tipo declarado só admite valores simples (strings, números,
+    funções, listas de strings...) são omitidos.
+    """
+    if not is_dataclass(cls):
+        return node_fields(cls)
+    types = {f.name: f.type for f in fields(cls)}
+    return tuple(name for name in node_fields(cls) if may_hold_nodes(types[name]))
+
+
+@cache
+def reversed_child_fields(cls: type[Node]) -> tuple[str, ...]:
+    """
+    Campos de `child_fields` em ordem reversa, para os percursos com pilha
+    explícita.
+    """
+    return child_fields(cls)[::-1]
+
+
+@cache
+def slot_fields(cls: type[Node]) -> tuple[str, ...]:
+    """
+    Nomes de todos os campos da classe de nó, inclusive as anotações.
+    """
+    return tuple(f.name for f in fields(cls))
+
+
+@cache
+def is_immutable(cls: type[Node]) -> bool:
+    """
+    Verifica se os nós da classe são imutáveis e podem ser compartilhados.
+
+    São imutáveis as dataclasses congeladas (`frozen=True`) sem filhos.
+    """
+    return is_dataclass(cls) and cls.__dataclass_params__.frozen and not child_fields(cls)
+
+
+# Marca usada por `Node.visit` na pilha de valores a visitar
+VISIT_NODE = object()
+
+
+# Tipos de campos que nunca contêm nós
+SCALAR_TYPES = (str, bool, int, float, type(None))
+
+
+def may_hold_nodes(tp: Any) -> bool:
+    """
+    Verifica se um campo com o tipo declarado dado pode conter nós.
+
+    Tipos desconhecidos (ex.: referências em forma de string) são tratados
+    como possíveis nós.
+    """
+    origin = get_origin(tp)
+    if origin is CallableABC:
+        return False
+    if origin is not None:
+        return any(may_hold_nodes(arg) for arg in get_args(tp) if arg is not Ellipsis)
+    if isinstance(tp, type):
+        return not issubclass(tp, SCALAR_TYPES)
+    return True
 
 
 @dataclass
@@ -337,9 +475,10 @@ class Cursor(Generic[N]):
         O método `root` retorna o nó raiz do cursor. Isso é útil para
         navegar na árvore sintática de forma recursiva.
         """
-        if not self.parent_cursor:
-            return cast("Cursor[Node]", self)
-        return self.parent_cursor.root()
+        cursor = cast("Cursor[Node]", self)
+        while cursor.parent_cursor is not None:
+            cursor = cursor.parent_cursor
+        return cursor
 
     def is_root(self) -> bool:
         """
@@ -400,11 +539,25 @@ class Cursor(Generic[N]):
         descendentes do nó atual. Isso é útil para navegar na árvore sintática
         de forma recursiva.
         """
-        if skip is None or not skip(self):
-            if not skip_self:
-                yield cast("Cursor[Node]", self)
-            for child in self.children():
-                yield from child.descendants(skip)
+        # Pré-ordem com pilha explícita; `skip` descarta o nó e a sua subárvore
+        stack = [cast("Cursor[Node]", self)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            cursor = pop()
+            if skip is not None and skip(cursor):
+                continue
+            if not (skip_self and cursor is self):
+                yield cursor
+            node = cursor.node
+            for name in reversed_child_fields(type(node)):
+                value = getattr(node, name)
+                if isinstance(value, Node):
+                    push(Cursor(value, cursor))
+                elif isinstance(value, (list, tuple)):
+                    for item in reversed(value):
+                        if isinstance(item, Node):
+                            push(Cursor(item, cursor))
 
     def is_scoped_to(self, scope: type[Node]) -> bool:
         """
@@ -453,6 +606,188 @@ class Cursor(Generic[N]):
         return cursor
 
 
+class ParentIndex:
+    """
+    Índice com o pai e a posição de cada nó de uma árvore.
+
+    Sem o índice, `Node.cursor(cursor)` procura o nó percorrendo a árvore a
+    partir do cursor, e um passo que precisa de cursores para muitos nós
+    fica quadrático. Com o índice, o cursor é montado subindo do nó até a
+    raiz, em tempo proporcional à profundidade:
+
+        >>> index = ParentIndex(tree)  # doctest: +SKIP
+        >>> index.cursor(node).function_scope()  # doctest: +SKIP
+
+    O índice é montado num único percurso e, enquanto existir, é atualizado
+    por `Node.replace_child`, que `Node.cursor` usa automaticamente. Outras
+    modificações da árvore (atribuições diretas aos campos, como fazem as
+    otimizações) não são vistas: nós cuja posição mudou deixam de ser
+    encontrados pelo índice e `Node.cursor` volta à busca. Use `rebuild`
+    depois dessas modificações.
+
+    Nós imutáveis, como `Literal`, são indexados como os demais, mas podem
+    ser compartilhados (ver `Node.clone`). Um nó que aparece em mais de uma
+    posição da árvore indexada é marcado como compartilhado, e `Node.cursor`
+    o encontra pela busca na árvore.
+    """
+
+    def __init__(self, root: Node):
+        self.root = root
+        # id(nó) -> (nó, pai, campo, posição na lista ou None)
+        self.entries: dict[int, tuple[Node, Node | None, str | None, int | None]] = {}
+        self.add(root, None, None, None)
+        INDEXES.add(self)
+
+    def __contains__(self, node: Node) -> bool:
+        entry = self.entries.get(id(node))
+        return entry is not None and entry[0] is node
+
+    def add(self, node: Node, parent: Node | None, name: str | None, position: int | None) -> None:
+        """
+        Indexa o nó e os seus descendentes na posição dada.
+        """
+        entries = self.entries
+        stack = [(node, parent, name, position)]
+        while stack:
+            entry = stack.pop()
+            node = entry[0]
+            cls = type(node)
+            if is_immutable(cls) and node in self:
+                old = entries[id(node)]
+                if (old[1] is not entry[1] or old[2:] != entry[2:]) and (old[2] is SHARED or self.holds(old)):
+                    # O mesmo nó em duas posições: o pai é ambíguo
+                    entries[id(node)] = (node, None, SHARED, None)
+                    continue
+            entries[id(node)] = entry
+            for name in child_fields(cls):
+                value = getattr(node, name)
+                if isinstance(value, Node):
+                    stack.append((value, node, name, None))
+                elif isinstance(value, (list, tuple)):
+                    for i, item in enumerate(value):
+                        if isinstance(item, Node):
+                            stack.append((item, node, name, i))
+
+    def remove(self, node: Node) -> None:
+        """
+        Remove o nó e os seus descendentes do índice.
+        """
+        entries = self.entries
+        for descendant in node.descendants():
+            entry = entries.get(id(descendant))
+            if entry is not None and entry[0] is descendant:
+                del entries[id(descendant)]
+
+    def rebuild(self) -> None:
+        """
+        Indexa de novo a árvore inteira.
+        """
+        self.entries.clear()
+        self.add(self.root, None, None, None)
+
+    def replace(self, parent: Node, name: str, position: int | None, old: Node, new: Node) -> None:
+        """
+        Atualiza o índice depois que `old` foi substituído por `new` em `parent`.
+        """
+        self.remove(old)
+        self.add(new, parent, name, position)
+
+    def parent(self, node: Node) -> Node | None:
+        """
+        Retorna o pai do nó, ou None para a raiz.
+
+        Lança KeyError se o nó não está no índice ou mudou de posição.
+        """
+        entry = self.entries.get(id(node))
+        if entry is None or entry[0] is not node or not self.holds(entry):
+            raise KeyError(node)
+        return entry[1]
+
+    def holds(self, entry: tuple[Node, Node | None, str | None, int | None]) -> bool:
+        """
+        Verifica se a posição registrada na entrada ainda contém o nó.
+        """
+        node, parent, name, position = entry
+        if name is SHARED:
+            return False
+        if parent is None:
+            return True
+        value = getattr(parent, name)
+        if position is not None:
+            value = value[position] if position < len(value) else None
+        return value is node
+
+    def position(self, node: Node) -> tuple[str | None, int | None]:
+        """
+        Retorna o campo do pai que contém o nó e o índice na lista, se houver.
+        """
+        self.parent(node)
+        _, _, name, position = self.entries[id(node)]
+        return name, position
+
+    def parents(self, node: Node) -> Iterator[Node]:
+        """
+        Percorre os pais do nó, do mais próximo até a raiz.
+        """
+        parent = self.parent(node)
+        while parent is not None:
+            yield parent
+            parent = self.parent(parent)
+
+    def cursor(self, node: N, base: Optional["Cursor[Node]"] = None) -> "Cursor[N]":
+        """
+        Retorna um cursor para o nó, com os pais até a raiz.
+
+        Se `base` for dado, o cursor retornado passa por ele, como em
+        `Node.cursor(base)`.
+        """
+        path: list[Node] = [node]
+        stop = base.node if base is not None else None
+        current: Node | None = node
+        while current is not stop:
+            current = self.parent(current)
+            if current is None:
+                if base is None:
+                    break
+                raise ValueError("O cursor não aponta para o nó atual")
+            path.append(current)
+
+        if base is None:
+            cursor = Cursor(path.pop())
+        else:
+            path.pop()
+            cursor = base
+        for ancestor in reversed(path):
+            cursor = Cursor(ancestor, cursor)
+        return cast("Cursor[N]", cursor)
+
+
+# Índices de pais em uso, atualizados por `Node.replace_child`
+INDEXES: "WeakSet[ParentIndex]" = WeakSet()
+
+# Campo registrado por `ParentIndex` para nós em mais de uma posição
+SHARED = "<compartilhado>"
+
+
+def find_index(node: Node) -> ParentIndex | None:
+    """
+    Retorna um índice de pais em uso que contém o nó, se existir.
+    """
+    for index in INDEXES:
+        if node in index:
+            return index
+    return None
+
+
+def update_indexes(parent: Node, name: str, position: int | None, old: Node, new: Node) -> None:
+    """
+    Atualiza os índices de pais que contêm `parent` depois de uma substituição.
+    """
+    for index in INDEXES:
+        if parent in index:
+            index.replace(parent, name, position, old, new)
+
+
 @singledispatch
 def pretty(obj: Any) -> str:
     """
@@ -491,6 +826,40 @@ def _(obj) -> str:
     return obj.__name__
 
 
+def pretty_fields(node: Node, level: int, end: str) -> Iterator[tuple]:
+    """
+    Linhas dos campos de um nó aberto por `Node._pretty_lines`.
+
+    Filhos do tipo `Node` são produzidos como quádruplas (nó, nível, final,
+    prefixo), para serem impressos por `_pretty_lines` com o nome do atributo
+    como prefixo da primeira linha.
+    """
+    # A função `node_fields` retorna os nomes dos campos declarados na
+    # classe. Vamos percorrê-los na ordem de declaração e imprimir o nome e
+    # valores correspondentes
+    for attr in node_fields(type(node)):
+        value = getattr(node, attr)
+        if isinstance(value, Node):
+            yield value, level + 1, "", attr + "="
+        elif isinstance(value, (list, tuple)):
+            if all(not isinstance(item, Node) for item in value):
+                yield level + 1, f"{attr}={list(value)}"
+                continue
+            yield level + 1, f"{attr}=["
+            for item in value:
+                if isinstance(item, Node):
+                    yield item, level + 2, ",", ""
+                else:
+                    yield level + 2, pretty(item) + ","
+            yield level + 1, "]"
+        else:
+            # Os demais valores usam a implementação genérica de `pretty`
+            yield level + 1, f"{attr}={pretty(value)}"
+
+    # Terminamos fechando o parênteses que foi aberto na primeira linha
+    yield level, ")" + end
+
+
 def visit_once(obj: Node, visitors: dict[type[Node], Callable[[N], Any]]) -> None:
     """
     Visita um nó e executa a primeira função consistente com o tipo do objecto.
@@ -512,7 +881,7 @@ def can_print_as_leaf(node: Node) -> bool:
     """
     while node:
         args = []
-        for attr in node.__annotations__:
+        for attr in node_fields(type(node)):
             obj = getattr(node, attr)
             if isinstance(obj, (list, tuple)) and obj:
                 return False
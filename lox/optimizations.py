@@ -1,8 +1,16 @@
 from . import ast
-from typing import Callable
+from .node import child_fields
+from typing import Callable, Generator
+
+# Execução de um passo num nó (ver `run_frames`)
+Frame = Generator[ast.Expr, ast.Expr, ast.Expr]
+
+
 class ConstantPropagation:
-    def __init__(self):
+    def __init__(self, copy_on_write: bool = False):
         self.constants = {}
+        # Se verdadeiro, a árvore original não é modificada (ver `update`)
+        self.copy_on_write = copy_on_write
 
     def get_constant(self, name: str):
         return self.constants.get(name)
@@ -13,19 +21,24 @@ class ConstantPropagation:
         self.constants[name] = value
 
     def propagate(self, node: ast.Expr) -> ast.Expr:
+        return run_frames(self.propagate_frame, node)
+
+    def propagate_frame(self, node: ast.Expr) -> Frame:
+        # Cada `yield filho` devolve o filho já propagado (ver `run_frames`)
         if isinstance(node, ast.BinOp):
-            left = self.propagate(node.left)
-            right = self.propagate(node.right)
+            left = yield node.left
+            right = yield node.right
             if (isinstance(left, ast.Literal) and isinstance(right, ast.Literal)):
                 return ast.Literal(node.op(left.value, right.value))
+            return update(node, self.copy_on_write, left=left, right=right)
         elif isinstance(node, ast.VarDef):
-            initializer = self.propagate(node.expr)
+            initializer = yield node.expr
             
             if isinstance(initializer, ast.Literal):
                 self.set_constant(node.name, ast.Literal(initializer.value))
                 return ast.VarDef(name=node.name, expr=initializer)
             
-            return node
+            return update(node, self.copy_on_write, expr=initializer)
         elif isinstance(node, ast.Function):
             # Não é seguro propagar funções por causa de efeitos colaterais...
             return node
@@ -35,8 +48,8 @@ class ConstantPropagation:
             return node
         
         elif isinstance(node, ast.Call):
-            node.args = [self.propagate(arg) for arg in node.args]
-            return node
+            args = yield from loop_items(node.args)
+            return update(node, self.copy_on_write, args=args)
 
         elif isinstance(node, ast.Var):
             if (node.name in self.constants):
@@ -44,16 +57,19 @@ class ConstantPropagation:
             return node
         elif isinstance(node, ast.Block):
             old_body = self.constants.copy()
-            node.statements = [self.propagate(stmt) for stmt in node.statements]
+            statements = yield from loop_items(node.statements)
+            node = update(node, self.copy_on_write, statements=statements)
             self.constants = old_body
             return node
         else:
-            return loop_ast_nodes(node, self.propagate)
+            return (yield from loop_children(node, self.copy_on_write))
 
             
 class UnsedVarsElimination:
-    def __init__(self):
+    def __init__(self, copy_on_write: bool = False):
         self.used_vars = set()
+        # Se verdadeiro, a árvore original não é modificada (ver `update`)
+        self.copy_on_write = copy_on_write
     
     def mark_used(self, name: str):
         self.used_vars.add(name)
@@ -62,13 +78,16 @@ class UnsedVarsElimination:
         return name in self.used_vars
     
     def evaluate_used_vars(self, node: ast.Expr) -> ast.Expr:
+        return run_frames(self.evaluate_used_vars_frame, node)
+
+    def evaluate_used_vars_frame(self, node: ast.Expr) -> Frame:
         if isinstance(node, ast.VarDef):
-            node.expr = self.evaluate_used_vars(node.expr)
-            return node
+            expr = yield node.expr
+            return update(node, self.copy_on_write, expr=expr)
         
         if isinstance(node, ast.Function):
             self.mark_used(node.identifier)
-            self.evaluate_used_vars(node.body)
+            yield node.body
             return node
         
         if isinstance(node, ast.Var):
@@ -76,31 +95,40 @@ class UnsedVarsElimination:
             return node
         
         if isinstance(node, ast.BinOp):
-            node.left = self.evaluate_used_vars(node.left)
-            node.right = self.evaluate_used_vars(node.right)
-            return node
+            left = yield node.left
+            right = yield node.right
+            return update(node, self.copy_on_write, left=left, right=right)
         
         if isinstance(node, ast.Block):
             old_used_vars = self.used_vars.copy()
-            node.statements = [self.evaluate_used_vars(stmt) for stmt in node.statements]
+            statements = yield from loop_items(node.statements)
+            node = update(node, self.copy_on_write, statements=statements)
             self.used_vars = old_used_vars
             return node
         else:
-            return loop_ast_nodes(node, self.evaluate_used_vars)
+            return (yield from loop_children(node, self.copy_on_write))
         
     def remove_unused_vars(self, node: ast.Expr) -> ast.Expr:
+        return run_frames(self.remove_unused_vars_frame, node)
+
+    def remove_unused_vars_frame(self, node: ast.Expr) -> Frame:
         if isinstance(node, ast.VarDef):
             if not self.is_used(node.name):
                 return ast.NoOp()
-            node.expr = self.remove_unused_vars(node.expr)
-            return node
-        return loop_ast_nodes(node, self.remove_unused_vars)
+            expr = yield node.expr
+            return update(node, self.copy_on_write, expr=expr)
+        return (yield from loop_children(node, self.copy_on_write))
+
     def eval(self, program: ast.Program) -> ast.Program:
         self.evaluate_used_vars(program)
         return self.remove_unused_vars(program)
 
 
-def optimize_ast(ast_program: ast.Expr, optimizations: list = ['propagation', 'unsed_vars']) -> ast.Expr:
+def optimize_ast(
+    ast_program: ast.Expr,
+    optimizations: list = ['propagation', 'unsed_vars'],
+    copy_on_write: bool = False,
+) -> ast.Expr:
     """
     Otimiza a AST
 
@@ -111,24 +139,116 @@ def optimize_ast(ast_program: ast.Expr, optimizations: list = ['propagation', 'u
 
     o segundo parâmetro `optimizations` é uma lista de strings que especifica quais otimizações aplicar.
     optimizations: ['propagation', 'unsed_vars']
+
+    Com `copy_on_write=True` a árvore recebida não é modificada: o resultado
+    é uma nova árvore que compartilha com a original os nós não alterados.
+    Várias configurações de otimização podem ser aplicadas ao mesmo programa
+    sem copiá-lo por inteiro.
     """
     optimizer = ast_program
    
     if 'propagation' in optimizations:
-        ConstantPropagation().propagate(optimizer)
+        optimizer = ConstantPropagation(copy_on_write).propagate(optimizer)
     if 'unsed_vars' in optimizations:
-        UnsedVarsElimination().eval(optimizer) 
+        optimizer = UnsedVarsElimination(copy_on_write).eval(optimizer)
     
-    return ast_program
+    return optimizer
+
 
 
+def loop_ast_nodes(
+    node: ast.Expr,
+    callback: Callable[[ast.Expr], ast.Expr],
+    copy_on_write: bool = False,
+) -> ast.Expr:
+    if isinstance(node, str):
+        return node
+    changes = {}
+    for attr in child_fields(type(node)):
+        value = getattr(node, attr)
+        if isinstance(value, list):
+            changes[attr] = [callback(item) for item in value]
+        elif isinstance(value, ast.Expr):
+            changes[attr] = callback(value)
+    return update(node, copy_on_write, **changes)
+
 
-def loop_ast_nodes(node: ast.Expr, callback: Callable[[ast.Expr], ast.Expr]) -> ast.Expr:
+def loop_children(node: ast.Expr, copy_on_write: bool = False) -> Frame:
+    """
+    Versão de `loop_ast_nodes` para os passos executados por `run_frames`:
+    cada filho é pedido com `yield` em vez de chamar o passo recursivamente.
+    """
     if isinstance(node, str):
         return node
-    for attr, value in vars(node).items():
+    changes = {}
+    for attr in child_fields(type(node)):
+        value = getattr(node, attr)
         if isinstance(value, list):
-            setattr(node, attr, [callback(item) for item in value])
+            items = []
+            for item in value:
+                items.append((yield item))
+            changes[attr] = items
         elif isinstance(value, ast.Expr):
-            setattr(node, attr, callback(value))
-    return node
\ No newline at end of file
+            changes[attr] = yield value
+    return update(node, copy_on_write, **changes)
+
+
+def loop_items(items: list) -> Generator[ast.Expr, ast.Expr, list]:
+    """
+    Pede o resultado do passo para cada item da lista, na ordem.
+    """
+    results = []
+    for item in items:
+        results.append((yield item))
+    return results
+
+
+def run_frames(frame: Callable[[ast.Expr], Frame], node: ast.Expr) -> ast.Expr:
+    """
+    Executa um passo recursivo sobre a árvore com uma pilha explícita.
+
+    `frame(node)` é um gerador que faz `yield filho` para obter o resultado do
+    passo no filho e retorna o resultado para o nó. Os geradores pendentes
+    ficam numa lista em vez da pilha de chamadas do Python, de modo que
+    árvores muito profundas (ex.: longas cadeias de `+`) não estouram o limite
+    de recursão. A ordem de execução é a mesma da versão recursiva.
+    """
+    stack = [frame(node)]
+    result = None
+    while stack:
+        try:
+            child = stack[-1].send(result)
+        except StopIteration as stop:
+            stack.pop()
+            result = stop.value
+        else:
+            stack.append(frame(child))
+            result = None
+    return result
+
+
+def update(node: ast.Expr, copy_on_write: bool, /, **changes) -> ast.Expr:
+    """
+    Atribui os novos valores aos campos do nó e o retorna.
+
+    No modo cópia na escrita (`copy_on_write`) o nó não é modificado: se algum
+    campo mudou, os valores são atribuídos a uma cópia rasa do nó (ver
+    `Node.copy`), e os pais recebem a cópia como valor de retorno dos passos.
+    Só os nós no caminho até uma alteração são copiados.
+    """
+    if copy_on_write:
+        if all(same(getattr(node, attr), value) for attr, value in changes.items()):
+            return node
+        node = node.copy()
+    for attr, value in changes.items():
+        setattr(node, attr, value)
+    return node
+
+
+def same(old, new) -> bool:
+    """
+    Verifica se o novo valor de um campo contém os mesmos objetos do antigo.
+    """
+    if isinstance(old, list) and isinstance(new, list):
+        return len(old) == len(new) and all(a is b for a, b in zip(old, new))
+    return old is new
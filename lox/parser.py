@@ -5,33 +5,85 @@ Define a gramática da Linguagem e funções para realizar a análise sintática
 análise léxica, etc.
 """
 
-from pathlib import Path
-from typing import Iterator
-
-from lark import Lark, Token, Tree
+import os
+from functools import cache
+from typing import TYPE_CHECKING, Iterator
 
 from .ast import Expr, Program
+from .cache import cache_dir
+from .lexer import LoxLexer
+from .passes import run_frontend
+from .standalone import GRAMMAR_PATH, Token, Tree, grammar_hash, standalone
 from .transformer import LoxTransformer
 from .ctx import Ctx
 
-DIR = Path(__file__).parent
-GRAMMAR_PATH = DIR / "grammar.lark"
+if TYPE_CHECKING:
+    from lark import Lark
+
+# Analisador léxico: "lox" usa o lexer próprio (`lox.lexer`) e "lark" o lexer
+# contextual do Lark.
+LEXERS = ("lox", "lark")
+LEXER = os.environ.get("LOX_LEXER", "lox")
+if LEXER not in LEXERS:
+    raise ValueError(f"LOX_LEXER inválido: {LEXER!r} (use {' ou '.join(LEXERS)})")
+
+
+def make_parser(name: str, **options) -> "Lark":
+    """
+    Constrói um parser LALR para a gramática do Lox.
+
+    Se o parser autônomo estiver habilitado (ver `lox.standalone`), usa as
+    tabelas já contidas nele. Caso contrário, as tabelas construídas pelo
+    Lark são salvas no diretório de cache (ver `lox.cache`), num arquivo
+    indexado pelo nome do parser e pelo hash da gramática. Nas execuções
+    seguintes o Lark carrega as tabelas prontas em vez de recalculá-las.
+
+    O analisador léxico é escolhido pela variável de ambiente `LOX_LEXER`.
+    """
+    if standalone is not None:
+        parser = standalone.Lark_StandAlone(**options)
+        if LEXER == "lox":
+            # O módulo autônomo é gerado com o lexer contextual do Lark
+            parser.parser.lexer = LoxLexer(parser.lexer_conf)
+        return parser
+
+    from lark import Lark
+
+    grammar = GRAMMAR_PATH.read_text()
+    path = cache_dir("lark")
+    if path is None:
+        lark_cache: str | bool = False
+    else:
+        lark_cache = str(path / f"{name}-{LEXER}-{grammar_hash(grammar)}.lark")
+    return Lark(
+        grammar,
+        parser="lalr",
+        lexer=LoxLexer if LEXER == "lox" else "contextual",
+        start=["start", "expr"],
+        cache=lark_cache,
+        **options,
+    )
+
+
+# Os parsers são construídos somente no primeiro uso: importar o módulo não
+# paga o custo de compilar a gramática, e a CLI só constrói o parser que usa.
+@cache
+def ast_parser() -> "Lark":
+    """
+    Parser que produz diretamente a árvore sintática do Lox.
+    """
+    return make_parser("ast", transformer=LoxTransformer())
 
 
-ast_parser = Lark(
-    GRAMMAR_PATH.open(),
-    transformer=LoxTransformer(),
-    parser="lalr",
-    start=["start", "expr"],
-)
-cst_parser = Lark(
-    GRAMMAR_PATH.open(),
-    parser="lalr",
-    start=["start", "expr"],
-)
+@cache
+def cst_parser() -> "Lark":
+    """
+    Parser que produz a árvore do Lark, sem transformações.
+    """
+    return make_parser("cst")
 
 
-def parse(src: str) -> Program:
+def parse(src: str, cache: bool = True) -> Program:
     """
     Função que recebe um código fonte e retorna a árvore sintática.
 
@@ -42,11 +94,19 @@ def parse(src: str) -> Program:
     Args:
         src (str):
             Código fonte a ser analisado.
+        cache (bool):
+            Se verdadeiro, consulta o cache de árvores em disco (ver
+            `lox.astcache`). Cada chamada retorna uma árvore nova, que pode
+            ser modificada livremente.
     """
-    tree = ast_parser.parse(src, start="start")
+    if cache:
+        from .astcache import AST_CACHE
+
+        return AST_CACHE.parse(src)
+
+    tree = ast_parser().parse(src, start="start")
     assert isinstance(tree, Program), f"Esperava um Program, mas recebi {type(tree)}"
-    tree.validate_tree()
-    tree.desugar_tree()
+    run_frontend(tree)
 
     return tree
 
@@ -72,10 +132,9 @@ def parse_expr(src: str) -> Expr:
         >>> parse_expr("1 + 2 * 3").eval(Ctx())
         7
     """
-    tree = ast_parser.parse(src, start="expr")
+    tree = ast_parser().parse(src, start="expr")
     assert isinstance(tree, Expr), f"Esperava um Expr, mas recebi {type(tree)}"
-    tree.validate_tree()
-    tree.desugar_tree()
+    run_frontend(tree)
     return tree
 
 
@@ -94,11 +153,13 @@ def parse_cst(src: str, expr: bool = False) -> Tree:
             Se True, analisa o código como se fosse apenas uma expressão.
     """
     start = "expr" if expr else "start"
-    return cst_parser.parse(src, start=start)
+    return cst_parser().parse(src, start=start)
 
 
 def lex(src: str) -> Iterator[Token]:
     """
     Retorna um iterador sobre os tokens do código fonte.
     """
-    return ast_parser.lex(src)
+    if LEXER == "lox":
+        return LoxLexer(ast_parser().lexer_conf).tokenize(src)
+    return ast_parser().lex(src)
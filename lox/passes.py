@@ -0,0 +1,162 @@
+"""
+Passos sobre a árvore sintática.
+
+Cada `Pass` é aplicado a todos os nós, em pré-ordem. `run_passes` combina
+vários passos num só percurso: em cada nó os passos são executados na ordem
+dada, e só então os filhos são visitados. Assim um passo que modifica o nó
+já entrega aos passos seguintes e aos filhos a versão modificada.
+
+Os passos são compatíveis entre si quando o resultado de cada um num nó não
+depende do resultado dos outros em nós ainda não visitados. A validação e a
+remoção de açúcar sintático não são compatíveis: a validação deve ver a
+árvore inteira como saiu do parser, antes que qualquer nó seja modificado.
+Por isso `run_frontend` os executa em percursos separados, pulando o
+segundo quando nenhuma classe de nó da árvore implementa `desugar_self`.
+Otimizações que precisam ver a árvore inteira antes de transformá-la (como
+a eliminação de variáveis não utilizadas) não são passos.
+
+Cursores são criados somente para os nós em que algum passo precisa deles.
+Os passos padrão só precisam visitar classes que sobrescrevem
+`validate_self` ou `desugar_self`, de modo que uma árvore sem esses métodos
+é percorrida sem alocar nenhum cursor.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable
+
+from .node import Cursor, Node
+
+
+class Pass:
+    """
+    Verificação ou transformação aplicada a cada nó.
+    """
+
+    # Se verdadeiro, `run` recebe um cursor para o nó
+    needs_cursor = False
+
+    def applies_to(self, cls: type[Node]) -> bool:
+        """
+        Retorna False se o passo não faz nada com nós da classe dada.
+        """
+        return True
+
+    def applies_to_any(self, classes: Iterable[type[Node]]) -> bool:
+        """
+        Retorna False se o passo não faz nada com nenhuma das classes dadas.
+        """
+        return any(self.applies_to(cls) for cls in classes)
+
+    def run(self, node: Node, cursor: Cursor | None) -> None:
+        raise NotImplementedError
+
+
+class ValidatePass(Pass):
+    """
+    Análise semântica (`Node.validate_self`).
+    """
+
+    needs_cursor = True
+
+    def applies_to(self, cls: type[Node]) -> bool:
+        return cls.validate_self is not Node.validate_self
+
+    def run(self, node: Node, cursor: Cursor | None) -> None:
+        node.validate_self(cursor)
+
+
+class DesugarPass(Pass):
+    """
+    Remoção de açúcar sintático (`Node.desugar_self`).
+    """
+
+    def applies_to(self, cls: type[Node]) -> bool:
+        return cls.desugar_self is not Node.desugar_self
+
+    def run(self, node: Node, cursor: Cursor | None) -> None:
+        node.desugar_self()
+
+
+@dataclass
+class PassStats:
+    """
+    Contadores de uma execução de `run_passes`.
+    """
+
+    walks: int = 0
+    nodes: int = 0
+    cursors: int = 0
+
+
+def run_passes(
+    tree: Node,
+    passes: list[Pass],
+    stats: PassStats | None = None,
+    classes: set[type[Node]] | None = None,
+) -> Node:
+    """
+    Executa os passos sobre a árvore num único percurso em pré-ordem.
+
+    Os passos devem ser compatíveis entre si (ver a documentação do módulo).
+    Se `classes` for dado, recebe as classes dos nós visitados.
+    """
+    plans: dict[type, list[Pass]] = {}
+    cursors = 0
+
+    # Caminho da raiz até o nó atual e os cursores já criados para ele
+    path: list[Node] = []
+    path_cursors: list[Cursor | None] = []
+
+    def cursor_at(depth: int) -> Cursor:
+        nonlocal cursors
+        cursor = path_cursors[depth]
+        if cursor is None:
+            parent = cursor_at(depth - 1) if depth else None
+            cursor = path_cursors[depth] = Cursor(path[depth], parent)
+            cursors += 1
+        return cursor
+
+    nodes = 0
+    pending: list[tuple[Node, int]] = [(tree, 0)]
+    while pending:
+        node, depth = pending.pop()
+        nodes += 1
+        del path[depth:], path_cursors[depth:]
+        path.append(node)
+        path_cursors.append(None)
+
+        cls = type(node)
+        plan = plans.get(cls)
+        if plan is None:
+            plan = plans[cls] = [p for p in passes if p.applies_to(cls)]
+        for p in plan:
+            p.run(node, cursor_at(depth) if p.needs_cursor else None)
+
+        children = list(node.children())
+        for child in reversed(children):
+            pending.append((child, depth + 1))
+
+    if classes is not None:
+        classes.update(plans)
+    if stats is not None:
+        stats.walks += 1
+        stats.nodes += nodes
+        stats.cursors += cursors
+    return tree
+
+
+def run_frontend(tree: Node, stats: PassStats | None = None) -> Node:
+    """
+    Valida a árvore inteira e depois remove o açúcar sintático.
+
+    Cada passo tem seu próprio percurso, de modo que `validate_self` nunca vê
+    um nó já transformado por `desugar_self`. O percurso de validação também
+    coleta as classes dos nós da árvore, e a remoção de açúcar sintático só
+    percorre a árvore se alguma delas implementa `desugar_self`.
+    """
+    classes: set[type[Node]] = set()
+    run_passes(tree, [ValidatePass()], stats, classes)
+    desugar = DesugarPass()
+    if desugar.applies_to_any(classes):
+        run_passes(tree, [desugar], stats)
+    return tree
@@ -0,0 +1,188 @@
+"""
+Resolvedor estático de variáveis.
+
+Percorre a árvore sintática uma única vez e anota cada variável local com a sua
+posição no ambiente de execução:
+
+- `Var` e `Assign` recebem `depth` (quantos escopos locais acima do atual a
+  variável foi declarada) e `slot` (posição da variável naquele escopo);
+- `VarDef` e `Function` recebem o `slot` do nome declarado;
+- `Block` recebe a tabela nome -> slot das variáveis que declara e `Function`
+  a tabela dos seus parâmetros;
+- `Var` recebe `is_global = True` se nenhum escopo local envolvente declara o
+  nome, o que permite guardar em cache a busca no escopo global;
+- os `return` dentro de funções são marcados com `signal = True`, e os blocos
+  e laços que os contêm com `returns = True`: nesses casos o retorno é
+  repassado como valor (`lox.runtime.Completion`) em vez de lançar exceção;
+- os `return` cuja expressão é uma chamada recebem também `tail = True`: a
+  chamada em posição de cauda é executada pelo trampolim de
+  `LoxFunction.__call__` (ou de `ClosureFunction.__call__`), sem aumentar a
+  pilha.
+
+Em tempo de execução esses escopos são representados por `lox.ctx.SlotCtx`, de
+modo que o acesso a uma variável local é uma indexação direta, independente da
+profundidade de aninhamento de blocos e funções.
+
+Variáveis globais (e os poucos casos em que a ligação só pode ser decidida em
+tempo de execução) ficam com `slot = None` e continuam usando a busca por nome.
+
+O percurso usa uma pilha explícita (`lox.optimizations.run_frames`), como os
+passos de otimização, de modo que expressões muito profundas não estouram o
+limite de recursão do Python.
+"""
+
+from dataclasses import dataclass, field
+
+from . import ast
+from .node import Node
+from .optimizations import Frame, run_frames
+
+
+@dataclass
+class Scope:
+    """
+    Escopo local conhecido pelo resolvedor.
+    """
+
+    # Tabela nome -> slot de todas as variáveis declaradas no escopo
+    slots: dict[str, int]
+
+    # Variáveis já declaradas até o ponto atual da análise
+    defined: set[str] = field(default_factory=set)
+
+    # Verdadeiro para o escopo dos parâmetros de uma função
+    is_function: bool = False
+
+    def declare(self, name: str) -> int:
+        self.defined.add(name)
+        return self.slots[name]
+
+
+class Resolver:
+    def __init__(self):
+        self.scopes: list[Scope] = []
+
+    def lookup(self, name: str) -> tuple[int, int] | tuple[None, None]:
+        """
+        Retorna a dupla (depth, slot) da variável com o nome dado.
+
+        Retorna (None, None) se a variável for global ou se a ligação depender
+        da ordem de execução. Isso acontece quando o nome é declarado num
+        escopo externo somente *depois* da função que o referencia: ao chamar a
+        função, a declaração pode ou não já ter sido executada.
+        """
+        crossed_function = False
+        for depth, scope in enumerate(reversed(self.scopes)):
+            if name in scope.defined:
+                return depth, scope.slots[name]
+            if name in scope.slots and crossed_function:
+                return None, None
+            if scope.is_function:
+                crossed_function = True
+        return None, None
+
+    def declare(self, name: str) -> int | None:
+        """
+        Declara a variável no escopo atual e retorna o seu slot.
+
+        Declarações no escopo global não possuem slot.
+        """
+        if not self.scopes:
+            return None
+        return self.scopes[-1].declare(name)
+
+    def resolve(self, node: Node) -> Node:
+        return run_frames(self.resolve_frame, node)
+
+    def resolve_frame(self, node: Node) -> Frame:
+        # Cada `yield filho` resolve o filho antes de continuar (ver
+        # `run_frames`), sem usar a pilha de chamadas do Python
+        if isinstance(node, ast.Var):
+            node.depth, node.slot = self.lookup(node.name)
+            node.is_global = not any(node.name in scope.slots for scope in self.scopes)
+
+        elif isinstance(node, ast.Assign):
+            yield node.name
+            node.depth, node.slot = node.name.depth, node.name.slot
+            yield node.expr
+
+        elif isinstance(node, ast.VarDef):
+            # O inicializador é avaliado antes da declaração: em
+            # `var x = x;` o `x` da direita se refere ao escopo externo.
+            yield node.expr
+            node.slot = self.declare(node.name)
+
+        elif isinstance(node, ast.Function):
+            # O nome da função é declarado antes do corpo para permitir
+            # recursão.
+            node.slot = self.declare(node.identifier)
+            # A memoização é instalada de novo a cada execução (ver `lox.memo`)
+            node.memo = None
+            node.params = {arg: i for i, arg in enumerate(node.args)}
+            self.scopes.append(Scope(node.params, set(node.args), is_function=True))
+            yield node.body
+            self.scopes.pop()
+            mark_returns(node.body)
+
+        elif isinstance(node, ast.Block):
+            node.slots = block_slots(node)
+            if node.slots:
+                self.scopes.append(Scope(node.slots))
+            for stmt in node.statements:
+                yield stmt
+            if node.slots:
+                self.scopes.pop()
+
+        else:
+            for child in node.children():
+                yield child
+
+        return node
+
+
+def block_slots(block: ast.Block) -> dict[str, int]:
+    """
+    Calcula a tabela nome -> slot das variáveis declaradas diretamente no bloco.
+    """
+    slots: dict[str, int] = {}
+    for stmt in block.statements:
+        if isinstance(stmt, ast.VarDef):
+            name = stmt.name
+        elif isinstance(stmt, ast.Function):
+            name = stmt.identifier
+        else:
+            continue
+        slots.setdefault(name, len(slots))
+    return slots
+
+
+def mark_returns(node: Node) -> bool:
+    """
+    Marca os `return` do corpo de uma função e os comandos que os contêm.
+
+    Retorna True se o nó contém algum `return` da função. Funções aninhadas
+    são ignoradas, pois são marcadas quando o resolvedor as visita.
+    """
+    if isinstance(node, ast.Return):
+        node.signal = True
+        node.tail = isinstance(node.expr, ast.Call)
+        return True
+    if isinstance(node, ast.Block):
+        node.returns = any([mark_returns(stmt) for stmt in node.statements])
+        return node.returns
+    if isinstance(node, ast.While):
+        node.returns = mark_returns(node.then)
+        return node.returns
+    if isinstance(node, ast.If):
+        return any([mark_returns(node.then), mark_returns(node.not_then)])
+    return False
+
+
+def resolve(node: Node) -> Node:
+    """
+    Anota a árvore sintática com as posições das variáveis locais.
+
+    Deve ser executado depois das otimizações, que podem remover ou recriar
+    declarações.
+    """
+    return Resolver().resolve(node)
@@ -1,9 +1,11 @@
 import builtins
+from collections import OrderedDict
 from dataclasses import dataclass
 from operator import add, eq, ge, gt, le, lt, mul, ne, neg, not_, sub, truediv
+from types import FunctionType
 from typing import TYPE_CHECKING
 
-from .ctx import Ctx
+from .ctx import Ctx, SlotCtx
 
 if TYPE_CHECKING:
     from .ast import Stmt, Value
@@ -11,6 +13,7 @@ if TYPE_CHECKING:
 __all__ = [
     "add",
     "eq",
+    "falsy",
     "ge",
     "gt",
     "le",
@@ -46,21 +49,110 @@ class LoxFunction:
     args: list[str]
     body: list["Stmt"]
     ctx: Ctx
+    slots: dict[str, int] | None = None
 
     def __call__(self, *args):
-        env = dict(zip(self.args, args, strict=True))
-        env = self.ctx.push(env)
-
-        try:
-            for stmt in self.body:
-                stmt.eval(env)
-        except LoxReturn as e:
-            return e.value
+        func = self
+        env = self.bind(args)
+
+        # Trampolim: chamadas em posição de cauda (ver `Return.tail`) chegam
+        # aqui como um `Completion` com argumentos e são executadas no mesmo
+        # frame do Python, então a pilha não cresce.
+        while True:
+            try:
+                for stmt in func.body:
+                    result = stmt.eval(env)
+                    if type(result) is Completion:
+                        break
+                else:
+                    return None
+            except LoxReturn as e:
+                return e.value
+
+            if result.args is None:
+                return result.value
+            func = result.value
+            env = func.bind(result.args)
     
+    def bind(self, args: tuple) -> Ctx:
+        """
+        Cria o escopo de execução da função com os argumentos da chamada.
+        """
+        if self.slots is None:
+            env = dict(zip(self.args, args, strict=True))
+            return self.ctx.push(env)
+        if len(args) == len(self.args):
+            return SlotCtx(self.slots, self.ctx, list(args))
+        msg = f"{self.name} espera {len(self.args)} argumentos, mas recebeu {len(args)}"
+        raise ValueError(msg)
+
     def __str__(self):
         return f"<fn {self.name}>"
 
 
+class FunctionCache:
+    """
+    Cache dos resultados de uma função pura, indexado pelos argumentos.
+
+    Guarda no máximo `maxsize` resultados (None para não ter limite). Ao
+    encher, descarta o resultado usado há mais tempo (`eviction="lru"`) ou o
+    mais antigo (`eviction="fifo"`).
+    """
+
+    def __init__(self, name: str, maxsize: int | None = 128, eviction: str = "lru"):
+        self.name = name
+        self.maxsize = maxsize
+        self.lru = eviction == "lru"
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"<cache {self.name}: {self.hits} hits, {self.misses} misses>"
+
+    def store(self, key: tuple, value: "Value") -> None:
+        entries = self.entries
+        entries[key] = value
+        if self.maxsize is not None and len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+
+class MemoFunction:
+    """
+    Função Lox pura cujos resultados ficam em um `FunctionCache`.
+    """
+
+    __slots__ = ("func", "cache")
+
+    def __init__(self, func, cache: FunctionCache):
+        self.func = func
+        self.cache = cache
+
+    def __str__(self):
+        return str(self.func)
+
+    def __call__(self, *args):
+        cache = self.cache
+        entries = cache.entries
+
+        # Os tipos fazem parte da chave, pois em Python 1.0 == True
+        key = (*map(type, args), *args)
+        try:
+            if key in entries:
+                cache.hits += 1
+                if cache.lru:
+                    entries.move_to_end(key)
+                return entries[key]
+        except TypeError:
+            # Argumentos sem hash (ex.: funções) não passam pelo cache
+            return self.func(*args)
+
+        cache.misses += 1
+        value = self.func(*args)
+        cache.store(key, value)
+        return value
+
+
 class LoxReturn(Exception):
     """
     Exceção para retornar de uma função Lox.
@@ -71,6 +163,26 @@ class LoxReturn(Exception):
         super().__init__()
 
 
+class Completion:
+    """
+    Resultado de um `return` executado sem lançar exceção.
+
+    Os comandos que contêm um `return` marcado (ver `Return.signal`) devolvem
+    este objeto para o comando envolvente, até chegar em
+    `LoxFunction.__call__`. Lançar e capturar `LoxReturn` a cada chamada custa
+    bem mais caro que repassar um valor de retorno.
+
+    Se `args` não for None, o `return` é uma chamada em posição de cauda ainda
+    não executada: `value` é a função chamada e `args` os seus argumentos.
+    """
+
+    __slots__ = ("value", "args")
+
+    def __init__(self, value, args=None):
+        self.value = value
+        self.args = args
+
+
 class LoxError(Exception):
     """
     Exceção para erros de execução Lox.
@@ -103,6 +215,10 @@ def show(value: "Value") -> str:
     if isinstance(value, type(None)):
         return "nil"
 
+    # Funções Lox compiladas pelo backend "python" (ver `lox.transpiler`)
+    if isinstance(value, FunctionType):
+        return f"<fn {value.__name__}>"
+
     return str(value)
 
 
@@ -115,6 +231,13 @@ def show_repr(value: "Value") -> str:
     return show(value)
 
 
+def falsy(value: "Value") -> bool:
+    """
+    Implementa o operador `!` do lox: negação segundo a semântica do lox.
+    """
+    return not truthy(value)
+
+
 def truthy(value: "Value") -> bool:
     """
     Converte valor lox para booleano segundo a semântica do lox.
@@ -0,0 +1,74 @@
+"""
+Seleção da implementação do Lark usada pelo Lox.
+
+Por padrão o Lox usa a biblioteca Lark. Com a variável de ambiente
+`LOX_PARSER=standalone`, usa o parser autônomo gerado por `python -m lox.build`
+(`lox/_standalone.py`), que já contém as tabelas LALR e não depende do pacote
+`lark`. Isso reduz o tempo de inicialização de processos curtos.
+
+Os demais módulos importam daqui as classes do Lark (`Token`, `Tree`,
+`Transformer`, `Lexer`, exceções...), para que a árvore, os tokens e os erros venham
+sempre da mesma implementação que fez a análise sintática.
+
+Se o módulo gerado não existir ou tiver sido gerado a partir de outra versão
+da gramática, o Lox emite um aviso e usa a biblioteca Lark.
+"""
+
+import hashlib
+import os
+import warnings
+from pathlib import Path
+from types import ModuleType
+
+DIR = Path(__file__).parent
+GRAMMAR_PATH = DIR / "grammar.lark"
+STANDALONE_PATH = DIR / "_standalone.py"
+
+PARSERS = ("lark", "standalone")
+
+
+def grammar_hash(grammar: str) -> str:
+    return hashlib.sha256(grammar.encode()).hexdigest()[:16]
+
+
+def load_standalone() -> ModuleType | None:
+    """
+    Importa o parser autônomo, se ele existir e corresponder à gramática atual.
+    """
+    try:
+        from . import _standalone
+    except ImportError:
+        warnings.warn("parser autônomo não encontrado; execute `python -m lox.build`")
+        return None
+    if _standalone.GRAMMAR_HASH != grammar_hash(GRAMMAR_PATH.read_text()):
+        warnings.warn("parser autônomo desatualizado; execute `python -m lox.build`")
+        return None
+    return _standalone
+
+
+PARSER = os.environ.get("LOX_PARSER", "lark")
+if PARSER not in PARSERS:
+    raise ValueError(f"LOX_PARSER inválido: {PARSER!r} (use {' ou '.join(PARSERS)})")
+
+standalone = load_standalone() if PARSER == "standalone" else None
+
+if standalone is None:
+    from lark import (
+        Token,
+        Transformer,
+        Tree,
+        UnexpectedCharacters,
+        UnexpectedInput,
+        UnexpectedToken,
+        v_args,
+    )
+    from lark.lexer import Lexer
+else:
+    Lexer = standalone.Lexer
+    Token = standalone.Token
+    Transformer = standalone.Transformer
+    Tree = standalone.Tree
+    UnexpectedCharacters = standalone.UnexpectedCharacters
+    UnexpectedInput = standalone.UnexpectedInput
+    UnexpectedToken = standalone.UnexpectedToken
+    v_args = standalone.v_args
@@ -0,0 +1,138 @@
+"""
+Execução em fluxo de programas Lox muito grandes.
+
+Em vez de ler o arquivo inteiro e construir a árvore do programa completo, o
+código fonte é lido em blocos e dividido em declarações de nível superior
+(com as mesmas regras de `lox.incremental`). Cada declaração é analisada,
+otimizada e executada antes da leitura da próxima, de modo que a memória usada
+pelo front-end é limitada pela maior declaração e a saída começa
+imediatamente.
+
+    >>> with open("programa.lox") as file:  # doctest: +SKIP
+    ...     eval_stream(read_chunks(file))
+
+Declarações já executadas não são desfeitas se uma declaração posterior tiver
+um erro de sintaxe.
+"""
+
+from typing import IO, Iterable, Iterator
+
+from .ast import Program, Stmt
+from .ctx import Ctx
+from .parser import lex, parse
+from .standalone import UnexpectedCharacters
+
+# Tamanho dos blocos lidos do arquivo, em caracteres
+CHUNK_SIZE = 64 * 1024
+
+# Motores de execução que aceitam executar o programa em partes
+STREAM_BACKENDS = ("tree", "closure", "vm")
+
+
+def read_chunks(file: IO[str], size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Lê o arquivo em blocos de `size` caracteres.
+    """
+    while chunk := file.read(size):
+        yield chunk
+
+
+def declarations(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Agrupa os blocos de texto em declarações de nível superior.
+
+    Cada item gerado é o código fonte de uma declaração, precedido pelos
+    espaços e comentários anteriores a ela. O que sobra no final (uma
+    declaração incompleta ou só espaços e comentários) é gerado por último.
+    """
+    buffer = ""
+    # Tamanho que o buffer precisa atingir antes de ser examinado de novo.
+    # Quando nenhuma declaração termina no buffer, ele dobra de tamanho antes
+    # da próxima análise, para que declarações longas não sejam relidas
+    # muitas vezes.
+    wanted = 0
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) < wanted:
+            continue
+        start = 0
+        for end in split(buffer):
+            yield buffer[start:end]
+            start = end
+        buffer = buffer[start:]
+        wanted = 2 * len(buffer) if start == 0 else 0
+    if buffer:
+        yield buffer
+
+
+def split(buffer: str) -> Iterator[int]:
+    """
+    Gera as posições em que terminam as declarações completas do buffer.
+
+    Uma declaração só é considerada completa quando o token seguinte também
+    está inteiro no buffer (e não é `else`): o buffer pode ter sido cortado no
+    meio de um token ou antes do `else` de um `if`.
+    """
+    depth = 0
+    pending = None
+    tokens = lex(buffer)
+    while True:
+        try:
+            token = next(tokens)
+        except (StopIteration, UnexpectedCharacters):
+            # Fim do buffer ou token cortado (ex.: uma string sem o `"` final)
+            return
+        if pending is not None and token.end_pos < len(buffer):
+            if token.value != "else":
+                yield pending
+            pending = None
+        if token.value in ("(", "{"):
+            depth += 1
+        elif token.value in (")", "}"):
+            depth -= 1
+        if depth == 0 and token.value in (";", "}"):
+            pending = token.end_pos
+
+
+def parse_stream(chunks: Iterable[str]) -> Iterator[list[Stmt]]:
+    """
+    Gera os comandos de cada declaração de nível superior.
+    """
+    for source in declarations(chunks):
+        yield parse(source, cache=False).stmts
+
+
+def eval_stream(
+    chunks: Iterable[str],
+    env: Ctx | None = None,
+    optimize: bool = True,
+    backend: str = "tree",
+) -> Ctx:
+    """
+    Analisa e executa o programa declaração por declaração.
+
+    Com `optimize`, aplica a propagação de constantes a cada declaração,
+    mantendo as constantes conhecidas entre elas. A eliminação de variáveis
+    não utilizadas precisa do programa inteiro e não é aplicada.
+
+    Retorna o ambiente global ao final da execução.
+    """
+    from . import eval as lox_eval
+
+    if backend not in STREAM_BACKENDS:
+        raise ValueError(f"o backend {backend} não suporta execução em fluxo")
+    if env is None:
+        env = Ctx.from_dict({})
+
+    if optimize:
+        from .optimizations import ConstantPropagation
+
+        propagation = ConstantPropagation()
+
+    for stmts in parse_stream(chunks):
+        program = Program(stmts)
+        if optimize:
+            propagation.propagate(program)
+        # `parse` já validou a declaração
+        lox_eval(program, env, optimize=False, skip_validation=True, backend=backend)
+    return env
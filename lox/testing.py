@@ -15,7 +15,7 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Any, Callable, Iterable
 
 import pytest
-from lark import Tree, UnexpectedCharacters, UnexpectedToken
+from .standalone import Tree, UnexpectedCharacters, UnexpectedToken
 
 try:
     from rich import print
@@ -5,14 +5,26 @@ Implementa o transformador da árvore sintática que converte entre as represent
 
 A resolução de vários exercícios requer a modificação ou implementação de vários
 métodos desta classe.
+
+Programas gerados repetem as mesmas constantes e nomes milhares de vezes. Cada
+ocorrência continua tendo o seu próprio nó (a árvore não tem nós repetidos, o
+que `Node.cursor` e `Node.replace_child` exigem), mas os valores são
+compartilhados: números e strings iguais são o mesmo objeto. Nomes de
+variáveis passam por `sys.intern`: nomes iguais são o mesmo objeto e as buscas
+nos dicionários de escopo resolvem a comparação por identidade.
 """
 
+import sys
 from typing import Callable
-from lark import Transformer, v_args
+from .standalone import Transformer, v_args
 
 from . import runtime as op
 from .ast import *
 
+# Número máximo de valores guardados por tabela; quando cheia, a tabela é
+# esvaziada para não crescer sem limite num processo que analisa muitos programas
+MAX_LITERALS = 1 << 16
+
 
 def op_handler(op: Callable):
     """
@@ -29,6 +41,23 @@ def op_handler(op: Callable):
 
 @v_args(inline=True)
 class LoxTransformer(Transformer):
+    def __init__(self, visit_tokens: bool = True):
+        super().__init__(visit_tokens)
+        # Texto do token -> valor compartilhado
+        self.numbers: dict[str, float] = {}
+        self.strings: dict[str, str] = {}
+
+    def literal(self, table: dict[str, Value], text: str, value: Value) -> Literal:
+        """
+        Cria o literal do token, reaproveitando o valor de ocorrências anteriores.
+        """
+        shared = table.get(text)
+        if shared is None:
+            if len(table) >= MAX_LITERALS:
+                table.clear()
+            shared = table[text] = value
+        return Literal(shared)
+
     # Programa
     def program(self, *stmts):
         return Program(list(stmts))
@@ -89,7 +118,7 @@ class LoxTransformer(Transformer):
         return Setattr(obj, name, value)
 
     def not_(self, expr: Expr):
-        return UnaryOp(lambda x: not truthy(x), expr)
+        return UnaryOp(op.falsy, expr)
     
     def neg(self, expr: Expr):
         return UnaryOp(op.neg, expr)
@@ -110,7 +139,7 @@ class LoxTransformer(Transformer):
 
     def if_cmd(self, cond: Expr, then: Expr, not_then: Expr = None):
         if not_then is None:
-            not_then = Literal(None) 
+            not_then = Literal(None)
         return If(cond, then, not_then)
     
     def while_cmd(self, cond: Expr, then: Expr):
@@ -148,20 +177,19 @@ class LoxTransformer(Transformer):
         return Return(expr)
     
     def VAR(self, token):
-        name = str(token)
+        name = sys.intern(str(token))
         return Var(name)
 
     def NUMBER(self, token):
-        num = float(token)
-        return Literal(num)
+        text = str(token)
+        return self.literal(self.numbers, text, float(text))
     
     def STRING(self, token):
-        text = str(token)[1:-1]
-        return Literal(text)
+        text = str(token)
+        return self.literal(self.strings, text, text[1:-1])
     
     def NIL(self, _):
         return Literal(None)
 
     def BOOL(self, token):
         return Literal(token == "true")
-    
\ No newline at end of file
@@ -0,0 +1,722 @@
+"""
+Backend que traduz programas Lox para código fonte Python.
+
+O programa é convertido em texto Python, compilado com `compile()` e executado
+pelo próprio interpretador de bytecode do CPython. Laços e chamadas de função
+Lox viram laços e chamadas Python comuns:
+
+- variáveis locais viram variáveis locais Python, renomeadas para que cada
+  declaração tenha um nome único (o que resolve o sombreamento entre blocos);
+- closures usam as células do Python (`nonlocal`);
+- o escopo global do Lox é o próprio dicionário de globais usado no `exec`.
+
+Os objetos de código compilados ficam em cache, em memória e em disco,
+indexados pelo hash do código fonte: executar de novo o mesmo script dispensa
+toda a análise sintática, as otimizações e a tradução.
+
+Uso:
+
+    >>> code = compile_source("print 1 + 2;")
+    >>> run(code, Ctx.from_dict({}))
+    3
+
+Chamadas em posição de cauda (`return f(x);`) não aumentam a pilha: a função
+que as contém é traduzida em duas, o corpo, que retorna a chamada ainda não
+executada (um `Completion`), e uma função de entrada com o trampolim que a
+executa, como em `LoxFunction.__call__`.
+
+Diferenças em relação ao interpretador de árvore: erros de tipo (por exemplo,
+chamar algo que não é função ou passar o número errado de argumentos) são
+reportados com as mensagens do próprio Python e a profundidade das demais
+chamadas recursivas é limitada pelo limite de recursão do Python.
+"""
+
+import hashlib
+import keyword
+import marshal
+import sys
+from dataclasses import dataclass, field
+from itertools import count
+from pathlib import Path
+from types import CodeType
+
+from . import ast
+from . import runtime as op
+from .cache import cache_dir, write_atomic
+from .ctx import Ctx
+from .node import Node
+from .resolver import block_slots
+from .runtime import Completion, LoxReturn
+from .vm import get_attribute
+
+# Prefixo reservado para nomes gerados pelo tradutor
+PREFIX = "_lox_"
+MAIN = f"{PREFIX}main"
+
+DIR = Path(__file__).parent
+
+# Arquivos que, além do front-end, determinam o código gerado
+BACKEND_FILES = (
+    "transpiler.py",
+    "optimizations.py",
+    "resolver.py",
+)
+
+_VERSION: str | None = None
+
+BINARY_OPS = {
+    op.add: "+",
+    op.sub: "-",
+    op.mul: "*",
+    op.truediv: "/",
+    op.lt: "<",
+    op.le: "<=",
+    op.gt: ">",
+    op.ge: ">=",
+    op.eq: "==",
+    op.ne: "!=",
+}
+
+# Operadores que sempre produzem booleanos e dispensam `truthy` em condições
+COMPARISONS = {op.lt, op.le, op.gt, op.ge, op.eq, op.ne}
+
+_CODE_CACHE: dict[str, CodeType] = {}
+
+
+@dataclass
+class Frame:
+    """
+    Função Python sendo gerada: o programa principal, uma função Lox ou o
+    corpo de um bloco executado como função (ver `Transpiler.block`).
+    """
+
+    # Verdadeiro se um `return` Lox retorna da função Python
+    in_function: bool
+
+    # Nomes declarados com `global` e `nonlocal` no cabeçalho da função
+    globals: set[str] = field(default_factory=set)
+    nonlocals: set[str] = field(default_factory=set)
+
+    # Número de laços envolvendo o ponto atual, dentro desta função
+    loop_depth: int = 0
+
+    def header(self) -> list[str]:
+        lines = []
+        if self.globals:
+            lines.append(f"global {', '.join(sorted(self.globals))}")
+        if self.nonlocals:
+            lines.append(f"nonlocal {', '.join(sorted(self.nonlocals))}")
+        return lines
+
+
+@dataclass
+class Scope:
+    """
+    Escopo local Lox, como em `lox.resolver.Scope`.
+    """
+
+    # Tabela nome Lox -> nome Python de todas as variáveis declaradas
+    names: dict[str, str]
+
+    # Função Python que contém as variáveis do escopo
+    frame: Frame
+
+    # Variáveis já declaradas até o ponto atual da tradução
+    defined: set[str] = field(default_factory=set)
+
+    # Verdadeiro para o escopo dos parâmetros de uma função Lox
+    is_function: bool = False
+
+
+class Transpiler:
+    def __init__(self):
+        self.ids = count(1)
+        self.scopes: list[Scope] = []
+        self.frame = Frame(in_function=False)
+        # Verdadeiro se a função Lox sendo traduzida tem chamadas em posição
+        # de cauda e precisa de um trampolim (ver `function`)
+        self.tail_calls = False
+
+    def fresh(self, name: str) -> str:
+        """
+        Cria um nome Python único para a declaração de `name`.
+        """
+        return f"{PREFIX}{name}_{next(self.ids)}"
+
+    def module(self, node: Node) -> str:
+        """
+        Traduz o nó para um módulo Python que define a função principal.
+        """
+        if isinstance(node, ast.Expr):
+            body = [f"return {self.expr(node)}"]
+        else:
+            body = self.stmt(node)
+        lines = [f"def {MAIN}():", *indent([*self.frame.header(), *body] or ["pass"])]
+        return "\n".join(lines) + "\n"
+
+    #
+    # VARIÁVEIS
+    #
+    def lookup(self, name: str) -> list[Scope | None]:
+        """
+        Lista os escopos onde a variável pode estar, do mais interno ao mais
+        externo. None representa o escopo global.
+
+        Como no resolvedor, a ligação só é ambígua quando o nome é declarado num
+        escopo externo depois da função que o referencia. Nesse caso, o código
+        gerado testa os candidatos em ordem até encontrar um já definido.
+        """
+        candidates: list[Scope | None] = []
+        crossed_function = False
+        for scope in reversed(self.scopes):
+            if name in scope.defined:
+                candidates.append(scope)
+                return candidates
+            if name in scope.names and crossed_function:
+                candidates.append(scope)
+            if scope.is_function:
+                crossed_function = True
+        candidates.append(None)
+        return candidates
+
+    def load(self, name: str) -> str:
+        candidates = [self.load_from(scope, name) for scope in self.lookup(name)]
+        if len(candidates) == 1:
+            return candidates[0]
+        thunks = ", ".join(f"lambda: {c}" for c in candidates)
+        return f"{PREFIX}first({thunks})"
+
+    def load_from(self, scope: Scope | None, name: str) -> str:
+        if scope is not None:
+            return scope.names[name]
+        if is_safe(name):
+            return name
+        return f"{PREFIX}get({name!r})"
+
+    def store(self, scope: Scope | None, name: str, value: str) -> str:
+        """
+        Expressão que atribui `value` à variável, retornando o valor.
+        """
+        if scope is not None:
+            target = scope.names[name]
+            if scope.frame is not self.frame:
+                self.frame.nonlocals.add(target)
+            return f"({target} := {value})"
+        check = f"{PREFIX}check({name!r})"
+        if is_safe(name):
+            self.frame.globals.add(name)
+            return f"({name} := {check} or ({value}))"
+        return f"{PREFIX}set({name!r}, {check} or ({value}))"
+
+    def declare(self, name: str) -> str | None:
+        """
+        Declara a variável no escopo atual e retorna o nome Python usado na
+        definição. Retorna None para globais que não são identificadores
+        Python válidos e devem ser acessadas pelo dicionário de globais.
+        """
+        if not self.scopes:
+            if is_safe(name):
+                self.frame.globals.add(name)
+                return name
+            return None
+        scope = self.scopes[-1]
+        scope.defined.add(name)
+        return scope.names[name]
+
+    def is_redefinition(self, name: str) -> bool:
+        return bool(self.scopes) and name in self.scopes[-1].defined
+
+    #
+    # COMANDOS
+    #
+    def stmt(self, node: Node) -> list[str]:
+        """
+        Traduz um comando para uma lista de linhas Python.
+        """
+        if isinstance(node, ast.Program):
+            return self.stmts(node.stmts)
+        if isinstance(node, ast.Block):
+            return self.block(node)
+        if isinstance(node, ast.VarDef):
+            return self.vardef(node)
+        if isinstance(node, ast.Function):
+            return self.function(node)
+        if isinstance(node, ast.If):
+            return self.if_(node)
+        if isinstance(node, ast.While):
+            return self.while_(node)
+        if isinstance(node, ast.Print):
+            return [f"{PREFIX}print({self.expr(node.expr)})"]
+        if isinstance(node, ast.Return):
+            if self.frame.in_function and is_tail_call(node.expr):
+                self.tail_calls = True
+                args = "".join(f", {self.expr(arg)}" for arg in node.expr.args)
+                return [f"return {PREFIX}tail({self.expr(node.expr.node)}{args})"]
+            value = self.expr(node.expr)
+            if self.frame.in_function:
+                return [f"return {value}"]
+            return [f"raise {PREFIX}LoxReturn({value})"]
+        if isinstance(node, ast.NoOp):
+            return []
+        if isinstance(node, ast.Literal):
+            return []
+        if isinstance(node, ast.Assign):
+            candidates = self.lookup(node.name.name)
+            if len(candidates) > 1:
+                return self.probe_assign(node.name.name, candidates, self.expr(node.expr))
+        if isinstance(node, ast.Expr):
+            return [self.expr(node)]
+        return [unsupported(node)]
+
+    def stmts(self, stmts: list) -> list[str]:
+        return [line for stmt in stmts for line in self.stmt(stmt)]
+
+    def block(self, node: ast.Block) -> list[str]:
+        names = {name: self.fresh(name) for name in block_slots(node)}
+        if not names:
+            return self.stmts(node.statements)
+
+        # Dentro de laços, cada execução do bloco cria variáveis novas. Se
+        # alguma função as captura, o bloco vira uma função Python para que
+        # cada iteração tenha as suas próprias células.
+        if self.frame.loop_depth and captures(node, names):
+            return self.block_function(node, names)
+
+        self.scopes.append(Scope(names, self.frame))
+        lines = self.stmts(node.statements)
+        self.scopes.pop()
+        return lines
+
+    def block_function(self, node: ast.Block, names: dict[str, str]) -> list[str]:
+        name = self.fresh("block")
+        parent, self.frame = self.frame, Frame(in_function=self.frame.in_function)
+        self.scopes.append(Scope(names, self.frame))
+        body = self.stmts(node.statements)
+        self.scopes.pop()
+        frame, self.frame = self.frame, parent
+
+        lines = [
+            f"def {name}():",
+            *indent([*frame.header(), *body, f"return {PREFIX}NORETURN"]),
+        ]
+        if not parent.in_function:
+            return [*lines, f"{name}()"]
+        result = f"{PREFIX}result"
+        return [
+            *lines,
+            f"{result} = {name}()",
+            f"if {result} is not {PREFIX}NORETURN:",
+            f"    return {result}",
+        ]
+
+    def vardef(self, node: ast.VarDef) -> list[str]:
+        # O inicializador é avaliado antes da declaração
+        value = self.expr(node.expr)
+        if self.is_redefinition(node.name):
+            return [value, redefinition(node.name)]
+        target = self.declare(node.name)
+        if target is None:
+            return [f"{PREFIX}G[{node.name!r}] = {value}"]
+        return [f"{target} = {value}"]
+
+    def function(self, node: ast.Function) -> list[str]:
+        name = node.identifier
+        if self.is_redefinition(name):
+            return [redefinition(name)]
+
+        # O nome da função é declarado antes do corpo para permitir recursão
+        target = self.declare(name)
+        params = [self.fresh(arg) for arg in node.args]
+
+        parent, self.frame = self.frame, Frame(in_function=True)
+        parent_tail_calls, self.tail_calls = self.tail_calls, False
+        names = dict(zip(node.args, params))
+        self.scopes.append(Scope(names, self.frame, set(names), is_function=True))
+        body = self.stmt(node.body)
+        self.scopes.pop()
+        frame, self.frame = self.frame, parent
+        tail_calls, self.tail_calls = self.tail_calls, parent_tail_calls
+
+        pyname = target if target is not None else self.fresh(name)
+        signature = ", ".join(params)
+        if not tail_calls:
+            lines = [
+                f"def {pyname}({signature}):",
+                *indent([*frame.header(), *body] or ["pass"]),
+            ]
+        else:
+            # O corpo retorna as chamadas em posição de cauda sem executá-las;
+            # a função de entrada as executa em laço. O trampolim chama
+            # diretamente o corpo das funções Lox chamadas (`_lox_body`).
+            body_name = self.fresh(f"{name}_body")
+            result = f"{PREFIX}result"
+            lines = [
+                f"def {body_name}({signature}):",
+                *indent([*frame.header(), *body]),
+                f"def {pyname}({signature}):",
+                f"    {result} = {body_name}({signature})",
+                f"    while {result}.__class__ is {PREFIX}Completion:",
+                f"        {result} = {result}.value(*{result}.args)",
+                f"    return {result}",
+                f"{pyname}.{PREFIX}body = {body_name}",
+            ]
+        if pyname != name:
+            lines.append(f"{pyname}.__name__ = {name!r}")
+        if target is None:
+            lines.append(f"{PREFIX}G[{name!r}] = {pyname}")
+        return lines
+
+    def if_(self, node: ast.If) -> list[str]:
+        lines = [f"if {self.cond(node.cond)}:", *indent(self.stmt(node.then) or ["pass"])]
+        not_then = self.stmt(node.not_then)
+        if not_then:
+            lines += ["else:", *indent(not_then)]
+        return lines
+
+    def while_(self, node: ast.While) -> list[str]:
+        cond = self.cond(node.cond)
+        self.frame.loop_depth += 1
+        body = self.stmt(node.then)
+        self.frame.loop_depth -= 1
+        return [f"while {cond}:", *indent(body or ["pass"])]
+
+    def probe_assign(self, name: str, candidates: list[Scope | None], value: str) -> list[str]:
+        """
+        Atribuição a uma variável de ligação ambígua: testa cada candidato em
+        ordem e atribui ao primeiro já definido.
+        """
+        scope, *rest = candidates
+        if not rest:
+            return [self.store(scope, name, value)]
+        assert scope is not None
+        target = self.load_from(scope, name)
+        return [
+            "try:",
+            f"    {target}",
+            f"except {PREFIX}NameError:",
+            *indent(self.probe_assign(name, rest, value)),
+            "else:",
+            f"    {self.store(scope, name, value)}",
+        ]
+
+    #
+    # EXPRESSÕES
+    #
+    def expr(self, node: Node) -> str:
+        """
+        Traduz uma expressão para uma expressão Python.
+        """
+        if isinstance(node, ast.Literal):
+            return literal(node.value)
+        if isinstance(node, ast.Var):
+            return self.load(node.name)
+        if isinstance(node, ast.BinOp):
+            symbol = BINARY_OPS.get(node.op)
+            if symbol is None:
+                raise NotImplementedError(f"operador {node.op} não suportado pelo backend python")
+            return f"({self.expr(node.left)} {symbol} {self.expr(node.right)})"
+        if isinstance(node, ast.UnaryOp):
+            return self.unary(node)
+        if isinstance(node, ast.And):
+            first, second = map(self.expr, node.expr)
+            return f"(False if {first} == False else False if {second} == False else True)"
+        if isinstance(node, ast.Or):
+            first, second = map(self.expr, node.expr)
+            return f"(True if {first} == True else True if {second} == True else False)"
+        if isinstance(node, ast.Assign):
+            name = node.name.name
+            candidates = self.lookup(name)
+            if len(candidates) > 1:
+                msg = f"atribuição a {name} não suportada pelo backend python"
+                raise NotImplementedError(msg)
+            return self.store(candidates[0], name, self.expr(node.expr))
+        if isinstance(node, ast.Call):
+            args = ", ".join(map(self.expr, node.args))
+            if isinstance(node.node, ast.Literal):
+                return f"{PREFIX}call({self.expr(node.node)}, {args})"
+            return f"{self.expr(node.node)}({args})"
+        if isinstance(node, ast.Getattr):
+            return f"{PREFIX}getattr({self.expr(node.obj)}, {node.name!r})"
+        if isinstance(node, ast.Setattr):
+            obj = f"{PREFIX}hasattr({self.expr(node.obj)}, {node.name!r})"
+            return f"{PREFIX}setattr({obj}, {node.name!r}, {self.expr(node.value)})"
+        return f"{PREFIX}unsupported({type(node).__name__!r})"
+
+    def unary(self, node: ast.UnaryOp) -> str:
+        value = self.expr(node.expr)
+        if node.op is op.neg:
+            return f"(-{value})"
+        if node.op is op.falsy:
+            return f"(not {PREFIX}truthy({value}))"
+        if node.op is op.not_:
+            return f"(not {value})"
+        raise NotImplementedError(f"operador {node.op} não suportado pelo backend python")
+
+    def cond(self, node: Node) -> str:
+        """
+        Traduz uma condição de `if` ou `while` para um booleano Python.
+        """
+        if isinstance(node, (ast.And, ast.Or)):
+            return self.expr(node)
+        if isinstance(node, ast.BinOp) and node.op in COMPARISONS:
+            return self.expr(node)
+        if isinstance(node, ast.Literal):
+            return repr(op.truthy(node.value))
+        return f"{PREFIX}truthy({self.expr(node)})"
+
+
+#
+# FUNÇÕES AUXILIARES DA TRADUÇÃO
+#
+def indent(lines: list[str]) -> list[str]:
+    return [f"    {line}" for line in lines]
+
+
+def is_safe(name: str) -> bool:
+    """
+    Verifica se a variável global pode ser usada como identificador Python.
+    """
+    return (
+        name.isidentifier()
+        and not keyword.iskeyword(name)
+        and not name.startswith(PREFIX)
+        and not (name.startswith("__") and name.endswith("__"))
+    )
+
+
+def literal(value) -> str:
+    if isinstance(value, float) and value != value:
+        return "(1e999 - 1e999)"
+    if value == float("inf"):
+        return "1e999"
+    if value == float("-inf"):
+        return "(-1e999)"
+    return repr(value)
+
+
+def redefinition(name: str) -> str:
+    msg = f"Variable '{name}' already defined in the current scope."
+    return f"raise {PREFIX}KeyError({msg!r})"
+
+
+def unsupported(node: Node) -> str:
+    return f"{PREFIX}unsupported({type(node).__name__!r})"
+
+
+def is_tail_call(node: Node) -> bool:
+    """
+    Verifica se a expressão de um `return` é uma chamada executada pelo
+    trampolim. Chamadas de literais ficam de fora, pois reportam o erro com
+    a mensagem do Lox (ver `_call`).
+    """
+    return isinstance(node, ast.Call) and not isinstance(node.node, ast.Literal)
+
+
+def captures(block: ast.Block, names: dict[str, str]) -> bool:
+    """
+    Verifica se alguma função declarada dentro do bloco referencia um dos
+    nomes dados.
+    """
+    for node in block.descendants():
+        if isinstance(node, ast.Function):
+            for inner in node.body.descendants():
+                if isinstance(inner, ast.Var) and inner.name in names:
+                    return True
+    return False
+
+
+#
+# AMBIENTE DE EXECUÇÃO
+#
+class _NoReturn:
+    """
+    Valor retornado por blocos executados como funções que terminam sem
+    executar um `return`.
+    """
+
+
+def _first(*thunks):
+    for thunk in thunks[:-1]:
+        try:
+            return thunk()
+        except NameError:
+            pass
+    return thunks[-1]()
+
+
+def _call(func, *args):
+    if callable(func):
+        return func(*args)
+    raise TypeError(f"{op.show(func)} não é uma função!")
+
+
+def _tail(func, *args):
+    # Chamada em posição de cauda: o trampolim da função de entrada a executa,
+    # indo direto ao corpo se `func` também for uma função com trampolim
+    return Completion(getattr(func, f"{PREFIX}body", func), args)
+
+
+def _hasattr(obj, name: str):
+    if hasattr(obj, name):
+        return obj
+    raise AttributeError(f"Atributo {name} não encontrado no objeto {type(obj).__name__}")
+
+
+def _setattr(obj, name: str, value):
+    setattr(obj, name, value)
+    return value
+
+
+def _unsupported(name: str):
+    raise NotImplementedError(f"Método eval não implementado para {name}!")
+
+
+HELPERS = {
+    f"{PREFIX}call": _call,
+    f"{PREFIX}first": _first,
+    f"{PREFIX}getattr": get_attribute,
+    f"{PREFIX}hasattr": _hasattr,
+    f"{PREFIX}setattr": _setattr,
+    f"{PREFIX}tail": _tail,
+    f"{PREFIX}print": op.print,
+    f"{PREFIX}truthy": op.truthy,
+    f"{PREFIX}unsupported": _unsupported,
+    f"{PREFIX}Completion": Completion,
+    f"{PREFIX}KeyError": KeyError,
+    f"{PREFIX}LoxReturn": LoxReturn,
+    f"{PREFIX}NameError": NameError,
+    f"{PREFIX}NORETURN": _NoReturn(),
+}
+
+
+def make_builtins(ctx: Ctx) -> dict:
+    """
+    Cria o dicionário de builtins do código gerado: os builtins do Lox, os
+    escopos acima de `ctx` e as funções auxiliares do tradutor.
+    """
+    scope = ctx.scope
+    env = ctx.parent.to_dict() if ctx.parent is not None else {}
+
+    def check(name: str) -> None:
+        if name not in scope and name not in env:
+            raise NameError(f"variável {name} não existe!")
+
+    def get(name: str):
+        if name in scope:
+            return scope[name]
+        if name in env:
+            return env[name]
+        raise NameError(f"variável {name} não existe!")
+
+    def set_(name: str, value):
+        scope[name] = value
+        return value
+
+    return {
+        **env,
+        **HELPERS,
+        f"{PREFIX}G": scope,
+        f"{PREFIX}check": check,
+        f"{PREFIX}get": get,
+        f"{PREFIX}set": set_,
+    }
+
+
+#
+# API
+#
+def transpile(node: Node) -> str:
+    """
+    Traduz a árvore sintática para código fonte Python.
+    """
+    return Transpiler().module(node)
+
+
+def compile_tree(node: Node) -> CodeType:
+    """
+    Traduz e compila a árvore sintática, sem usar o cache.
+    """
+    return compile(transpile(node), "<lox>", "exec")
+
+
+def compile_source(src: str, optimize: bool = True) -> CodeType:
+    """
+    Compila o código fonte Lox, consultando o cache de objetos de código.
+
+    Programas já vistos são recuperados pelo hash do código fonte, primeiro na
+    memória e depois em disco, sem passar pelo parser nem pelas otimizações.
+    """
+    key = source_hash(src, optimize)
+    code = _CODE_CACHE.get(key)
+    if code is not None:
+        return code
+
+    directory = cache_dir("python")
+    path = directory / f"{key}.bin" if directory is not None else None
+    if path is not None and path.exists():
+        try:
+            code = marshal.loads(path.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            code = None
+
+    if code is None:
+        from .parser import parse
+
+        tree = parse(src)
+        if optimize:
+            from .optimizations import optimize_ast
+
+            tree = optimize_ast(tree)
+        code = compile_tree(tree)
+        if path is not None:
+            write_atomic(path, marshal.dumps(code))
+
+    _CODE_CACHE[key] = code
+    return code
+
+
+def version() -> str:
+    """
+    Hash do front-end (ver `lox.astcache.frontend_version`), do otimizador, do
+    resolvedor e do próprio tradutor, calculado uma vez por processo.
+    """
+    global _VERSION
+    if _VERSION is None:
+        from .astcache import frontend_version
+
+        digest = hashlib.sha256(frontend_version().encode())
+        for name in BACKEND_FILES:
+            digest.update((DIR / name).read_bytes())
+        _VERSION = digest.hexdigest()[:16]
+    return _VERSION
+
+
+def source_hash(src: str, optimize: bool) -> str:
+    """
+    Chave do cache: depende do código fonte, das opções de compilação, dos
+    módulos que produzem o código (ver `version`) e da versão do Python (o
+    formato do bytecode muda entre versões).
+    """
+    data = f"{version()}:{sys.implementation.cache_tag}:{int(optimize)}:{src}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def run(code: CodeType, ctx: Ctx) -> "ast.Value":
+    """
+    Executa o código gerado com as variáveis globais de `ctx`.
+    """
+    scope = ctx.scope
+    scope["__builtins__"] = make_builtins(ctx)
+    try:
+        exec(code, scope)
+        main = scope.pop(MAIN)
+    finally:
+        # As funções criadas guardam uma referência própria aos builtins
+        del scope["__builtins__"]
+
+    try:
+        return main()
+    except NameError as e:
+        if e.name is None:
+            raise
+        raise NameError(f"variável {e.name} não existe!") from None
@@ -0,0 +1,705 @@
+"""
+Compilador de bytecode e máquina virtual de pilha para Lox.
+
+O compilador traduz a árvore sintática (já anotada pelo resolvedor, ver
+`lox.resolver`) para objetos `Code`. Cada `Code` possui uma sequência plana de
+instruções no formato (opcode, argumento), uma tabela de constantes, uma
+tabela de nomes globais e uma tabela de referências para variáveis locais de
+escopos externos.
+
+A máquina virtual executa essas instruções num único laço de despacho. Chamadas
+entre funções Lox não usam a pilha do Python: cada chamada empilha um registro
+de ativação na lista de frames da VM, então a profundidade de recursão de um
+programa Lox não é limitada pela pilha do interpretador Python.
+
+Variáveis locais usam os mesmos escopos de slots do interpretador
+(`lox.ctx.SlotCtx`), o que mantém closures e escopos de bloco com exatamente a
+mesma semântica de `Node.eval`.
+
+Uso:
+
+    >>> code = compile_program(parse("print 1 + 2;"))
+    >>> print(disassemble(code))
+    >>> run(code, Ctx())
+"""
+
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+from . import ast
+from . import runtime as op
+from .ctx import Ctx, SlotCtx
+from .node import Node
+from .runtime import FunctionCache, LoxFunction, LoxReturn, MemoFunction
+
+
+class Op(IntEnum):
+    """
+    Opcodes da máquina virtual.
+
+    Toda instrução ocupa duas posições na sequência de bytecode: o opcode e um
+    argumento inteiro (0 quando não é usado).
+    """
+
+    # Constantes e variáveis
+    LOAD_CONST = 1  # empilha consts[arg]
+    LOAD_FAST = 2  # empilha o slot arg do escopo atual
+    STORE_FAST = 3  # desempilha e guarda o valor no slot arg do escopo atual
+    LOAD_DEREF = 4  # empilha a variável refs[arg] = (frame, slot)
+    STORE_DEREF = 5  # desempilha e guarda o valor na variável refs[arg]
+    LOAD_NAME = 6  # busca names[arg] por nome
+    STORE_NAME = 7  # desempilha e atribui o valor a names[arg]
+    CHECK_NAME = 8  # falha se names[arg] não existe
+    DEFINE_FAST = 9  # desempilha e declara a variável no slot arg
+    DEFINE_NAME = 10  # desempilha e declara names[arg] por nome
+
+    # Escopos
+    PUSH_SCOPE = 11  # abre um escopo de slots com a tabela consts[arg]
+    PUSH_DICT_SCOPE = 12  # abre um escopo baseado em dicionário
+    POP_SCOPE = 13
+
+    # Operações
+    ADD = 20
+    SUB = 21
+    MUL = 22
+    DIV = 23
+    LT = 24
+    LE = 25
+    GT = 26
+    GE = 27
+    EQ = 28
+    NE = 29
+    BINARY_OP = 30  # aplica a função consts[arg] aos dois valores do topo
+    NEG = 31
+    UNARY_OP = 32  # aplica a função consts[arg] ao topo
+
+    # Operações com o operando da direita constante: topo OP consts[arg]
+    ADD_CONST = 40
+    SUB_CONST = 41
+    MUL_CONST = 42
+    DIV_CONST = 43
+    LT_CONST = 44
+    LE_CONST = 45
+    GT_CONST = 46
+    GE_CONST = 47
+    EQ_CONST = 48
+    NE_CONST = 49
+
+    # Controle de fluxo (argumentos são deslocamentos relativos à próxima instrução)
+    JUMP = 50
+    POP_JUMP_IF_FALSE = 51  # desempilha e salta se o valor for falso em Lox
+    POP_JUMP_IF_EQ_FALSE = 52  # desempilha e salta se valor == False (and)
+    POP_JUMP_IF_EQ_TRUE = 53  # desempilha e salta se valor == True (or)
+
+    # Funções e objetos
+    CALL = 60  # chama uma função com arg argumentos
+    RETURN = 61
+    MAKE_FUNCTION = 62  # cria uma função a partir do Code em consts[arg]
+    GETATTR = 63
+    CHECK_ATTR = 64  # falha se o objeto no topo não possui o atributo names[arg]
+    SETATTR = 65
+
+    # Diversos
+    POP = 70
+    DUP = 71
+    PRINT = 72
+    EVAL = 73  # avalia o nó consts[arg] com o interpretador de árvore
+    END = 74  # termina o programa retornando o topo da pilha
+
+
+JUMPS = {Op.JUMP, Op.POP_JUMP_IF_FALSE, Op.POP_JUMP_IF_EQ_FALSE, Op.POP_JUMP_IF_EQ_TRUE}
+
+BINARY_OPS = {
+    op.add: Op.ADD,
+    op.sub: Op.SUB,
+    op.mul: Op.MUL,
+    op.truediv: Op.DIV,
+    op.lt: Op.LT,
+    op.le: Op.LE,
+    op.gt: Op.GT,
+    op.ge: Op.GE,
+    op.eq: Op.EQ,
+    op.ne: Op.NE,
+}
+
+
+@dataclass
+class Code:
+    """
+    Bytecode de um programa ou de uma função.
+    """
+
+    name: str
+    ops: list[int] = field(default_factory=list)
+    consts: list[Any] = field(default_factory=list)
+    names: list[str] = field(default_factory=list)
+    refs: list[tuple[int, int]] = field(default_factory=list)
+
+    # Nome da expressão chamada em cada instrução CALL, usado nas mensagens de erro
+    call_names: dict[int, str] = field(default_factory=dict, repr=False)
+
+    # Informações sobre funções
+    is_function: bool = False
+    args: list[str] = field(default_factory=list)
+    params: dict[str, int] | None = None
+    body: Node | None = field(default=None, repr=False)
+
+    # Cache de resultados se a função for pura (ver `lox.memo`)
+    memo: FunctionCache | None = field(default=None, repr=False)
+
+
+@dataclass
+class VMFunction(LoxFunction):
+    """
+    Função Lox compilada para bytecode.
+    """
+
+    code: Code | None = None
+
+    def __call__(self, *args):
+        return run(self.code, self.bind(args))
+
+
+class Compiler:
+    def __init__(self, code: Code):
+        self.code = code
+        self._const_index: dict[Any, int] = {}
+        self._name_index: dict[str, int] = {}
+        self._ref_index: dict[tuple[int, int], int] = {}
+
+    #
+    # TABELAS
+    #
+    def emit(self, opcode: Op, arg: int = 0) -> int:
+        """
+        Adiciona uma instrução e retorna a sua posição.
+        """
+        self.code.ops.extend((opcode.value, arg))
+        return len(self.code.ops) - 2
+
+    def const(self, value: Any) -> int:
+        try:
+            # O tipo faz parte da chave para não confundir 1.0 com true
+            key = (type(value), value)
+            return self._const_index[key]
+        except TypeError:
+            self.code.consts.append(value)
+            return len(self.code.consts) - 1
+        except KeyError:
+            self.code.consts.append(value)
+            self._const_index[key] = idx = len(self.code.consts) - 1
+            return idx
+
+    def name(self, name: str) -> int:
+        if name not in self._name_index:
+            self.code.names.append(name)
+            self._name_index[name] = len(self.code.names) - 1
+        return self._name_index[name]
+
+    def ref(self, depth: int, slot: int) -> int:
+        key = (-1 - depth, slot)
+        if key not in self._ref_index:
+            self.code.refs.append(key)
+            self._ref_index[key] = len(self.code.refs) - 1
+        return self._ref_index[key]
+
+    def jump_here(self, index: int) -> None:
+        """
+        Faz o salto na posição `index` apontar para a próxima instrução.
+        """
+        self.code.ops[index + 1] = len(self.code.ops) - (index + 2)
+
+    def jump_back(self, opcode: Op, target: int) -> None:
+        self.emit(opcode, target - (len(self.code.ops) + 2))
+
+    #
+    # COMANDOS
+    #
+    def stmt(self, node: Node) -> None:
+        """
+        Compila um nó em posição de comando: a pilha termina como começou.
+        """
+        if isinstance(node, ast.Assign):
+            # Atribuições como comando não precisam deixar o valor na pilha
+            self.assign(node, keep=False)
+
+        elif isinstance(node, ast.Expr):
+            self.expr(node)
+            self.emit(Op.POP)
+
+        elif isinstance(node, ast.Print):
+            self.expr(node.expr)
+            self.emit(Op.PRINT)
+
+        elif isinstance(node, ast.Return):
+            self.expr(node.expr)
+            self.emit(Op.RETURN)
+
+        elif isinstance(node, ast.VarDef):
+            self.expr(node.expr)
+            self.define(node.name, node.slot)
+
+        elif isinstance(node, ast.Block):
+            self.block(node.statements, node.slots)
+
+        elif isinstance(node, ast.If):
+            self.expr(node.cond)
+            to_else = self.emit(Op.POP_JUMP_IF_FALSE)
+            self.stmt(node.then)
+            to_end = self.emit(Op.JUMP)
+            self.jump_here(to_else)
+            self.stmt(node.not_then)
+            self.jump_here(to_end)
+
+        elif isinstance(node, ast.While):
+            start = len(self.code.ops)
+            self.expr(node.cond)
+            to_end = self.emit(Op.POP_JUMP_IF_FALSE)
+            self.stmt(node.then)
+            self.jump_back(Op.JUMP, start)
+            self.jump_here(to_end)
+
+        elif isinstance(node, ast.Function):
+            self.emit(Op.MAKE_FUNCTION, self.const(compile_function(node)))
+            self.define(node.identifier, node.slot)
+
+        elif isinstance(node, ast.NoOp):
+            pass
+
+        else:
+            self.emit(Op.EVAL, self.const(node))
+            self.emit(Op.POP)
+
+    def block(self, stmts: list[ast.Stmt], slots: dict[str, int] | None) -> None:
+        if slots is None:
+            self.emit(Op.PUSH_DICT_SCOPE)
+        elif slots:
+            self.emit(Op.PUSH_SCOPE, self.const(slots))
+        for stmt in stmts:
+            self.stmt(stmt)
+        if slots is None or slots:
+            self.emit(Op.POP_SCOPE)
+
+    def define(self, name: str, slot: int | None) -> None:
+        if slot is None:
+            self.emit(Op.DEFINE_NAME, self.name(name))
+        else:
+            self.emit(Op.DEFINE_FAST, slot)
+
+    #
+    # EXPRESSÕES
+    #
+    def expr(self, node: Node) -> None:
+        """
+        Compila uma expressão: o valor resultante fica no topo da pilha.
+        """
+        if isinstance(node, ast.Literal):
+            self.emit(Op.LOAD_CONST, self.const(node.value))
+
+        elif isinstance(node, ast.Var):
+            if node.slot is None:
+                self.emit(Op.LOAD_NAME, self.name(node.name))
+            elif node.depth == 0:
+                self.emit(Op.LOAD_FAST, node.slot)
+            else:
+                self.emit(Op.LOAD_DEREF, self.ref(node.depth, node.slot))
+
+        elif isinstance(node, ast.BinOp):
+            self.expr(node.left)
+            if isinstance(node.right, ast.Literal) and node.op in BINARY_OPS:
+                opcode = Op(BINARY_OPS[node.op] - Op.ADD + Op.ADD_CONST)
+                self.emit(opcode, self.const(node.right.value))
+                return
+            self.expr(node.right)
+            if node.op in BINARY_OPS:
+                self.emit(BINARY_OPS[node.op])
+            else:
+                self.emit(Op.BINARY_OP, self.const(node.op))
+
+        elif isinstance(node, ast.UnaryOp):
+            self.expr(node.expr)
+            if node.op is op.neg:
+                self.emit(Op.NEG)
+            else:
+                self.emit(Op.UNARY_OP, self.const(node.op))
+
+        elif isinstance(node, ast.Assign):
+            self.assign(node, keep=True)
+
+        elif isinstance(node, (ast.And, ast.Or)):
+            # Mesma semântica de And.eval/Or.eval: o resultado é sempre um
+            # booleano e a comparação é feita com == False / == True.
+            if isinstance(node, ast.And):
+                test, result = Op.POP_JUMP_IF_EQ_FALSE, False
+            else:
+                test, result = Op.POP_JUMP_IF_EQ_TRUE, True
+            first, second = node.expr
+            self.expr(first)
+            short_1 = self.emit(test)
+            self.expr(second)
+            short_2 = self.emit(test)
+            self.emit(Op.LOAD_CONST, self.const(not result))
+            to_end = self.emit(Op.JUMP)
+            self.jump_here(short_1)
+            self.jump_here(short_2)
+            self.emit(Op.LOAD_CONST, self.const(result))
+            self.jump_here(to_end)
+
+        elif isinstance(node, ast.Call):
+            self.expr(node.node)
+            for arg in node.args:
+                self.expr(arg)
+            index = self.emit(Op.CALL, len(node.args))
+            self.code.call_names[index + 2] = getattr(node.node, "name", "?")
+
+        elif isinstance(node, ast.Getattr):
+            self.expr(node.obj)
+            self.emit(Op.GETATTR, self.name(node.name))
+
+        elif isinstance(node, ast.Setattr):
+            name = self.name(node.name)
+            self.expr(node.obj)
+            self.emit(Op.CHECK_ATTR, name)
+            self.expr(node.value)
+            self.emit(Op.SETATTR, name)
+
+        else:
+            self.emit(Op.EVAL, self.const(node))
+
+
+    def assign(self, node: ast.Assign, keep: bool) -> None:
+        """
+        Compila uma atribuição. Se `keep` for verdadeiro, o valor atribuído
+        permanece na pilha como resultado da expressão.
+        """
+        if node.slot is None:
+            name = self.name(node.name.name)
+            self.emit(Op.CHECK_NAME, name)
+            self.expr(node.expr)
+            store, arg = Op.STORE_NAME, name
+        elif node.depth == 0:
+            self.expr(node.expr)
+            store, arg = Op.STORE_FAST, node.slot
+        else:
+            self.expr(node.expr)
+            store, arg = Op.STORE_DEREF, self.ref(node.depth, node.slot)
+        if keep:
+            self.emit(Op.DUP)
+        self.emit(store, arg)
+
+
+def compile_program(node: Node, name: str = "<program>") -> Code:
+    """
+    Compila um programa (ou uma expressão isolada) para bytecode.
+    """
+    code = Code(name)
+    compiler = Compiler(code)
+    if isinstance(node, ast.Program):
+        for stmt in node.stmts:
+            compiler.stmt(stmt)
+        compiler.emit(Op.LOAD_CONST, compiler.const(None))
+    elif isinstance(node, ast.Expr):
+        compiler.expr(node)
+    else:
+        compiler.stmt(node)
+        compiler.emit(Op.LOAD_CONST, compiler.const(None))
+    compiler.emit(Op.END)
+    return code
+
+
+def compile_function(node: ast.Function) -> Code:
+    """
+    Compila o corpo de uma função para bytecode.
+    """
+    code = Code(
+        node.identifier,
+        is_function=True,
+        args=node.args,
+        params=node.params,
+        body=node.body,
+        memo=node.memo,
+    )
+    compiler = Compiler(code)
+    compiler.stmt(node.body)
+    compiler.emit(Op.LOAD_CONST, compiler.const(None))
+    compiler.emit(Op.RETURN)
+    return code
+
+
+def run(code: Code, ctx: Ctx):
+    """
+    Executa o bytecode no contexto dado e retorna o valor final.
+    """
+    # Opcodes em variáveis locais: comparações com locais são bem mais rápidas
+    # que buscas de atributos no laço de despacho.
+    LOAD_CONST, LOAD_FAST, STORE_FAST = Op.LOAD_CONST.value, Op.LOAD_FAST.value, Op.STORE_FAST.value
+    LOAD_DEREF, STORE_DEREF = Op.LOAD_DEREF.value, Op.STORE_DEREF.value
+    LOAD_NAME, STORE_NAME, CHECK_NAME = Op.LOAD_NAME.value, Op.STORE_NAME.value, Op.CHECK_NAME.value
+    DEFINE_FAST, DEFINE_NAME = Op.DEFINE_FAST.value, Op.DEFINE_NAME.value
+    PUSH_SCOPE, PUSH_DICT_SCOPE, POP_SCOPE = Op.PUSH_SCOPE.value, Op.PUSH_DICT_SCOPE.value, Op.POP_SCOPE.value
+    ADD, SUB, MUL, DIV = Op.ADD.value, Op.SUB.value, Op.MUL.value, Op.DIV.value
+    LT, LE, GT, GE, EQ, NE = Op.LT.value, Op.LE.value, Op.GT.value, Op.GE.value, Op.EQ.value, Op.NE.value
+    BINARY_OP, NEG, UNARY_OP = Op.BINARY_OP.value, Op.NEG.value, Op.UNARY_OP.value
+    ADD_CONST, SUB_CONST, MUL_CONST, DIV_CONST = Op.ADD_CONST.value, Op.SUB_CONST.value, Op.MUL_CONST.value, Op.DIV_CONST.value
+    LT_CONST, LE_CONST, GT_CONST, GE_CONST = Op.LT_CONST.value, Op.LE_CONST.value, Op.GT_CONST.value, Op.GE_CONST.value
+    EQ_CONST, NE_CONST = Op.EQ_CONST.value, Op.NE_CONST.value
+    JUMP, POP_JUMP_IF_FALSE = Op.JUMP.value, Op.POP_JUMP_IF_FALSE.value
+    POP_JUMP_IF_EQ_FALSE, POP_JUMP_IF_EQ_TRUE = Op.POP_JUMP_IF_EQ_FALSE.value, Op.POP_JUMP_IF_EQ_TRUE.value
+    CALL, RETURN, MAKE_FUNCTION = Op.CALL.value, Op.RETURN.value, Op.MAKE_FUNCTION.value
+    GETATTR, CHECK_ATTR, SETATTR = Op.GETATTR.value, Op.CHECK_ATTR.value, Op.SETATTR.value
+    POP, DUP, PRINT, EVAL, END = Op.POP.value, Op.DUP.value, Op.PRINT.value, Op.EVAL.value, Op.END.value
+
+    stack: list[Any] = []
+    push = stack.append
+    pop = stack.pop
+    frames: list[tuple] = []
+    ops, consts, names, refs = code.ops, code.consts, code.names, code.refs
+    values = getattr(ctx, "values", None)
+    pc = 0
+
+    # O despacho é dividido por faixas de opcodes (ver a numeração em `Op`)
+    # para reduzir o número de comparações feitas por instrução.
+    while True:
+        opcode = ops[pc]
+        arg = ops[pc + 1]
+        pc += 2
+
+        if opcode < ADD:
+            if opcode == LOAD_FAST:
+                push(values[arg])
+            elif opcode == LOAD_CONST:
+                push(consts[arg])
+            elif opcode == STORE_FAST:
+                values[arg] = pop()
+            elif opcode == LOAD_DEREF:
+                frame, slot = refs[arg]
+                push(ctx.frames[frame][slot])
+            elif opcode == STORE_DEREF:
+                frame, slot = refs[arg]
+                ctx.frames[frame][slot] = pop()
+            elif opcode == LOAD_NAME:
+                name = names[arg]
+                try:
+                    push(ctx[name])
+                except KeyError:
+                    raise NameError(f"variável {name} não existe!")
+            elif opcode == STORE_NAME:
+                ctx[names[arg]] = pop()
+            elif opcode == CHECK_NAME:
+                if names[arg] not in ctx:
+                    raise NameError(f"variável {names[arg]} não existe!")
+            elif opcode == DEFINE_FAST:
+                ctx.slot_def(arg, pop())
+            elif opcode == DEFINE_NAME:
+                ctx.var_def(names[arg], pop())
+            elif opcode == PUSH_SCOPE:
+                ctx = SlotCtx(consts[arg], ctx)
+                values = ctx.values
+            elif opcode == POP_SCOPE:
+                ctx = ctx.parent
+                values = getattr(ctx, "values", None)
+            elif opcode == PUSH_DICT_SCOPE:
+                ctx = ctx.push({})
+                values = None
+            else:
+                raise RuntimeError(f"opcode inválido: {opcode}")
+
+        elif opcode < ADD_CONST:
+            right = pop()
+            if opcode == ADD:
+                stack[-1] = stack[-1] + right
+            elif opcode == SUB:
+                stack[-1] = stack[-1] - right
+            elif opcode == LT:
+                stack[-1] = stack[-1] < right
+            elif opcode == MUL:
+                stack[-1] = stack[-1] * right
+            elif opcode == DIV:
+                stack[-1] = stack[-1] / right
+            elif opcode == LE:
+                stack[-1] = stack[-1] <= right
+            elif opcode == GT:
+                stack[-1] = stack[-1] > right
+            elif opcode == GE:
+                stack[-1] = stack[-1] >= right
+            elif opcode == EQ:
+                stack[-1] = stack[-1] == right
+            elif opcode == NE:
+                stack[-1] = stack[-1] != right
+            elif opcode == BINARY_OP:
+                stack[-1] = consts[arg](stack[-1], right)
+            elif opcode == NEG:
+                push(-right)
+            elif opcode == UNARY_OP:
+                push(consts[arg](right))
+            else:
+                raise RuntimeError(f"opcode inválido: {opcode}")
+
+        elif opcode < JUMP:
+            right = consts[arg]
+            if opcode == ADD_CONST:
+                stack[-1] = stack[-1] + right
+            elif opcode == LT_CONST:
+                stack[-1] = stack[-1] < right
+            elif opcode == SUB_CONST:
+                stack[-1] = stack[-1] - right
+            elif opcode == MUL_CONST:
+                stack[-1] = stack[-1] * right
+            elif opcode == DIV_CONST:
+                stack[-1] = stack[-1] / right
+            elif opcode == LE_CONST:
+                stack[-1] = stack[-1] <= right
+            elif opcode == GT_CONST:
+                stack[-1] = stack[-1] > right
+            elif opcode == GE_CONST:
+                stack[-1] = stack[-1] >= right
+            elif opcode == EQ_CONST:
+                stack[-1] = stack[-1] == right
+            elif opcode == NE_CONST:
+                stack[-1] = stack[-1] != right
+            else:
+                raise RuntimeError(f"opcode inválido: {opcode}")
+
+        elif opcode < CALL:
+            if opcode == POP_JUMP_IF_FALSE:
+                value = pop()
+                if value is None or value is False:
+                    pc += arg
+            elif opcode == JUMP:
+                pc += arg
+            elif opcode == POP_JUMP_IF_EQ_FALSE:
+                if pop() == False:  # noqa: E712
+                    pc += arg
+            elif opcode == POP_JUMP_IF_EQ_TRUE:
+                if pop() == True:  # noqa: E712
+                    pc += arg
+            else:
+                raise RuntimeError(f"opcode inválido: {opcode}")
+
+        elif opcode < POP:
+            if opcode == CALL:
+                if arg:
+                    args = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    args = []
+                func = pop()
+                if type(func) is VMFunction:
+                    frames.append((code, pc, ctx))
+                    ctx = func.bind(args)
+                    values = getattr(ctx, "values", None)
+                    code = func.code
+                    ops, consts, names, refs = code.ops, code.consts, code.names, code.refs
+                    pc = 0
+                elif callable(func):
+                    push(func(*args))
+                else:
+                    raise TypeError(f"{code.call_names[pc]} não é uma função!")
+            elif opcode == RETURN:
+                if frames:
+                    code, pc, ctx = frames.pop()
+                    ops, consts, names, refs = code.ops, code.consts, code.names, code.refs
+                    values = getattr(ctx, "values", None)
+                elif code.is_function:
+                    return pop()
+                else:
+                    raise LoxReturn(pop())
+            elif opcode == MAKE_FUNCTION:
+                fn_code = consts[arg]
+                fn = VMFunction(
+                    fn_code.name,
+                    fn_code.args,
+                    [fn_code.body],
+                    ctx,
+                    fn_code.params,
+                    fn_code,
+                )
+                if fn_code.memo is not None:
+                    fn = MemoFunction(fn, fn_code.memo)
+                push(fn)
+            elif opcode == GETATTR:
+                stack[-1] = get_attribute(stack[-1], names[arg])
+            elif opcode == CHECK_ATTR:
+                obj = stack[-1]
+                if not hasattr(obj, names[arg]):
+                    msg = f"Atributo {names[arg]} não encontrado no objeto {type(obj).__name__}"
+                    raise AttributeError(msg)
+            elif opcode == SETATTR:
+                value = pop()
+                setattr(pop(), names[arg], value)
+                push(value)
+            else:
+                raise RuntimeError(f"opcode inválido: {opcode}")
+
+        elif opcode == POP:
+            pop()
+        elif opcode == DUP:
+            push(stack[-1])
+        elif opcode == PRINT:
+            op.print(pop())
+        elif opcode == EVAL:
+            push(consts[arg].eval(ctx))
+        elif opcode == END:
+            return pop()
+        else:
+            raise RuntimeError(f"opcode inválido: {opcode}")
+
+
+def get_attribute(obj: Any, name: str) -> Any:
+    """
+    Implementa o acesso a atributos com a mesma semântica de `Getattr.eval`.
+    """
+    if isinstance(obj, dict):
+        if name in obj:
+            return obj[name]
+        raise AttributeError(f"Atributo {name} não encontrado no objeto {type(obj).__name__}")
+    if hasattr(obj, name):
+        return getattr(obj, name)
+    raise TypeError("Não é um objeto")
+
+
+def disassemble(code: Code) -> str:
+    """
+    Retorna uma listagem legível do bytecode, incluindo funções aninhadas.
+    """
+    lines: list[str] = []
+    pending = [code]
+    while pending:
+        code = pending.pop(0)
+        if lines:
+            lines.append("")
+        header = f"fun {code.name}({', '.join(code.args)})" if code.is_function else code.name
+        lines.append(f"== {header} ==")
+        for pc in range(0, len(code.ops), 2):
+            opcode, arg = Op(code.ops[pc]), code.ops[pc + 1]
+            lines.append(f"{pc:>5} {opcode.name:<22} {describe(code, opcode, arg, pc)}".rstrip())
+            if opcode == Op.MAKE_FUNCTION:
+                pending.append(code.consts[arg])
+    return "\n".join(lines)
+
+
+def describe(code: Code, opcode: Op, arg: int, pc: int) -> str:
+    """
+    Descreve o argumento de uma instrução para o disassembler.
+    """
+    if opcode in JUMPS:
+        return f"{arg:>4} (para {pc + 2 + arg})"
+    if opcode in (Op.LOAD_CONST, Op.BINARY_OP, Op.UNARY_OP, Op.EVAL) or Op.ADD_CONST <= opcode < Op.JUMP:
+        value = code.consts[arg]
+        shown = getattr(value, "__name__", None) or repr(value)
+        return f"{arg:>4} ({shown})"
+    if opcode == Op.MAKE_FUNCTION:
+        return f"{arg:>4} (<fn {code.consts[arg].name}>)"
+    if opcode == Op.PUSH_SCOPE:
+        return f"{arg:>4} ({', '.join(code.consts[arg])})"
+    if opcode in (Op.LOAD_NAME, Op.STORE_NAME, Op.CHECK_NAME, Op.DEFINE_NAME):
+        return f"{arg:>4} ({code.names[arg]})"
+    if opcode in (Op.GETATTR, Op.CHECK_ATTR, Op.SETATTR):
+        return f"{arg:>4} (.{code.names[arg]})"
+    if opcode in (Op.LOAD_DEREF, Op.STORE_DEREF):
+        frame, slot = code.refs[arg]
+        return f"{arg:>4} (frame {frame}, slot {slot})"
+    if opcode in (Op.LOAD_FAST, Op.STORE_FAST, Op.DEFINE_FAST, Op.CALL):
+        return f"{arg:>4}"
+    return ""
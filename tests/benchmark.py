@@ -0,0 +1,771 @@
+from lox import BACKENDS, Memoizer, eval as lox_eval, parse, Ctx
+from lox.ast import BinOp, Return, Var
+from lox.resolver import resolve
+from rich import print
+import argparse
+import time
+
+
+"""
+
+Instruções:
+
+Rode esse arquivo com `uv run benchmark <nome>` (ou `python -m tests.benchmark <nome>`).
+Use `uv run benchmark --help` para ver a lista de benchmarks disponíveis.
+
+"""
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+  """
+  Registra uma função de benchmark com o nome dado.
+  """
+  def decorator(fn):
+    BENCHMARKS[name] = fn
+    return fn
+  return decorator
+
+
+def make_argparser():
+  parser = argparse.ArgumentParser(description="Benchmarks do interpretador Lox")
+  parser.add_argument(
+    "name",
+    nargs="?",
+    default="all",
+    choices=["all", *BENCHMARKS],
+    help="Benchmark a ser executado.",
+  )
+  parser.add_argument(
+    "-n",
+    "--size",
+    type=int,
+    default=None,
+    help="Tamanho do problema (ex.: número de iterações). Cada benchmark tem seu próprio padrão.",
+  )
+  return parser
+
+
+def main():
+  parser = make_argparser()
+  args = parser.parse_args()
+  names = list(BENCHMARKS) if args.name == "all" else [args.name]
+  for name in names:
+    print(f"[bold]Benchmark {name}[/bold]")
+    BENCHMARKS[name](args)
+    print()
+
+
+def timeit(fn, *args) -> float:
+  """
+  Executa fn(*args) e retorna o tempo decorrido em segundos.
+  """
+  start = time.perf_counter()
+  fn(*args)
+  return time.perf_counter() - start
+
+
+def report(label: str, elapsed: float, count: int, unit: str = "iteração"):
+  per_item = elapsed / count * 1e9
+  print(f"  {label:<28} {elapsed:8.3f}s  [cyan]{per_item:10.1f} ns/{unit}[/cyan]")
+
+
+@benchmark("loop")
+def bench_loop(args):
+  """
+  Custo por iteração de laços `while` e `for` longos.
+  """
+  n = args.size or 1_000_000
+  sources = {
+    "while": f"var i = 0; while (i < {n}) {{ i = i + 1; }}",
+    "for": f"var s = 0; for (var i = 0; i < {n}; i = i + 1) s = s + i;",
+  }
+  for label, src in sources.items():
+    ast = parse(src)
+    elapsed = timeit(lambda: lox_eval(ast, optimize=False))
+    report(f"{label} ({n} iterações)", elapsed, n)
+
+
+
+@benchmark("scopes")
+def bench_scopes(args):
+  """
+  Acesso a variáveis declaradas vários blocos acima, com e sem o resolvedor.
+  """
+  n = args.size or 200_000
+  depth = 10
+  src = f"{{ var i = 0; var s = 0; {'{ var pad = 0; ' * depth}"
+  src += f"while (i < {n}) {{ s = s + i; i = i + 1; }}"
+  src += "}" * (depth + 1)
+  for label, resolved in [("busca por nome", False), ("resolvida (slots)", True)]:
+    ast = parse(src)
+    if resolved:
+      resolve(ast)
+    elapsed = timeit(ast.eval, Ctx())
+    report(f"{label} ({depth} blocos)", elapsed, n)
+
+
+
+@benchmark("backends")
+def bench_backends(args):
+  """
+  Compara os motores de execução num laço aritmético e numa função recursiva.
+  """
+  n = args.size or 200_000
+  programs = {
+    "aritmética": (
+      f"fun f() {{ var s = 0; var i = 0; while (i < {n}) {{ s = s + i * 2 - 1; i = i + 1; }} return s; }} f();",
+      n,
+      "iteração",
+    ),
+    "fib(20)": (
+      "fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); } fib(20);",
+      21891,
+      "chamada",
+    ),
+  }
+  for label, (src, count, unit) in programs.items():
+    baseline = None
+    for backend in BACKENDS:
+      ast = parse(src)
+      elapsed = timeit(lambda: lox_eval(ast, optimize=False, backend=backend))
+      baseline = baseline or elapsed
+      report(f"{label} ({backend})", elapsed, count, unit)
+      print(f"  {'':<28} [green]{baseline / elapsed:.1f}x[/green] vs tree")
+
+
+@benchmark("quicken")
+def bench_quicken(args):
+  """
+  Laço aritmético no interpretador de árvore, com e sem a especialização de
+  `BinOp` para operandos float.
+  """
+  n = args.size or 200_000
+  src = f"fun f() {{ var s = 0; var i = 0; while (i < {n}) {{ s = s + i * 2 - 1; i = i + 1; }} return s; }} f();"
+  for label, quicken in [("genérico", False), ("especializado", True)]:
+    ast = resolve(parse(src))
+    for node in ast.descendants():
+      if isinstance(node, BinOp):
+        node.quicken = quicken
+    elapsed = timeit(ast.eval, Ctx())
+    report(f"aritmética ({label})", elapsed, n)
+
+
+@benchmark("globals")
+def bench_globals(args):
+  """
+  Chamadas a builtins dentro de blocos aninhados numa função, com e sem o
+  cache de busca de variáveis globais.
+  """
+  n = args.size or 100_000
+  depth = 4
+  body = "s = s + sqrt(i) + max(i, 1); i = i + 1;"
+  src = f"fun f() {{ var s = 0; var i = 0; {'{ var pad = 0; ' * depth}"
+  src += f"while (i < {n}) {{ {body} }}{'}' * depth} return s; }} f();"
+  for label, cached in [("sem cache", False), ("com cache", True)]:
+    ast = resolve(parse(src))
+    if not cached:
+      for node in ast.descendants():
+        if isinstance(node, Var):
+          node.is_global = False
+    elapsed = timeit(ast.eval, Ctx())
+    report(f"sqrt/max ({label})", elapsed, n)
+
+
+@benchmark("returns")
+def bench_returns(args):
+  """
+  Funções recursivas no interpretador de árvore, com `return` lançando
+  `LoxReturn` ou repassando o valor de retorno (`Completion`).
+  """
+  n = args.size or 20
+  fib_calls = [1, 1]
+  while len(fib_calls) <= n:
+    fib_calls.append(fib_calls[-1] + fib_calls[-2] + 1)
+  programs = {
+    f"fib({n})": (
+      f"fun fib(n) {{ if (n < 2) return n; return fib(n - 1) + fib(n - 2); }} fib({n});",
+      fib_calls[n],
+    ),
+    "par/ímpar": (
+      "fun even(n) { if (n == 0) return true; return odd(n - 1); } "
+      "fun odd(n) { if (n == 0) return false; return even(n - 1); } "
+      f"var i = 0; while (i < {n * 100}) {{ even(20); i = i + 1; }}",
+      n * 100 * 21,
+    ),
+  }
+  for label, (src, count) in programs.items():
+    for mode, signal in [("exceção", False), ("valor", True)]:
+      ast = parse(src)
+      resolve(ast)
+      if not signal:
+        for node in ast.descendants():
+          if isinstance(node, Return):
+            node.signal = False
+      elapsed = timeit(ast.eval, Ctx())
+      report(f"{label} ({mode})", elapsed, count, "chamada")
+
+
+@benchmark("tailcall")
+def bench_tailcall(args):
+  """
+  Recursão em cauda no interpretador de árvore, com chamadas Python aninhadas
+  ou com o trampolim de `LoxFunction`, e nos demais backends.
+  """
+  n = args.size or 100
+  repeat = 200
+  loop = "fun loop(n, acc) { if (n == 0) return acc; return loop(n - 1, acc + 1); }"
+  src = f"{loop} var i = 0; while (i < {repeat}) {{ loop({n}, 0); i = i + 1; }}"
+  for mode, tail in [("aninhadas", False), ("trampolim", True)]:
+    ast = parse(src)
+    resolve(ast)
+    for node in ast.descendants():
+      if isinstance(node, Return):
+        node.tail = node.tail and tail
+    elapsed = timeit(ast.eval, Ctx())
+    report(f"profundidade {n} ({mode})", elapsed, n * repeat, "chamada")
+
+  # Sem o trampolim, esta profundidade estoura o limite de recursão do Python
+  deep = 100 * n
+  ast = resolve(parse(f"{loop} loop({deep}, 0);"))
+  elapsed = timeit(ast.eval, Ctx())
+  report(f"profundidade {deep} (trampolim)", elapsed, deep, "chamada")
+
+  for backend in BACKENDS[1:]:
+    ast = parse(f"{loop} loop({deep}, 0);")
+    elapsed = timeit(lambda: lox_eval(ast, optimize=False, backend=backend))
+    report(f"profundidade {deep} ({backend})", elapsed, deep, "chamada")
+
+
+@benchmark("memo")
+def bench_memo(args):
+  """
+  Funções puras chamadas repetidamente, com e sem memoização.
+  """
+  n = args.size or 20
+  src = (
+    "fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); } "
+    f"var i = 0; while (i < 10) {{ fib({n}); i = i + 1; }}"
+  )
+  for label, memoize in [("sem memoização", False), ("com memoização", Memoizer())]:
+    ast = parse(src)
+    elapsed = timeit(lambda: lox_eval(ast, optimize=False, memoize=memoize))
+    report(f"10 x fib({n}) ({label})", elapsed, 10, "programa")
+    if memoize:
+      print(f"  {'':<28} [green]{memoize.hits} acertos, {memoize.misses} faltas[/green]")
+
+
+@benchmark("python-cache")
+def bench_python_cache(args):
+  """
+  Tempo de compilação do backend python sem cache, com cache em disco e com
+  cache em memória.
+  """
+  import os
+  import tempfile
+  from lox import transpiler
+
+  n = args.size or 200
+  src = "\n".join(f"fun f{i}(x) {{ var y = x * {i}; while (y > 0) y = y - 1; return y; }}" for i in range(n))
+  with tempfile.TemporaryDirectory() as tmp:
+    os.environ["LOX_CACHE_DIR"] = tmp
+    try:
+      transpiler._CODE_CACHE.clear()
+      report(f"sem cache ({n} funções)", timeit(transpiler.compile_source, src), n, "função")
+      transpiler._CODE_CACHE.clear()
+      report("cache em disco", timeit(transpiler.compile_source, src), n, "função")
+      report("cache em memória", timeit(transpiler.compile_source, src), n, "função")
+    finally:
+      del os.environ["LOX_CACHE_DIR"]
+
+
+@benchmark("ast-cache")
+def bench_ast_cache(args):
+  """
+  Tempo de `parse` sem cache, com o cache de árvores vazio e com o cache
+  já preenchido.
+  """
+  import os
+  import tempfile
+  from lox.astcache import ASTCache
+
+  n = args.size or 200
+  src = "\n".join(f"fun f{i}(x) {{ var y = x * {i}; while (y > 0) y = y - 1; return y; }}" for i in range(n))
+  with tempfile.TemporaryDirectory() as tmp:
+    os.environ["LOX_CACHE_DIR"] = tmp
+    try:
+      cache = ASTCache()
+      parse("", False)  # constrói o parser antes de medir
+      report(f"sem cache ({n} funções)", timeit(parse, src, False), n, "função")
+      report("cache vazio", timeit(cache.parse, src), n, "função")
+      report("cache preenchido", timeit(cache.parse, src), n, "função")
+      print(f"  {'':<28} [green]{cache.report()}[/green]")
+    finally:
+      del os.environ["LOX_CACHE_DIR"]
+
+
+@benchmark("incremental")
+def bench_incremental(args):
+  """
+  Edição de uma única declaração num arquivo grande: análise completa contra
+  `lox.incremental.reparse`.
+  """
+  from lox.incremental import parse_incremental, reparse
+
+  n = args.size or 500
+  src = "\n".join(f"fun f{i}(x) {{ var y = x * {i}; while (y > 0) y = y - 1; return y; }}" for i in range(n))
+  program = parse_incremental(src)
+  pos = src.index(f"x * {n // 2};") + len("x * ")
+  width = len(str(n // 2))
+  edits = 10
+
+  def full():
+    for i in range(edits):
+      parse(src[:pos] + str(i) + src[pos + width:], False)
+
+  def incremental():
+    current = width
+    for i in range(edits):
+      reparse(program, pos, pos + current, str(i))
+      current = len(str(i))
+
+  report(f"completa ({n} funções)", timeit(full), edits, "edição")
+  report("incremental", timeit(incremental), edits, "edição")
+
+
+@benchmark("stream")
+def bench_stream(args):
+  """
+  Programa gerado com muitas declarações, executado de uma vez e em fluxo
+  (`--stream`): tempo total e pico de memória alocada.
+  """
+  import contextlib
+  import io
+  import tracemalloc
+  from lox.stream import eval_stream, read_chunks
+
+  n = args.size or 2000
+  src = "var total = 0;\n" + "".join(
+    f"fun f{i}(x) {{ return x + {i}; }}\ntotal = total + f{i}(1);\n" for i in range(n)
+  )
+  modes = [
+    ("de uma vez", lambda: lox_eval(parse(src, False), optimize=False)),
+    ("em fluxo", lambda: eval_stream(read_chunks(io.StringIO(src)), optimize=False)),
+  ]
+  for label, run in modes:
+    with contextlib.redirect_stdout(io.StringIO()):
+      elapsed = timeit(run)
+      tracemalloc.start()
+      run()
+      peak = tracemalloc.get_traced_memory()[1]
+      tracemalloc.stop()
+    report(f"{label} ({n} funções)", elapsed, n, "função")
+    print(f"  {'':<28} [green]pico de memória: {peak / 2**20:.1f} MiB[/green]")
+
+
+@benchmark("passes")
+def bench_passes(args):
+  """
+  Validação e remoção de açúcar sintático depois do parser: percursos
+  separados com um cursor por nó (como antes de `lox.passes`) contra
+  `run_frontend`, que só percorre a árvore de novo para remover açúcar
+  sintático se alguma classe de nó da árvore o implementa.
+  """
+  from lox.passes import PassStats, run_frontend
+
+  n = args.size or 2000
+  src = "\n".join(f"fun f{i}(x) {{ var y = x * {i}; while (y > 0) y = y - 1; return y; }}" for i in range(n))
+  tree = parse(src, False)
+  nodes = sum(1 for _ in tree.descendants())
+
+  def separate():
+    # validate_tree e desugar_tree em `parse`, e validate_tree de novo em `lox.eval`
+    for _ in range(2):
+      for cursor in tree.cursor().descendants():
+        cursor.node.validate_self(cursor)
+    pending = [tree.cursor()]
+    while pending:
+      cursor = pending.pop()
+      cursor.node.desugar_self()
+      pending.extend(cursor.children())
+
+  stats = PassStats()
+  report(f"separados ({nodes} nós)", timeit(separate), nodes, "nó")
+  print(f"  {'':<28} [green]3 percursos, {3 * nodes} cursores[/green]")
+  report("run_frontend", timeit(run_frontend, tree, stats), nodes, "nó")
+  print(f"  {'':<28} [green]{stats.walks} percurso(s), {stats.cursors} cursores[/green]")
+
+
+@benchmark("lexer")
+def bench_lexer(args):
+  """
+  Vazão da análise léxica num programa de alguns megabytes: lexer do Lark
+  contra o lexer próprio do Lox (`lox.lexer`).
+  """
+  from lox.lexer import LoxLexer
+  from lox.parser import ast_parser
+
+  n = args.size or 20000
+  src = "\n".join(
+    f'fun f{i}(x) {{ // função {i}\n  var y = x * {i}.5;\n  if (y >= 10 and !nil) print "y" + y; else y = y - 1;\n  return y;\n}}'
+    for i in range(n)
+  )
+  parser = ast_parser()
+  lexer = LoxLexer(parser.lexer_conf)
+  tokens = sum(1 for _ in lexer.tokenize(src))
+  print(f"  {'':<28} [green]{len(src) / 2**20:.1f} MB, {tokens} tokens[/green]")
+
+  def consume(tokens):
+    for _ in tokens:
+      pass
+
+  # `Lark.lex` usa o lexer básico do Lark, independente de `LOX_LEXER`
+  elapsed = timeit(lambda: consume(type(parser).lex(parser, src)))
+  report("lark", elapsed, tokens, "token")
+  print(f"  {'':<28} [green]{tokens / elapsed:,.0f} tokens/s[/green]")
+  elapsed = timeit(lambda: consume(lexer.tokenize(src)))
+  report("lox", elapsed, tokens, "token")
+  print(f"  {'':<28} [green]{tokens / elapsed:,.0f} tokens/s[/green]")
+
+
+@benchmark("compile")
+def bench_compile(args):
+  """
+  Compilação em lote de um diretório (`lox compile DIR -j N`) com 1, 2, 4...
+  processos, até o número de CPUs.
+  """
+  import os
+  import tempfile
+  from pathlib import Path
+
+  from lox.batch import compile_dir
+
+  n = args.size or 400
+  src = "\n".join(f"fun f{i}(x) {{ var y = x * {i}; while (y > 0) y = y - 1; return y; }}" for i in range(50))
+  cpus = os.cpu_count() or 1
+  with tempfile.TemporaryDirectory() as tmp:
+    for i in range(n):
+      Path(tmp, f"script{i}.lox").write_text(src)
+
+    jobs = 1
+    base = None
+    while True:
+      elapsed = timeit(compile_dir, tmp, jobs)
+      base = base or elapsed
+      report(f"{jobs} processo(s), {n} arquivos", elapsed, n, "arquivo")
+      print(f"  {'':<28} [green]{base / elapsed:.2f}x[/green]")
+      if jobs >= cpus:
+        break
+      jobs = min(2 * jobs, cpus)
+    if cpus == 1:
+      print(f"  {'':<28} [yellow]só uma CPU disponível[/yellow]")
+
+
+@benchmark("nodes")
+def bench_nodes(args):
+  """
+  Memória por nó da árvore sintática e tempo dos percursos genéricos
+  (`Node.descendants`, `Node.visit`, `pretty`) e do otimizador, que percorre
+  os nós com `loop_ast_nodes`.
+  """
+  import tracemalloc
+
+  from lox.optimizations import UnsedVarsElimination
+
+  n = args.size or 2000
+  src = "\n".join(f"fun f{i}(x) {{ var y = x * {i}; while (y > 0) y = y - 1; return y + {i} / 2; }}" for i in range(n))
+  parse("", False)
+  tracemalloc.start()
+  before = tracemalloc.get_traced_memory()[0]
+  tree = parse(src, False)
+  size = tracemalloc.get_traced_memory()[0] - before
+  resolve(tree)
+  resolved = tracemalloc.get_traced_memory()[0] - before
+  tracemalloc.stop()
+  nodes = sum(1 for _ in tree.descendants())
+  print(f"  {'':<28} [green]{nodes} nós, {size / nodes:.0f} bytes/nó ({resolved / nodes:.0f} depois do resolvedor)[/green]")
+
+  def descendants():
+    for _ in tree.descendants():
+      pass
+
+  report("descendants", timeit(descendants), nodes, "nó")
+  report("visit", timeit(tree.visit, {}), nodes, "nó")
+  report("pretty", timeit(tree.pretty), nodes, "nó")
+  report("variáveis usadas", timeit(UnsedVarsElimination().evaluate_used_vars, tree), nodes, "nó")
+
+
+@benchmark("flat")
+def bench_flat(args):
+  """
+  Árvore sintática em objetos contra a representação em vetores de
+  `lox.flat`: memória, serialização e propagação de constantes.
+  """
+  import tracemalloc
+
+  import gc
+
+  from lox.astcache import dump_tree, load_tree
+  from lox.flat import FlatProgram, fold_constants, from_program, to_program
+
+  n = args.size or 5000
+  src = "\n".join(f"fun f{i}(x) {{ var y = x * {i % 10} + 2 * 3; while (y > 0) y = y - 1; return y; }}" for i in range(n))
+  parse("", False)
+  tracemalloc.start()
+  before = tracemalloc.get_traced_memory()[0]
+  tree = parse(src, False)
+  gc.collect()
+  tree_size = tracemalloc.get_traced_memory()[0] - before
+  before = tracemalloc.get_traced_memory()[0]
+  flat = from_program(tree)
+  gc.collect()
+  flat_size = tracemalloc.get_traced_memory()[0] - before
+  tracemalloc.stop()
+  nodes = len(flat)
+  print(f"  {'':<28} [green]{nodes} nós: objetos {tree_size / nodes:.0f} bytes/nó, vetores {flat_size / nodes:.0f} bytes/nó ({tree_size / flat_size:.1f}x menos)[/green]")
+
+  report("conversão para vetores", timeit(from_program, tree), nodes, "nó")
+  report("conversão para objetos", timeit(to_program, flat), nodes, "nó")
+
+  pickled = dump_tree(tree)
+  data = flat.to_bytes()
+  print(f"  {'':<28} [green]pickle {len(pickled) / 2**20:.1f} MB, vetores {len(data) / 2**20:.1f} MB[/green]")
+  report("serialização (pickle)", timeit(dump_tree, tree), nodes, "nó")
+  report("serialização (vetores)", timeit(flat.to_bytes), nodes, "nó")
+  report("leitura (pickle)", timeit(load_tree, pickled), nodes, "nó")
+  report("leitura (vetores)", timeit(FlatProgram.from_buffer, data), nodes, "nó")
+  report("avaliação de constantes", timeit(fold_constants, flat), nodes, "nó")
+
+
+@benchmark("intern")
+def bench_intern(args):
+  """
+  Memória da árvore de um programa gerado, com muitas constantes e nomes
+  repetidos, com e sem o compartilhamento de valores e nomes do transformer,
+  e o custo de buscar os nomes da árvore num dicionário de escopo.
+  """
+  import tracemalloc
+
+  from lox.ast import Literal
+  from lox.parser import parse_cst
+  from lox.transformer import LoxTransformer
+
+  class CopyingTransformer(LoxTransformer):
+    # Cria um valor e um nome novos a cada ocorrência, como antes
+    def literal(self, table, text, value):
+      return Literal(value)
+
+    def VAR(self, token):
+      return Var(str(token))
+
+  n = args.size or 5000
+  src = "\n".join(f"var v{i % 50} = {i % 10} + counter * 2 + \"label\"; print v{i % 50} == nil;" for i in range(n))
+  cst = parse_cst(src)
+  sizes = {}
+  trees = {}
+  for label, transformer in [("sem compartilhamento", CopyingTransformer()), ("compartilhado", LoxTransformer())]:
+    tracemalloc.start()
+    trees[label] = transformer.transform(cst)
+    sizes[label] = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+  tree = trees["compartilhado"]
+  nodes = sum(1 for _ in tree.descendants())
+  literals = [node for node in tree.descendants() if isinstance(node, Literal)]
+  distinct = len({id(node.value) for node in literals})
+  for label, size in sizes.items():
+    print(f"  {label:<28} [green]{size / nodes:.0f} bytes/nó[/green]")
+  ratio = sizes["sem compartilhamento"] / sizes["compartilhado"]
+  print(f"  {'':<28} [green]{len(literals)} literais com {distinct} valores, {ratio:.2f}x menos memória[/green]")
+
+  def names(tree):
+    return [node.name for node in tree.descendants() if isinstance(node, Var)]
+
+  def lookup(names, scope):
+    for _ in range(20):
+      for name in names:
+        scope[name]
+
+  # Escopo com chaves vindas das declarações, como os escopos do interpretador
+  for label, tree in trees.items():
+    scope = {stmt.name: None for stmt in tree.stmts if hasattr(stmt, "name")}
+    scope["counter"] = None
+    uses = names(tree)
+    report(f"busca ({label})", timeit(lookup, uses, scope), 20 * len(uses), "busca")
+
+
+@benchmark("clone")
+def bench_clone(args):
+  """
+  Cópia de árvores com `copy.deepcopy` e `Node.clone`, e memória usada para
+  aplicar várias configurações de otimização ao mesmo programa, copiando a
+  árvore para cada uma ou usando a cópia na escrita.
+  """
+  import copy
+  import tracemalloc
+
+  from lox.optimizations import optimize_ast
+
+  n = args.size or 2000
+  src = "\n".join(
+    f"fun f{i}(x) {{ var y = x * {i}; while (y > 0) y = y - 1; return y; }} var x{i} = {i} * 2; print f{i}(x{i});"
+    for i in range(n)
+  )
+  tree = parse(src, False)
+  nodes = sum(1 for _ in tree.descendants())
+  report("deepcopy", timeit(copy.deepcopy, tree), nodes, "nó")
+  report("clone", timeit(tree.clone), nodes, "nó")
+
+  configs = [["propagation"], ["unsed_vars"], ["propagation", "unsed_vars"]]
+
+  def with_copies():
+    return [optimize_ast(copy.deepcopy(tree), config) for config in configs]
+
+  def with_copy_on_write():
+    return [optimize_ast(tree, config, copy_on_write=True) for config in configs]
+
+  for label, fn in [("deepcopy por configuração", with_copies), ("cópia na escrita", with_copy_on_write)]:
+    report(label, timeit(fn), len(configs) * nodes, "nó")
+    tracemalloc.start()
+    results = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    print(f"  {'':<28} [green]{size / 2**20:.1f} MiB para {len(configs)} configurações[/green]")
+
+
+@benchmark("deep")
+def bench_deep(args):
+  """
+  Percursos genéricos, cursores, cópia e otimizações numa cadeia de `+`
+  associativa à esquerda com 100 mil níveis, como em código gerado. As
+  versões recursivas estouravam o limite de recursão do Python.
+  """
+  import sys
+
+  from lox import optimizations, runtime
+  from lox.ast import Literal, Program, Print
+
+  n = args.size or 100_000
+  expr = Var("x")
+  for i in range(n):
+    expr = BinOp(expr, Literal(float(i)), runtime.add)
+  tree = Program([Print(expr)])
+  nodes = n * 2 + 3
+  print(f"  {'':<28} [green]profundidade {n + 2}, limite de recursão {sys.getrecursionlimit()}[/green]")
+
+  def descendants():
+    for _ in tree.descendants():
+      pass
+
+  def cursors():
+    for cursor in tree.cursor().descendants():
+      last = cursor
+    last.root()
+
+  def pretty_lines():
+    for _ in tree._pretty_lines():
+      pass
+
+  report("descendants", timeit(descendants), nodes, "nó")
+  report("visit", timeit(tree.visit, {}), nodes, "nó")
+  report("_pretty_lines", timeit(pretty_lines), nodes, "nó")
+  report("Cursor.descendants + root", timeit(cursors), nodes, "nó")
+  report("clone", timeit(tree.clone), nodes, "nó")
+  report("propagação de constantes", timeit(optimizations.ConstantPropagation(True).propagate, tree), nodes, "nó")
+  report("variáveis não usadas", timeit(optimizations.UnsedVarsElimination().eval, tree), nodes, "nó")
+
+
+@benchmark("parents")
+def bench_parents(args):
+  """
+  Cursores para todas as variáveis e literais de um programa, com consultas de escopo
+  (`function_scope`, `is_scoped_to`), com e sem o índice de pais: sem o
+  índice, cada `Node.cursor` percorre a árvore a partir da raiz.
+  """
+  from lox.ast import Function, Literal
+  from lox.node import ParentIndex
+
+  n = args.size or 100
+  src = "\n".join(f"fun f{i}(x) {{ var y = x * {i}; while (y > 0) y = y - 1; return y + {i} / 2; }}" for i in range(n))
+  tree = parse(src, False)
+  root = tree.cursor()
+  names = [node for node in tree.descendants() if isinstance(node, (Var, Literal))]
+
+  def lookups():
+    for node in names:
+      cursor = node.cursor(root)
+      cursor.function_scope()
+      cursor.is_scoped_to(Function)
+
+  report("busca na árvore", timeit(lookups), len(names), "cursor")
+  index = ParentIndex(tree)
+  report("montagem do índice", timeit(ParentIndex, tree), len(index.entries), "nó")
+  report("com índice", timeit(lookups), len(names), "cursor")
+
+
+@benchmark("pretty")
+def bench_pretty(args):
+  """
+  Pico de memória e tempo para imprimir a árvore de um programa grande com
+  `pretty` (string inteira na memória) e `pretty_to` (escrita incremental).
+  """
+  import os
+  import tracemalloc
+
+  n = args.size or 5000
+  src = "\n".join(f"fun f{i}(x) {{ var y = x * {i}; while (y > 0) y = y - 1; return y + {i} / 2; }}" for i in range(n))
+  tree = parse(src, False)
+  nodes = sum(1 for _ in tree.descendants())
+
+  with open(os.devnull, "w") as devnull:
+    def write_string():
+      devnull.write(tree.pretty())
+
+    def write_stream():
+      tree.pretty_to(devnull)
+
+    for label, fn in [("pretty", write_string), ("pretty_to", write_stream)]:
+      report(label, timeit(fn), nodes, "nó")
+      tracemalloc.start()
+      fn()
+      peak = tracemalloc.get_traced_memory()[1]
+      tracemalloc.stop()
+      print(f"  {'':<28} [green]pico de {peak / 2**20:.2f} MiB[/green]")
+
+
+@benchmark("startup")
+def bench_startup(args):
+  """
+  Tempo de `python -m lox` num programa trivial, com as tabelas do parser
+  recalculadas a cada execução, carregadas do cache em disco e embutidas no
+  parser autônomo (se ele tiver sido gerado com `python -m lox.build`).
+  """
+  import os
+  import subprocess
+  import sys
+  import tempfile
+
+  n = args.size or 10
+  with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "main.lox")
+    with open(path, "w") as file:
+      file.write("print 1 + 2;")
+
+    def run(cache: str, count: int = n, parser: str = "lark"):
+      env = {**os.environ, "LOX_CACHE_DIR": cache, "LOX_PARSER": parser}
+      for _ in range(count):
+        subprocess.run([sys.executable, "-m", "lox", path], env=env, check=True, capture_output=True)
+
+    report(f"sem cache ({n} execuções)", timeit(run, ""), n, "execução")
+    run(os.path.join(tmp, "cache"), 1)
+    report("com cache", timeit(run, os.path.join(tmp, "cache")), n, "execução")
+
+    from lox.standalone import STANDALONE_PATH
+    if STANDALONE_PATH.exists():
+      report("parser autônomo", timeit(run, "", n, "standalone"), n, "execução")
+
+
+if __name__ == "__main__":
+  main()
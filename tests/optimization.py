@@ -3,7 +3,6 @@ from .configs import pretty_test, load_examples, print_benchmark, BASE_DIR, pars
 from rich import print
 import sys
 import shutil
-import copy
 import argparse
 
 
@@ -82,28 +81,37 @@ def main():
   test(tests, print_results=args.print, output_file=args.output, benchmark=args.benchmark == "true")
   
 
-def test_constant_and_folding_ast(src: str, ast_program=None):
-  original_ast = copy.deepcopy(ast_program) if ast_program else parse(src)
-  if ast_program is None:
-    ast_program = parse(src)
-  print(f"[red][bold][FOLDING + PROPAGATION][/bold] - AST Original:[/red]\n{ast_program.pretty()}")
+def print_tree(tree):
+  """
+  Escreve a árvore na saída atual linha a linha, sem montar a string inteira.
+  """
+  tree.pretty_to(sys.stdout)
+  sys.stdout.write("\n")
+
 
+def test_constant_and_folding_ast(src: str, ast_program=None):
+  # Com cópia na escrita a árvore original não é modificada e compartilha
+  # com a otimizada os nós que não mudaram
+  original_ast = ast_program if ast_program else parse(src)
+  print("[red][bold][FOLDING + PROPAGATION][/bold] - AST Original:[/red]")
+  print_tree(original_ast)
 
-  optimizations.optimize_ast(ast_program, optimizations=["propagation"])
+  ast_program = optimizations.optimize_ast(original_ast, optimizations=["propagation"], copy_on_write=True)
 
-  print(f"[cyan][bold][FOLDING + PROPAGATION][/bold] - AST Optimized:[/cyan]\n{ast_program.pretty()}")
+  print("[cyan][bold][FOLDING + PROPAGATION][/bold] - AST Optimized:[/cyan]")
+  print_tree(ast_program)
   return [ast_program, original_ast]
 
 
 def test_unsed_vars(src: str, ast_program=None):
-  original_ast = copy.deepcopy(ast_program) if ast_program else parse(src)
-  if ast_program is None:
-    ast_program = parse(src)
-  print(f"[red][bold][UNSED VARS][/bold] - AST Original:[/red]\n{ast_program.pretty()}")
+  original_ast = ast_program if ast_program else parse(src)
+  print("[red][bold][UNSED VARS][/bold] - AST Original:[/red]")
+  print_tree(original_ast)
 
-  optimizations.optimize_ast(ast_program, optimizations=["unsed_vars"])
+  ast_program = optimizations.optimize_ast(original_ast, optimizations=["unsed_vars"], copy_on_write=True)
   
-  print(f"[cyan][bold][UNSED VARS][/bold] - AST Optimized:[/cyan]\n{ast_program.pretty()}")
+  print("[cyan][bold][UNSED VARS][/bold] - AST Optimized:[/cyan]")
+  print_tree(ast_program)
   return [ast_program, original_ast]
 
 
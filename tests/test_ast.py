@@ -0,0 +1,34 @@
+import lox
+from lox import parse
+from lox.ast import BinOp, FloatBinOp
+
+LOOP = "var s = 0; var i = 0; while (i < 10) { s = s + i * 2; i = i + 1; } print s;"
+
+
+def run(tree, capsys) -> str:
+  lox.eval(tree, optimize=False)
+  return capsys.readouterr().out
+
+
+def test_quickened_tree_is_unchanged(capsys):
+  tree = parse(LOOP, cache=False)
+  assert run(tree, capsys) == "90\n"
+  assert any(type(node) is FloatBinOp for node in tree.descendants())
+  assert all(isinstance(node, BinOp) for node in tree.descendants() if type(node) is FloatBinOp)
+  assert tree == parse(LOOP, cache=False)
+  assert parse(LOOP, cache=False) == tree
+  assert tree.pretty() == parse(LOOP, cache=False).pretty()
+  assert repr(tree) == repr(parse(LOOP, cache=False))
+
+
+def test_quickened_tree_runs_again(capsys):
+  tree = parse(LOOP, cache=False)
+  assert run(tree, capsys) == run(tree, capsys) == "90\n"
+
+
+def test_deopt_on_other_types(capsys):
+  tree = parse('fun f(a, b) { return a + b; } print f(1, 2); print f("a", "b");', cache=False)
+  assert run(tree, capsys) == "3\nab\n"
+  add = next(node for node in tree.descendants() if isinstance(node, BinOp))
+  assert type(add) is BinOp
+  assert not add.quicken
@@ -0,0 +1,40 @@
+import pytest
+
+from lox import parse
+from lox.astcache import ASTCache, dump_tree, load_tree
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+  monkeypatch.setenv("LOX_CACHE_DIR", str(tmp_path))
+  return ASTCache()
+
+
+def test_dump_load_round_trip():
+  tree = parse("var x = 1 + 2; fun f(a) { return a * x; } print f(3);", cache=False)
+  assert load_tree(dump_tree(tree)) == tree
+
+
+def test_cache_hit_returns_same_tree(cache):
+  src = "var x = 1; while (x < 10) x = x + 1; print x;"
+  first = cache.parse(src)
+  second = cache.parse(src)
+  assert first == second == parse(src, cache=False)
+  assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_deep_tree_is_cached(cache):
+  src = "var x = 1; print x" + " + 1" * 3000 + ";"
+  first = cache.parse(src)
+  second = cache.parse(src)
+  assert cache.stats()["hits"] == 1
+  assert second.pretty() == first.pretty()
+
+
+def test_corrupted_file_is_discarded(cache, tmp_path):
+  src = "print 42;"
+  cache.parse(src)
+  for path in tmp_path.glob("ast/*.ast"):
+    path.write_bytes(b"lixo")
+  assert cache.parse(src) == parse(src, cache=False)
+  assert cache.stats()["misses"] == 2
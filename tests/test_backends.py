@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import pytest
+
+import lox
+from lox import BACKENDS
+
+EXAMPLES = sorted((Path(__file__).parent.parent / "exemplos").glob("**/*.lox"))
+
+PROGRAMS = {
+  "fib": ("fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); } print fib(15);", "610\n"),
+  "loops": (
+    "var i = 0; while (i < 3) { print i * i; i = i + 1; } for (var j = 0; j < 2; j = j + 1) print j;",
+    "0\n1\n4\n0\n1\n",
+  ),
+  "closures": (
+    "fun counter() { var n = 0; fun inc() { n = n + 1; return n; } return inc; }"
+    " var a = counter(); var b = counter(); a(); a(); print a(); print b();",
+    "3\n1\n",
+  ),
+  "scopes": (
+    'var a = "global"; { print a; var a = "block"; print a; { fun f() { return a; } print f(); } }',
+    "global\nblock\nblock\n",
+  ),
+  "values": ('print "a" + "b"; print true and false; print false or true; print !true; print 7 / 2; print -3 <= 3;', "ab\nfalse\ntrue\nfalse\n3.5\ntrue\n"),
+}
+
+TAIL_LOOP = """
+fun loop(n, acc) { if (n == 0) return acc; return loop(n - 1, acc + 1); }
+print loop(5000, 0);
+"""
+
+MUTUAL = """
+fun even(n) { if (n == 0) return true; return odd(n - 1); }
+fun odd(n) { if (n == 0) return false; return even(n - 1); }
+print even(3000);
+print odd(3001);
+"""
+
+TAIL_CALLS = """
+fun id(x) { return x; }
+fun wrap(x) { return id(x); }
+fun positive() { return clock() > 0; }
+fun inner(n) {
+  fun count(i) { if (i == n) return i; return count(i + 1); }
+  { var start = 0; return count(start); }
+}
+fun closures(n) {
+  while (true) { var k = n; fun get() { return k; } if (n == 0) return get(); return closures(n - 1); }
+}
+print wrap(7);
+print positive();
+print inner(4000);
+print closures(3000);
+"""
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+  monkeypatch.setenv("LOX_CACHE_DIR", str(tmp_path))
+
+
+def run(src: str, backend: str, capsys) -> str:
+  lox.eval(src, optimize=False, backend=backend)
+  return capsys.readouterr().out
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_tail_recursion(backend, capsys):
+  assert run(TAIL_LOOP, backend, capsys) == "5000\n"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_mutual_tail_recursion(backend, capsys):
+  assert run(MUTUAL, backend, capsys) == "true\ntrue\n"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_tail_calls(backend, capsys):
+  assert run(TAIL_CALLS, backend, capsys) == "7\ntrue\n4000\n0\n"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_programs(name, backend, capsys):
+  src, expected = PROGRAMS[name]
+  assert run(src, backend, capsys) == expected
+
+
+@pytest.mark.parametrize("backend", BACKENDS[1:])
+@pytest.mark.parametrize("path", EXAMPLES, ids=lambda path: f"{path.parent.name}/{path.name}")
+def test_examples_match_tree(path, backend, capsys):
+  src = path.read_text()
+  assert run(src, backend, capsys) == run(src, "tree", capsys)
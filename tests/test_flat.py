@@ -0,0 +1,45 @@
+import lox
+from lox import parse
+from lox.ast import BinOp
+from lox.flat import FlatProgram, fold_constants, from_program, to_program
+
+SRC = """
+var x = 1 + 2 * 3;
+fun f(a, b) { if (a > b) return a - b; return -(b - a); }
+while (x < 10) x = x + 1;
+print f(x, 4) + f(2, "a" == "a" and 5);
+print "s" + "t";
+"""
+
+
+def test_round_trip():
+  tree = parse(SRC, cache=False)
+  assert to_program(from_program(tree)) == tree
+
+
+def test_bytes_round_trip():
+  tree = parse(SRC, cache=False)
+  flat = from_program(tree)
+  data = flat.to_bytes()
+  assert to_program(FlatProgram.from_buffer(data)) == tree
+  assert FlatProgram.from_buffer(memoryview(data)).to_bytes() == data
+
+
+def test_deep_round_trip():
+  tree = parse("print 1" + " + x" * 3000 + ";", cache=False)
+  copy = to_program(FlatProgram.from_buffer(from_program(tree).to_bytes()))
+  assert copy.pretty() == tree.pretty()
+
+
+def test_fold_constants():
+  tree = to_program(fold_constants(from_program(parse("var x = 1 + 2 * 3; print 1 / 0;", cache=False))))
+  assert tree.stmts[0].expr.value == 7.0
+  # A divisão por zero fica para a execução
+  assert isinstance(tree.stmts[1].expr, BinOp)
+
+
+def test_folded_program_runs_the_same(capsys):
+  lox.eval(parse(SRC, cache=False), optimize=False)
+  expected = capsys.readouterr().out
+  lox.eval(to_program(fold_constants(from_program(parse(SRC, cache=False)))), optimize=False)
+  assert capsys.readouterr().out == expected
@@ -0,0 +1,58 @@
+import pytest
+
+from lox import parse
+from lox.incremental import parse_incremental, reparse
+from lox.standalone import UnexpectedInput
+
+SRC = """var x = 1;
+fun f(a) { return a + x; }
+// comentário
+if (x > 0) print f(1); else print 0;
+print "fim";
+"""
+
+
+def test_parse_incremental_matches_parse():
+  program = parse_incremental(SRC)
+  assert program == parse(SRC, cache=False)
+  assert program.source == SRC
+  assert sum(segment.length for segment in program.segments) == len(SRC)
+
+
+@pytest.mark.parametrize(
+  "old, new",
+  [
+    ("1;", "42;"),
+    ("a + x", "a * x"),
+    ("print 0;", "print 0; print 2;"),
+    ("// comentário\n", ""),
+    ('print "fim";\n', ""),
+    ("var x = 1;\n", "var x = 1; var y = 2;\n"),
+  ],
+)
+def test_reparse_matches_parse(old, new):
+  program = parse_incremental(SRC)
+  start = SRC.index(old)
+  reparse(program, start, start + len(old), new)
+  src = SRC.replace(old, new, 1)
+  assert program.source == src
+  assert program == parse(src, cache=False)
+  assert program == parse_incremental(src)
+
+
+def test_reparse_keeps_other_statements():
+  program = parse_incremental(SRC)
+  before = list(program.stmts)
+  start = SRC.index("1;")
+  reparse(program, start, start + 1, "2")
+  assert program.stmts[0] is not before[0]
+  assert all(new is old for new, old in zip(program.stmts[1:], before[1:]))
+
+
+def test_syntax_error_keeps_program():
+  program = parse_incremental(SRC)
+  start = SRC.index("1;")
+  with pytest.raises(UnexpectedInput):
+    reparse(program, start, start + 2, "1")
+  assert program == parse(SRC, cache=False)
+  assert program.source == SRC
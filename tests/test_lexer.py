@@ -0,0 +1,79 @@
+from functools import cache
+
+import pytest
+from lark import Lark, UnexpectedInput
+
+from lox.lexer import LoxLexer
+from lox.standalone import GRAMMAR_PATH, standalone
+from lox.transformer import LoxTransformer
+
+# A comparação usa o Lark instalado, com as classes de token e de erro dele
+pytestmark = pytest.mark.skipif(standalone is not None, reason="LOX_PARSER=standalone")
+
+PROGRAMS = [
+  "var x = 1; print x + 2;",
+  "var if = 1; print if;",
+  "print true;",
+  'var s = "a\nb"; print s;',
+  "fun f(a, b) { return a >= b; } print f(1, 2) == !false;",
+  "print 1 andfalse; print nil ortrue;",
+  "var x = 1; print x andtrue; print x orx;",
+  "var andx = 1; print andx; print 1 andx;",
+]
+
+ERRORS = [
+  "var o = 1; class A { }",
+  "var x = 1 @ 2;",
+  "var x = 1;\nprint x $ 2;",
+  "print @;",
+  "@",
+  "print ;",
+  "var x == 1;",
+  "print 1 2;",
+  "print 1 x;",
+  "print truex;",
+  "print 1 printx;",
+]
+
+
+# Parsers sem o cache de tabelas do Lark, que não preserva os nomes de
+# exibição dos terminais anônimos (`"<="` em vez de `__ANON_1`)
+@cache
+def parser(lexer) -> Lark:
+  return Lark(
+    GRAMMAR_PATH.read_text(),
+    parser="lalr",
+    lexer=lexer,
+    start=["start", "expr"],
+    transformer=LoxTransformer(),
+  )
+
+
+def error(lexer, src: str) -> UnexpectedInput:
+  with pytest.raises(UnexpectedInput) as info:
+    parser(lexer).parse(src, start="start")
+  return info.value
+
+
+def message(e: UnexpectedInput) -> list[str] | None:
+  # A ordem dos terminais esperados depende das tabelas de cada parser
+  try:
+    return sorted(str(e).splitlines())
+  except ValueError:
+    # `str` passa tokens vazios pelo transformer, o que falha para `NUMBER`
+    return None
+
+
+@pytest.mark.parametrize("src", PROGRAMS)
+def test_same_tree_as_lark(src):
+  assert parser(LoxLexer).parse(src, start="start") == parser("contextual").parse(src, start="start")
+
+
+@pytest.mark.parametrize("src", ERRORS)
+def test_same_error_as_lark(src):
+  expected = error("contextual", src)
+  e = error(LoxLexer, src)
+  assert type(e) is type(expected)
+  assert (e.line, e.column) == (expected.line, expected.column)
+  assert e.token_history == expected.token_history
+  assert message(e) == message(expected)
@@ -0,0 +1,76 @@
+import pytest
+
+from lox import parse
+from lox.ast import BinOp, Literal, Var
+from lox.node import ParentIndex, find_index
+
+
+def test_literal_per_occurrence():
+  tree = parse("print 1 + 1;", cache=False)
+  expr = tree.stmts[0].expr
+  assert expr.left is not expr.right
+  # Os valores iguais são compartilhados
+  assert expr.left.value is expr.right.value
+
+
+def test_nil_and_bool_per_occurrence():
+  tree = parse("var a; var b; print true; print true;", cache=False)
+  assert tree.stmts[0].expr is not tree.stmts[1].expr
+  assert tree.stmts[2].expr is not tree.stmts[3].expr
+
+
+def test_cursor_finds_each_occurrence():
+  tree = parse("print 2; print 2; print 2;", cache=False)
+  for stmt in tree.stmts:
+    assert stmt.expr.cursor(tree.cursor()).parent().node is stmt
+
+
+def test_cursor_with_parent_index():
+  tree = parse("var x = 1; print x + 2; print x + 2; print 2;", cache=False)
+  index = ParentIndex(tree)
+  root = tree.cursor()
+  nodes = [node for node in tree.descendants() if isinstance(node, (Var, BinOp, Literal))]
+  assert {type(node) for node in nodes} == {Var, BinOp, Literal}
+  for node in nodes:
+    assert find_index(node) is index
+    assert node.cursor(root).node is node
+    assert index.cursor(node, root).node is node
+
+
+def test_parent_index_follows_replace_child():
+  tree = parse("var x = 1; print x + 2;", cache=False)
+  index = ParentIndex(tree)
+  expr = tree.stmts[1].expr
+  new = BinOp(Var("x"), Literal(3.0), expr.op)
+  tree.stmts[1].replace_child(expr, new)
+  for node in (new, new.left, new.right):
+    assert find_index(node) is index
+    assert index.cursor(node).root().node is tree
+  assert index.parent(new) is tree.stmts[1]
+  assert expr not in index
+
+
+def test_shared_node_uses_search():
+  tree = parse("print 1; print 2;", cache=False)
+  shared = tree.stmts[0].expr
+  tree.stmts[1].replace_child(tree.stmts[1].expr, shared)
+  index = ParentIndex(tree)
+  with pytest.raises(KeyError):
+    index.parent(shared)
+  cursor = shared.cursor(tree.cursor())
+  assert cursor.node is shared
+  assert cursor.parent().node in tree.stmts
+
+
+def test_replace_child_replaces_one_occurrence():
+  tree = parse("print 1 + 1;", cache=False)
+  expr = tree.stmts[0].expr
+  expr.replace_child(expr.right, Literal(2.0))
+  assert (expr.left.value, expr.right.value) == (1.0, 2.0)
+
+
+def test_clone_is_equal():
+  tree = parse("var x = 1; fun f(a) { return a + x; } print f(2);", cache=False)
+  clone = tree.clone()
+  assert clone == tree
+  assert clone.stmts[0] is not tree.stmts[0]
@@ -0,0 +1,53 @@
+import pytest
+
+from lox import parse
+from lox.ast import Literal, Print, Program
+from lox.passes import PassStats, run_frontend
+
+
+@pytest.fixture
+def sugar():
+  """
+  Classes de teste que registram a ordem dos passos, definidas só para os
+  testes que usam o fixture.
+  """
+  calls: list[tuple[str, str]] = []
+
+  class Tagged(Literal):
+    def validate_self(self, cursor):
+      calls.append(("validate", self.value))
+
+  class Sugar(Print):
+    def validate_self(self, cursor):
+      calls.append(("validate sugar", self.expr.value))
+
+    def desugar_self(self):
+      calls.append(("desugar", self.expr.value))
+      self.expr = Tagged(self.expr.value.upper())
+
+  return Tagged, Sugar, calls
+
+
+def test_validates_whole_tree_before_desugaring(sugar):
+  Tagged, Sugar, calls = sugar
+  program = Program([Print(Tagged("a")), Sugar(Tagged("b")), Print(Tagged("c"))])
+  stats = PassStats()
+  run_frontend(program, stats)
+  assert calls == [
+    ("validate", "a"),
+    ("validate sugar", "b"),
+    ("validate", "b"),
+    ("validate", "c"),
+    ("desugar", "b"),
+  ]
+  assert [stmt.expr.value for stmt in program.stmts] == ["a", "B", "c"]
+  assert stats.walks == 2
+
+
+def test_skips_desugaring_without_implementations(sugar):
+  # As classes do fixture existem, mas não aparecem na árvore
+  tree = parse("var x = 1; fun f(a) { return a + x; } while (x < 3) x = x + 1; print f(x);", cache=False)
+  stats = PassStats()
+  run_frontend(tree, stats)
+  assert (stats.walks, stats.cursors) == (1, 0)
+
@@ -0,0 +1,22 @@
+from lox import parse
+from lox.ast import Var
+from lox.resolver import resolve
+
+
+def names(tree) -> set[tuple]:
+  return {(node.name, node.depth, node.slot, node.is_global) for node in tree.descendants() if isinstance(node, Var)}
+
+
+def test_slots():
+  tree = resolve(parse("var g = 1; fun f(a) { var b = a; { var c = b; print c + g; } }", cache=False))
+  assert names(tree) == {
+    ("a", 1, 0, False),
+    ("b", 1, 0, False),
+    ("c", 0, 0, False),
+    ("g", None, None, True),
+  }
+
+
+def test_deep_expression():
+  tree = resolve(parse("fun f(a) { var y = 2; print y" + " + a" * 20000 + "; }", cache=False))
+  assert names(tree) == {("a", 1, 0, False), ("y", 0, 0, False)}